@@ -1,22 +1,22 @@
-import bag
-import numpy as np
-import matplotlib.pyplot as plt
 from os import path
 from os import mkdir
 import datetime
-from bag.layout.routing.grid import RoutingGrid
-from bag.layout.template import TemplateDB
-import yaml
-import subprocess
 import math
 import os
+import json
+import atexit
+import contextlib
 from time import time
 import logging
-from pybag.enum import DesignOutput
-from bag.design.database import ModuleDB
+from xbase_logic_repo.scripts import gen_cache, spec_cache, results_store, timing
+
+# bag, pybag, numpy, matplotlib and yaml are imported on first use, so that
+# importing this module (every dsn script and worker process does) stays cheap.
+# see bench/import_time.py
 
 
 def np_to_float(ddict):
+    import numpy as np
 
     for key, val in ddict.items():
         if isinstance(val, np.float64) or isinstance(val, np.float32) \
@@ -30,38 +30,99 @@ def np_to_float(ddict):
 
 
 def read_yaml(fname):
-    with open(fname, 'r') as f:
-        content = yaml.load(f)
-    return content
+    return spec_cache.load_yaml(fname)
 
 
-def save_yaml(data, yaml_file, append=False):
+# results logs backing save_yaml(), one per yaml file
+_results_stores = {}
+# yaml files whose results log changed since their last export
+_pending_exports = set()
+# the process deferring yaml exports, see defer_yaml_export()
+_defer_pid = None
 
-    lead, file = os.path.split(yaml_file)
 
-    # check if path is exist or not?
-    if not path.isdir(lead):
-        os.mkdir(lead)
+def get_results_store(yaml_file):
+    if yaml_file not in _results_stores:
+        _results_stores[yaml_file] = results_store.ResultsStore(yaml_file + '.jsonl')
+    return _results_stores[yaml_file]
+
+
+def export_yaml(store, yaml_file):
+    """
+        write the merged data of a results log to yaml_file atomically.
+    """
+
+    import yaml
+
+    tmp_file = '%s.tmp%d' % (yaml_file, os.getpid())
+    with open(tmp_file, 'w') as f:
+        yaml.dump(store.merged(), f)
+    os.replace(tmp_file, yaml_file)
+    _pending_exports.discard(yaml_file)
+
+
+def export_pending():
+    """
+        export every yaml file saved without export since its last export.
+
+        also called at exit, in case a deferred export was never written.
+    """
+
+    for yaml_file in sorted(_pending_exports):
+        export_yaml(get_results_store(yaml_file), yaml_file)
+
+
+atexit.register(export_pending)
+
+
+@contextlib.contextmanager
+def defer_yaml_export():
+    """
+        within the block, save_yaml() in this process only appends to the results log.
+
+        the yaml files saved in the block are exported once when it ends.  worker
+        processes keep exporting right away.
+    """
+
+    global _defer_pid
+    old_pid = _defer_pid
+    _defer_pid = os.getpid()
+    try:
+        yield
+    finally:
+        _defer_pid = old_pid
+        if old_pid != os.getpid():
+            export_pending()
 
-    if path.isfile(yaml_file):
-        pass
-    else:
-        subprocess.call('touch {}'.format(yaml_file), shell=True)
 
-    if path.isfile(yaml_file):
-        print("Will overwrite {}".format(yaml_file))
+def save_yaml(data, yaml_file, append=False, export=None):
+    """
+        save data through the append-only results log <yaml_file>.jsonl.
+
+        by default the merged log is also written to yaml_file, which reads the whole
+        log.  inside defer_yaml_export(), or with export=False, only the new entry is
+        written and yaml_file is exported later by export_pending().
+    """
 
+    store = get_results_store(yaml_file)
     if append is True:
         print("Appending data...")
-        yaml_data = read_yaml(yaml_file)
+        if not path.isfile(store.fname) and path.isfile(yaml_file):
+            # seed the log with a yaml file written before the log existed
+            old_data = read_yaml(yaml_file)
+            if old_data:
+                store.append(old_data, param_hash=results_store.get_param_hash(sorted(old_data)))
     else:
         print("Overwriting data...")
-        yaml_data = {}
-    yaml_data.update(data)
+        store.clear()
+    store.append(data, param_hash=results_store.get_param_hash(sorted(data)))
 
-    # save to file
-    with open(yaml_file, 'w') as f:
-        yaml.dump(yaml_data, f)
+    if export is None:
+        export = _defer_pid != os.getpid()
+    if export:
+        export_yaml(store, yaml_file)
+    else:
+        _pending_exports.add(yaml_file)
 
 
 
@@ -131,9 +192,20 @@ def save_yaml(data, yaml_file, append=False):
 #         return None
 
 
-def load_simres(dir):
+def load_simres(dir, lazy=False):
+    """
+        load simulation results.
+
+        with lazy, the results are converted once to the columnar format and a
+        memory mapped SimResStore is returned, no np_to_float scrubbing is needed.
+    """
+
     print('loading results')
-    results = bag.data.load_sim_results(dir)
+    if lazy:
+        from xbase_logic_repo.scripts import simres_store
+        return simres_store.open_simres(dir)
+    from bag.data import load_sim_results
+    results = load_sim_results(dir)
     return results
 
 
@@ -170,38 +242,37 @@ def remove_generated_library(bprj, impl_lib):
 
 def print_elapsed_time(start_time):
     elapsed_time = time() - start_time
-    m, s = divmod(int(np.round(elapsed_time)), 60)
+    m, s = divmod(int(round(elapsed_time)), 60)
     h, m = divmod(m, 60)
     print('Total elapsed time is %dh : %dm : %ds' % (h, m, s))
 
 
 def plot_generic(x, y_list, title_str='', legend_list=[], xlabel_str='', ylabel_str='', xscale='linear', yscale='linear',
-                 plot_style_str='o-', xlim=[], ylim=[], linewidth=1.5, fontsize=15, script_name='', filename=''):
-
-    if (xscale, yscale) == ('linear', 'linear'):
-        plot_type_str = 'plot'
-    elif (xscale, yscale) == ('log', 'linear'):
-        plot_type_str = 'semilogx'
-    elif (xscale, yscale) == ('linear', 'log'):
-        plot_type_str = 'semilogy'
-    elif (xscale, yscale) == ('log', 'log'):
-        plot_type_str = 'loglog'
-    else:
-        raise Exception('xscale = %s, yscale = %s, both should be linear or log!!' % (xscale, yscale))
+                 plot_style_str='o-', xlim=[], ylim=[], linewidth=1.5, fontsize=15, script_name='', filename='',
+                 show=True):
+    """
+        plot interactively.  for many or large plots use plot_batch.render_plots().
+    """
+
+    import matplotlib.pyplot as plt
+    from xbase_logic_repo.scripts import plot_batch
+
+    plot_type_str = plot_batch.get_plot_func(xscale, yscale)
 
     # fig = plt.figure()
     # ax = fig.add_subplot(1,1,1) # a fake subplot for tick_params()
     fig, ax = plt.subplots()    # default is 1,1,1
+    plot_func = getattr(ax, plot_type_str)
     if (isinstance(x[0], list)) and (len(x) == len(y_list)): # several plots with different x values
         for x, y in zip(x, y_list):
-            exec('ax.' + plot_type_str + '(x, y, plot_style_str, linewidth=linewidth)')
+            plot_func(x, y, plot_style_str, linewidth=linewidth)
     else:
         # if (isinstance(y_list[0], list)): # several plots with the same x values
         if (~isinstance(x, list)) and (isinstance(y_list, list)):  # several plots with the same x values
             for y in y_list:
-                exec('ax.' + plot_type_str + '(x, y, plot_style_str, linewidth=linewidth)')
+                plot_func(x, y, plot_style_str, linewidth=linewidth)
         else: # single plot only
-            exec('ax.' + plot_type_str + '(x, y_list, plot_style_str, linewidth=linewidth)')
+            plot_func(x, y_list, plot_style_str, linewidth=linewidth)
     # xmin, xmax = plot.get_xlim()
     # plt.xlim(0, max(x))
     if xlim:
@@ -247,7 +318,8 @@ def plot_generic(x, y_list, title_str='', legend_list=[], xlabel_str='', ylabel_
     else:
         ret = None
 
-    plt.show(block=False)
+    if show:
+        plt.show(block=False)
 
     return ret
 
@@ -301,26 +373,35 @@ class Const(object):
         return 300
 
 
-def write_log(log_file, level=logging.INFO, fmt='', overwrite=True, stream=False):
+# the queue logging session of write_log()
+_log_session = None
 
-    logger = logging.getLogger(__name__)
-    logger.setLevel(level)
-    formatter = logging.Formatter(fmt)
-    if overwrite is True:
-        file_handler = logging.FileHandler(log_file, 'w')
-    else:
-        file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    # if stream is True:
-    #     stream_handler = logging.StreamHandler()
-    #     stream_handler.flush()
-    #     logger.addHandler(stream_handler)
 
-    return logger
+def write_log(log_file, level=logging.INFO, fmt='', overwrite=True, stream=False, cell_dir=None):
+    """
+        log to log_file through a queue listener thread, returns the logger.
+
+        calling it again replaces the previous session instead of adding handlers.
+        worker processes log to the same file after
+        log_queue.init_worker_logging(get_log_queue(), level).
+    """
+
+    global _log_session
+    from xbase_logic_repo.scripts import log_queue
+
+    if _log_session is not None:
+        _log_session.stop()
+    _log_session = log_queue.LogSession(log_file, level=level, fmt=fmt, cell_dir=cell_dir,
+                                        stream=stream, overwrite=overwrite)
+    return log_queue.get_logger()
+
+
+def get_log_queue():
+    return None if _log_session is None else _log_session.queue
 
 
 def get_model_type(type_x):
+    from pybag.enum import DesignOutput
 
     if type_x == 'sv':
         return DesignOutput.SYSVERILOG
@@ -337,24 +418,97 @@ def get_model_type(type_x):
               "'schematic' or 'sch'.")
 
 
-def make_tdb(prj, impl_lib, grid_opts):
+# process-wide template databases, see make_tdb()
+_tdb_cache = {}
+
+
+def get_tdb_key(prj, impl_lib, grid_opts):
+    """
+        return the make_tdb() registry key of a grid and library.
+    """
+
+    grid_key = dict(
+        layers=grid_opts['layers'],
+        widths=grid_opts['widths'],
+        spaces=grid_opts['spaces'],
+        bot_dir=grid_opts['bot_dir'],
+        width_override=grid_opts.get('width_override', None) or {},
+    )
+    return id(prj.tech_info), impl_lib, json.dumps(gen_cache.normalize_params(grid_key), sort_keys=True)
+
+
+def make_tdb(prj, impl_lib, grid_opts, reuse=True):
     """
         make layout database.
+
+        with reuse, the same RoutingGrid and TemplateDB are returned for identical
+        grid_opts and impl_lib, so masters already drawn in this process are reused.
     """
 
+    key = get_tdb_key(prj, impl_lib, grid_opts)
+    if reuse and key in _tdb_cache:
+        return _tdb_cache[key]
+
     layers = grid_opts['layers']
     widths = grid_opts['widths']
     spaces = grid_opts['spaces']
     bot_dir = grid_opts['bot_dir']
     width_override = grid_opts.get('width_override', None)
 
-    routing_grid = RoutingGrid(prj.tech_info, layers, spaces, widths, bot_dir,
-                               width_override=width_override)
-    tdb = TemplateDB('template_libs.def', routing_grid, impl_lib, use_cybagoa=True)
+    from bag.layout.routing.grid import RoutingGrid
+    from bag.layout.template import TemplateDB
+
+    with timing.span('make_tdb'):
+        routing_grid = RoutingGrid(prj.tech_info, layers, spaces, widths, bot_dir,
+                                   width_override=width_override)
+        tdb = TemplateDB('template_libs.def', routing_grid, impl_lib, use_cybagoa=True)
 
+    if reuse:
+        _tdb_cache[key] = tdb
     return tdb
 
 
+def clear_tdb_cache(impl_lib=None):
+    """
+        drop the registered template databases, of impl_lib only if given.
+    """
+
+    for key in list(_tdb_cache):
+        if impl_lib is None or key[1] == impl_lib:
+            del _tdb_cache[key]
+
+
+# process-wide schematic databases, see make_sch_db()
+_sch_db_cache = {}
+
+
+def make_sch_db(prj, impl_lib, reuse=True):
+    """
+        make schematic database.
+
+        with reuse, one ModuleDB per project and library is shared by every
+        generate() call of this process.
+    """
+
+    key = id(prj), impl_lib
+    if reuse and key in _sch_db_cache:
+        return _sch_db_cache[key]
+
+    from bag.design.database import ModuleDB
+
+    with timing.span('make_sch_db'):
+        sch_db = ModuleDB(prj.tech_info, impl_lib, prj=prj)
+    if reuse:
+        _sch_db_cache[key] = sch_db
+    return sch_db
+
+
+def clear_sch_db_cache(impl_lib=None):
+    for key in list(_sch_db_cache):
+        if impl_lib is None or key[1] == impl_lib:
+            del _sch_db_cache[key]
+
+
 def run_lvs(bprj, impl_lib, cell_name, impl_cell_name=None):
     """
         run lvs.
@@ -365,7 +519,8 @@ def run_lvs(bprj, impl_lib, cell_name, impl_cell_name=None):
 
     print('running lvs')
     start_time = time()
-    lvs_passed, lvs_log = bprj.run_lvs(impl_lib, cell_name)
+    with timing.span('lvs', cell=cell_name):
+        lvs_passed, lvs_log = bprj.run_lvs(impl_lib, cell_name)
     if not lvs_passed:
         raise Exception('oops lvs died.  See LVS log file %s' % lvs_log)
     print('lvs passed')
@@ -373,66 +528,163 @@ def run_lvs(bprj, impl_lib, cell_name, impl_cell_name=None):
 
 
 def generate(prj, temp_lib, impl_lib, cell_name, lay_params, sch_params, mdl_params,
-             grid_opts, mdl_dir, mdl_opts=None, impl_cell_name=None):
+             grid_opts, mdl_dir, mdl_opts=None, impl_cell_name=None, lay_cls=None,
+             use_cache=False):
     """
         generate layout, schematic and model.
+
+        layout is only drawn when lay_cls is given, in which case the
+        template schematic parameters are merged into sch_params.
+        with use_cache, nothing is regenerated if the parameters and the
+        generator sources are unchanged since the last recorded run.
     """
 
-    # temp_db = make_tdb(prj, impl_loib, grid_opts)
-    #
-    # print('designing module')
-    # # layout
-    # print(lay_params)
-    # template = temp_db.new_template(params=lay_params, temp_cls=NAND, debug=True)
-    # if impl_cell_name is None:
-    #     temp_db.instantiate_layout(prj, template, cell_name, debug=True)
-    # else:
-    #     temp_db.instantiate_layout(prj, template, impl_cell_name, debug=True)
-
-    # generate schematic
-    if sch_params is None:
-        sch_params = {}
-    # sch_params.update(template.sch_params)
-    print(sch_params)
-
-    sch_db = ModuleDB(prj.tech_info, impl_lib, prj=prj)
-    gen_cls = sch_db.get_schematic_class(temp_lib, cell_name)
-    dsn = sch_db.new_master(gen_cls, params=sch_params)
-    if impl_cell_name is None:
-        sch_db.instantiate_master(DesignOutput.SCHEMATIC, dsn)
-    else:
-        sch_db.instantiate_master(DesignOutput.SCHEMATIC, dsn, top_cell_name=impl_cell_name)
+    from pybag.enum import DesignOutput
+    from bag_xbase_logic.layout.master_registry import new_master
 
-    # generate model
-    file_name = f"{mdl_dir}/{cell_name}.sv"
     top_cell_name = cell_name if impl_cell_name is None else impl_cell_name
-    if mdl_opts is None:
-        mdl_opts = {}
-    sch_db.instantiate_model(dsn, mdl_params, top_cell_name=top_cell_name,
-                             fname=file_name, **mdl_opts)
-
-
-def extract(prj, impl_lib, cell_name, impl_cell_name=None):
+    with timing.span('generate', cell=top_cell_name):
+        with timing.span('cache_lookup'):
+            gen_key = gen_cache.get_gen_key(temp_lib, impl_lib, cell_name, lay_params, sch_params,
+                                            mdl_params, grid_opts, mdl_opts=mdl_opts,
+                                            impl_cell_name=impl_cell_name, lay_cls=lay_cls)
+            hit = use_cache and gen_cache.restore(prj, gen_key)
+        if hit:
+            print('%s is up to date, skip generation' % top_cell_name)
+            gen_cache.record_cell(impl_lib, top_cell_name, gen_key)
+            return
+
+        if sch_params is None:
+            sch_params = {}
+        else:
+            sch_params = dict(sch_params)
+
+        # generate layout
+        if lay_cls is not None:
+            temp_db = make_tdb(prj, impl_lib, grid_opts)
+
+            print('designing module')
+            print(lay_params)
+            with timing.span('new_template'):
+                template = new_master(temp_db, lay_cls, lay_params)
+            with timing.span('instantiate_layout'):
+                temp_db.instantiate_layout(prj, template, top_cell_name, debug=True)
+            sch_params.update(template.sch_params)
+
+        # generate schematic
+        print(sch_params)
+
+        sch_db = make_sch_db(prj, impl_lib)
+        gen_cls = sch_db.get_schematic_class(temp_lib, cell_name)
+        with timing.span('new_master'):
+            dsn = sch_db.new_master(gen_cls, params=sch_params)
+        with timing.span('instantiate_master'):
+            if impl_cell_name is None:
+                sch_db.instantiate_master(DesignOutput.SCHEMATIC, dsn)
+            else:
+                sch_db.instantiate_master(DesignOutput.SCHEMATIC, dsn, top_cell_name=impl_cell_name)
+
+        # generate model
+        mdl_files = []
+        if mdl_params is not None:
+            file_name = f"{mdl_dir}/{cell_name}.sv"
+            if mdl_opts is None:
+                mdl_opts = {}
+            with timing.span('instantiate_model'):
+                sch_db.instantiate_model(dsn, mdl_params, top_cell_name=top_cell_name,
+                                         fname=file_name, **mdl_opts)
+            mdl_files.append(file_name)
+
+        # the extraction cache keys on the generation in the library
+        gen_cache.record_cell(impl_lib, top_cell_name, gen_key)
+        if use_cache:
+            gen_cache.save(gen_key, impl_lib, top_cell_name, files=mdl_files)
+
+
+def extract(prj, impl_lib, cell_name, impl_cell_name=None, use_cache=False):
     """
         run extraction.
+
+        with use_cache, lvs and rcx are skipped if the generated layout and
+        schematic are unchanged since the last recorded run.
     """
 
+    from xbase_logic_repo.scripts import extract_cache
+
     if impl_cell_name is not None:
         cell_name = impl_cell_name
 
-    print('running lvs')
-    lvs_passed, lvs_log = prj.run_lvs(impl_lib, cell_name)
-    if not lvs_passed:
-        raise Exception('oops lvs died.  See LVS log file %s' % lvs_log)
-    print('lvs passed')
+    with timing.span('extract', cell=cell_name):
+        fingerprint = None
+        if use_cache:
+            with timing.span('cache_lookup'):
+                fingerprint = extract_cache.get_fingerprint(prj, impl_lib, cell_name)
+
+        print('running lvs')
+        cached = extract_cache.lookup(fingerprint, 'lvs')
+        if cached is None:
+            with timing.span('lvs'):
+                lvs_passed, lvs_log = prj.run_lvs(impl_lib, cell_name)
+            extract_cache.store(fingerprint, 'lvs', lvs_passed, lvs_log)
+        else:
+            print('lvs result is up to date')
+            lvs_passed, lvs_log = cached
+        if not lvs_passed:
+            raise Exception('oops lvs died.  See LVS log file %s' % lvs_log)
+        print('lvs passed')
+
+        # run rcx
+        print('running rcx')
+        cached = extract_cache.lookup(fingerprint, 'rcx')
+        if cached is None:
+            with timing.span('rcx'):
+                rcx_passed, rcx_log = prj.run_rcx(impl_lib, cell_name)
+            extract_cache.store(fingerprint, 'rcx', rcx_passed, rcx_log)
+        else:
+            print('rcx result is up to date')
+            rcx_passed, rcx_log = cached
+        if not rcx_passed:
+            raise Exception('oops rcx died.  See RCX log file %s' % rcx_log)
+        print('rcx passed')
+
+
+def extract_cells(prj, impl_lib, cell_names, max_concurrent=4, timeout=None, retries=0, run_rcx=True,
+                  use_cache=False):
+    """
+        run extraction on many cells concurrently, returns the failed ExtractResults.
+    """
 
-    # run rcx
-    print('running rcx')
-    rcx_passed, rcx_log = prj.run_rcx(impl_lib, cell_name)
-    if not rcx_passed:
-        raise Exception('oops rcx died.  See RCX log file %s' % rcx_log)
-    print('rcx passed')
+    from xbase_logic_repo.scripts import extract_sched, extract_cache
 
+    runner = extract_sched.BagRunner(prj, max_threads=max_concurrent)
+    if use_cache:
+        runner = extract_cache.CachedRunner(runner, prj)
+    results = extract_sched.extract_all([(impl_lib, cell_name) for cell_name in cell_names], runner,
+                                        max_concurrent=max_concurrent, timeout=timeout,
+                                        retries=retries, run_rcx=run_rcx)
+    return [res for res in results if res.error is not None]
+
+
+def simulate(prj, specs, cell, backend=None, num_proc=None, out_dir=None, per_corner=False, use_cache=True):
+    """
+        run the <cell>_tb_params x <cell>_sim_envs sweep of a cell.
+
+        list entries of <cell>_tb_params are swept.  the results of all jobs are
+        written to one columnar result set, returned with the failed jobs.
+        with per_corner, every corner is run and cached on its own, then merged.
+    """
 
-def simulate(prj):
-    pass
\ No newline at end of file
+    from xbase_logic_repo.scripts import sweep
+
+    if backend is None:
+        # used when the jobs run in this process, workers create their own project
+        backend = sweep.get_bag_backend(specs, cell, prj=prj)
+    if out_dir is None:
+        out_dir = sweep.get_out_dir(specs, cell)
+    tb_params = specs.get(cell + '_tb_params', None)
+    sim_envs = specs[cell + '_sim_envs']
+    with timing.span('sweep', cell=cell), defer_yaml_export():
+        if per_corner:
+            return sweep.run_corners(tb_params, sim_envs, backend, out_dir, num_proc=num_proc,
+                                     use_cache=use_cache)
+        return sweep.run_sweep(sweep.expand_jobs(tb_params, sim_envs), backend, out_dir, num_proc=num_proc)
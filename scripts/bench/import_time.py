@@ -0,0 +1,76 @@
+import sys
+import json
+import argparse
+import subprocess
+from os import path
+
+
+BUDGET_FILE = path.join(path.dirname(path.abspath(__file__)), 'import_budget.json')
+
+
+def parse_importtime(stderr):
+    """
+        parse python -X importtime output, returns {module: (self us, cumulative us)}.
+    """
+
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumul_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumul_us))
+    return times
+
+
+def measure(module, repeat=5):
+    """
+        import module in fresh interpreters, returns the times of the fastest run.
+    """
+
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                              stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, universal_newlines=True)
+        if proc.returncode != 0:
+            raise Exception('import %s failed:\n%s' % (module, proc.stderr[-2000:]))
+        times = parse_importtime(proc.stderr)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    return best
+
+
+def check_budget(budget, repeat=5, num_top=5):
+    """
+        measure every module of the budget, returns the list of violations.
+    """
+
+    forbidden = budget.get('forbidden', [])
+    errors = []
+    for module, max_ms in sorted(budget['modules'].items()):
+        times = measure(module, repeat=repeat)
+        total_ms = times[module][1] / 1000
+        status = 'ok' if total_ms <= max_ms else 'OVER'
+        print('%-50s %8.1f ms  (budget %6.1f ms)  %s' % (module, total_ms, max_ms, status))
+        if total_ms > max_ms:
+            errors.append('%s imports in %.1f ms, budget is %.1f ms' % (module, total_ms, max_ms))
+            top = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:num_top]
+            for name, (self_us, _) in top:
+                print('    %-46s %8.1f ms self' % (name, self_us / 1000))
+        loaded = sorted(name for name in forbidden if name in times)
+        if loaded:
+            errors.append('%s imports %s at module level' % (module, ', '.join(loaded)))
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the import time of the flow modules against a budget.')
+    parser.add_argument('--budget', default=BUDGET_FILE, help='budget json file')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='imports per module, the fastest counts')
+    args = parser.parse_args()
+
+    with open(args.budget, 'r') as f:
+        budget_info = json.load(f)
+    violations = check_budget(budget_info, repeat=args.repeat)
+    if violations:
+        raise Exception('import time budget exceeded:\n' + '\n'.join(violations))
+    print('all modules within budget')
@@ -0,0 +1,74 @@
+import math
+import argparse
+
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs
+from xbase_logic_repo.scripts.bench.layout_harness import measure_cell, run_isolated, write_report, compare_reports
+
+
+SPEC_FILE = 'bag_xbase_logic/specs/logic_parameters.yaml'
+PI_RES_LIST = [4, 8, 16, 32, 64, 128, 256]
+CHILDREN = ['CtrlBufArr', 'ClkCellArr', 'Buffer', 'Cload']
+
+
+def get_slope(results, field):
+    """
+        return the log-log slope of field against pi_res between the first and last point,
+        1 is linear scaling.
+    """
+
+    if len(results) < 2 or not results[0][field] or not results[-1][field]:
+        return None
+    first, last = results[0], results[-1]
+    return math.log(last[field] / first[field]) / math.log(last['pi_res'] / first['pi_res'])
+
+
+def run_scaling(spec_file=SPEC_FILE, pi_res_list=PI_RES_LIST, bag_config=None, repeat=1):
+    """
+        generate InvPI for every pi_res, each in a fresh process, returns the results.
+
+        with repeat > 1 the fastest run of each point is kept.
+    """
+
+    specs = get_cell_specs(spec_file, 'inv_PI')
+    lay_params = specs['inv_PI_lay_params']
+    grid_opts = specs['grid_opts']
+
+    print('%8s %10s %10s %10s %10s  %s' % ('pi_res', 'time', 'rss', 'flat_inst', 'flat_rect',
+                                          ' '.join('%10s' % name for name in CHILDREN)))
+    results = []
+    for pi_res in pi_res_list:
+        best = None
+        for _ in range(repeat):
+            res = run_isolated(measure_cell, 'inv_PI', dict(lay_params, pi_res=pi_res), grid_opts, bag_config)
+            if best is None or res['time'] < best['time']:
+                best = res
+        best['pi_res'] = pi_res
+        results.append(best)
+        child_times = ' '.join('%9.3fs' % best['draw_times'].get(name, 0.0) for name in CHILDREN)
+        print('%8d %9.3fs %8.1fMB %10d %10d  %s' % (pi_res, best['time'], best['peak_rss_mb'],
+                                                    best['counts']['flat_inst'], best['counts']['flat_rect'],
+                                                    child_times))
+
+    for field in ('time', 'peak_rss_mb'):
+        slope = get_slope(results, field)
+        if slope is not None:
+            print('%s scales as pi_res^%.2f' % (field, slope))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure how InvPI generation scales with pi_res.')
+    parser.add_argument('--spec', default=SPEC_FILE, help='spec yaml file')
+    parser.add_argument('--bag-config', default=None, help='BAG config file of the technology, '
+                                                           'BAG_CONFIG_PATH by default')
+    parser.add_argument('--pi-res', type=int, nargs='+', default=PI_RES_LIST, help='pi_res values')
+    parser.add_argument('-n', '--repeat', type=int, default=1, help='runs per point, the fastest counts')
+    parser.add_argument('-o', '--out', default='inv_PI_scaling.json', help='json report file')
+    parser.add_argument('--baseline', default=None, help='earlier report to compare against')
+    args = parser.parse_args()
+
+    scaling_results = run_scaling(args.spec, args.pi_res, bag_config=args.bag_config, repeat=args.repeat)
+    write_report(args.out, scaling_results, bench='inv_PI_scaling', spec=args.spec)
+    if args.baseline is not None:
+        compare_reports(args.baseline, scaling_results, 'pi_res',
+                        fields=('time', 'peak_rss_mb', 'setup_time'))
@@ -0,0 +1,99 @@
+import argparse
+import statistics
+
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs, get_cells
+from xbase_logic_repo.scripts.build_lib import LAY_CLASSES
+from xbase_logic_repo.scripts.bench.layout_harness import measure_cell, run_isolated, write_report, compare_reports, \
+    record_tech_fixture
+
+
+SPEC_FILE = 'bag_xbase_logic/specs/logic_parameters.yaml'
+
+
+def bench_cell(cell, lay_params, grid_opts, bag_config=None, rounds=5, warmup=1):
+    """
+        draw one cell warmup + rounds times for timing, then once more with allocation tracing.
+
+        every round uses a new template database, so the whole hierarchy is drawn each time.
+    """
+
+    for _ in range(warmup):
+        measure_cell(cell, lay_params, grid_opts, bag_config)
+    times = [measure_cell(cell, lay_params, grid_opts, bag_config)['time'] for _ in range(rounds)]
+    alloc = measure_cell(cell, lay_params, grid_opts, bag_config, trace_alloc=True)
+    return dict(
+        cell=cell,
+        rounds=rounds,
+        min=min(times),
+        max=max(times),
+        mean=statistics.mean(times),
+        median=statistics.median(times),
+        stddev=statistics.stdev(times) if rounds > 1 else 0.0,
+        setup_time=alloc['setup_time'],
+        peak_rss_mb=alloc['peak_rss_mb'],
+        alloc_peak_mb=alloc['alloc_peak_mb'],
+        alloc_blocks=alloc['alloc_blocks'],
+        counts=alloc['counts'],
+        draw_times=alloc['draw_times'],
+    )
+
+
+def run_bench(spec_file=SPEC_FILE, cells=None, bag_config=None, rounds=5, warmup=1):
+    """
+        benchmark the layout generator of every spec cell, each in a fresh process.
+
+        a cell that fails gets a result with only cell and error, the others still run.
+    """
+
+    if cells is None:
+        cells = [cell for cell in get_cells(spec_file) if cell in LAY_CLASSES]
+
+    print('%-16s %10s %10s %10s %10s %10s %10s' % ('cell', 'min', 'mean', 'stddev', 'rss', 'alloc',
+                                                   'blocks'))
+    results = []
+    for cell in cells:
+        specs = get_cell_specs(spec_file, cell)
+        lay_params = specs.get(cell + '_lay_params', None)
+        if cell not in LAY_CLASSES or lay_params is None:
+            print('%-16s skipped, no layout generator or parameters' % cell)
+            continue
+        try:
+            res = run_isolated(bench_cell, cell, lay_params, specs['grid_opts'], bag_config, rounds, warmup)
+        except Exception as ex:
+            # one broken generator must not hide the numbers of the others
+            error = '%s: %s' % (type(ex).__name__, ex)
+            results.append(dict(cell=cell, error=error))
+            print('%-16s failed, %s' % (cell, error))
+            continue
+        results.append(res)
+        print('%-16s %9.3fs %9.3fs %9.3fs %8.1fMB %8.1fMB %10d' % (cell, res['min'], res['mean'], res['stddev'],
+                                                                 res['peak_rss_mb'], res['alloc_peak_mb'],
+                                                                 res['alloc_blocks']))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the layout generators offline.')
+    parser.add_argument('cells', nargs='*', help='cells to benchmark, all layout cells of the spec by default')
+    parser.add_argument('--spec', default=SPEC_FILE, help='spec yaml file')
+    parser.add_argument('--bag-config', default=None, help='BAG config file of the technology, the recorded '
+                                                           'tech fixture or BAG_CONFIG_PATH by default')
+    parser.add_argument('--record-tech', action='store_true', help='record the tech fixture from the BAG '
+                                                                   'config and exit')
+    parser.add_argument('-r', '--rounds', type=int, default=5, help='timed runs per cell')
+    parser.add_argument('-w', '--warmup', type=int, default=1, help='untimed runs per cell')
+    parser.add_argument('-o', '--out', default='layout_gen_bench.json', help='json report file')
+    parser.add_argument('--baseline', default=None, help='earlier report to compare against')
+    args = parser.parse_args()
+
+    if args.record_tech:
+        record_tech_fixture(get_cell_specs(args.spec)['grid_opts'], bag_config=args.bag_config)
+        raise SystemExit(0)
+
+    bench_results = run_bench(args.spec, cells=args.cells or None, bag_config=args.bag_config,
+                              rounds=args.rounds, warmup=args.warmup)
+    write_report(args.out, bench_results, bench='layout_gen_bench', spec=args.spec, rounds=args.rounds,
+                 warmup=args.warmup)
+    if args.baseline is not None:
+        compare_reports(args.baseline, bench_results, 'cell', fields=('min', 'mean', 'peak_rss_mb',
+                                                                      'alloc_peak_mb'))
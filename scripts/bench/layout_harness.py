@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import pickle
+import platform
+import datetime
+import resource
+import tracemalloc
+import multiprocessing
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+from xbase_logic_repo.scripts.gen_cache import normalize_params
+
+
+BENCH_LIB = 'bag_xbase_logic_bench'
+# routing grid recorded by record_tech_fixture(), used when no BAG config is given
+TECH_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'tech_grid.pkl')
+
+
+def _make_grid(grid_opts, bag_config=None):
+    from bag.core import create_tech_info
+    from bag.layout.routing.grid import RoutingGrid
+
+    tech_info = create_tech_info(bag_config_path=bag_config)
+    return RoutingGrid(tech_info, grid_opts['layers'], grid_opts['spaces'], grid_opts['widths'],
+                       grid_opts['bot_dir'], width_override=grid_opts.get('width_override', None))
+
+
+def record_tech_fixture(grid_opts, fname=TECH_FIXTURE, bag_config=None):
+    """
+        pickle the routing grid of grid_opts, with its technology and layer table, to fname.
+
+        run once in a BAG workspace, make_offline_tdb() then uses the fixture and needs
+        no BAG config.  the technology class must still be importable to load it.
+    """
+
+    routing_grid = _make_grid(grid_opts, bag_config=bag_config)
+    layers = {}
+    for layer_id in grid_opts['layers']:
+        layers[layer_id] = dict(
+            name=routing_grid.tech_info.get_layer_name(layer_id),
+            direction=routing_grid.get_direction(layer_id),
+            pitch=routing_grid.get_track_pitch(layer_id, unit_mode=True),
+            width=routing_grid.get_track_width(layer_id, 1, unit_mode=True),
+        )
+    fixture = dict(grid_opts=normalize_params(grid_opts), layers=layers, grid=routing_grid)
+
+    os.makedirs(os.path.dirname(os.path.abspath(fname)), exist_ok=True)
+    tmp_name = '%s.tmp%d' % (fname, os.getpid())
+    with open(tmp_name, 'wb') as f:
+        pickle.dump(fixture, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_name, fname)
+    print('tech fixture written to %s' % fname)
+    return fixture
+
+
+def load_tech_fixture(grid_opts, fname=TECH_FIXTURE):
+    """
+        return the routing grid recorded in fname, which must match grid_opts.
+    """
+
+    with open(fname, 'rb') as f:
+        fixture = pickle.load(f)
+    if fixture['grid_opts'] != normalize_params(grid_opts):
+        raise ValueError('tech fixture %s was recorded with other grid_opts, record it again with '
+                         'layout_gen_bench.py --record-tech' % fname)
+    return fixture['grid']
+
+
+def make_offline_tdb(grid_opts, impl_lib=BENCH_LIB, bag_config=None, fixture=TECH_FIXTURE):
+    """
+        make a template database without a BagProject.
+
+        without bag_config, the routing grid recorded in fixture is used if it exists,
+        otherwise the technology is read from the BAG config file at BAG_CONFIG_PATH.
+        nothing connects to Virtuoso or OpenAccess, layouts can be drawn in memory but
+        not instantiated.
+    """
+
+    from bag.layout.template import TemplateDB
+
+    if bag_config is None and fixture is not None and os.path.isfile(fixture):
+        routing_grid = load_tech_fixture(grid_opts, fixture)
+    else:
+        routing_grid = _make_grid(grid_opts, bag_config=bag_config)
+    return TemplateDB('template_libs.def', routing_grid, impl_lib, use_cybagoa=True)
+
+
+def get_shape_counts(template):
+    """
+        return the instance, rectangle and via counts of a drawn template.
+
+        inst, rect and via are the objects of the template itself, the flat_ counts
+        go through the hierarchy with arrayed instances counted once per element.
+    """
+
+    flat = {}
+
+    def _count(master):
+        key = id(master)
+        if key not in flat:
+            layout = master._layout
+            counts = [0, len(layout._rect_list), len(layout._via_list)]
+            for inst in layout._inst_list:
+                num = inst.nx * inst.ny
+                child = _count(inst.master)
+                counts[0] += num * (1 + child[0])
+                counts[1] += num * child[1]
+                counts[2] += num * child[2]
+            flat[key] = counts
+        return flat[key]
+
+    layout = template._layout
+    flat_inst, flat_rect, flat_via = _count(template)
+    return dict(
+        inst=sum(inst.nx * inst.ny for inst in layout._inst_list),
+        rect=len(layout._rect_list),
+        via=len(layout._via_list),
+        flat_inst=flat_inst,
+        flat_rect=flat_rect,
+        flat_via=flat_via,
+    )
+
+
+def get_peak_rss():
+    """
+        return the peak resident set size of this process, in MB.
+    """
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on linux, bytes on macOS
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024
+
+
+def measure_cell(cell, lay_params, grid_opts, bag_config=None, trace_alloc=False):
+    """
+        draw the layout of one spec cell in a new template database and measure it.
+
+        returns the wall time of the drawing, the peak RSS of the process, the shape
+        counts of the top template and the draw time of every template class.  with
+        trace_alloc, python allocations are traced too, which slows the drawing down.
+    """
+
+    from xbase_logic_repo.scripts.build_lib import get_lay_cls
+    from bag_xbase_logic.layout import master_registry
+
+    lay_cls = get_lay_cls(cell)
+    if lay_cls is None:
+        raise ValueError('cell %s has no layout generator' % cell)
+
+    start = perf_counter()
+    temp_db = make_offline_tdb(grid_opts, bag_config=bag_config)
+    setup_time = perf_counter() - start
+
+    master_registry.reset_stats()
+    if trace_alloc:
+        tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    start = perf_counter()
+    template = master_registry.new_master(temp_db, lay_cls, lay_params, debug=False)
+    elapsed = perf_counter() - start
+    result = dict(
+        cell=cell,
+        time=elapsed,
+        setup_time=setup_time,
+        peak_rss_mb=get_peak_rss(),
+        counts=get_shape_counts(template),
+        draw_times={name.split('.')[-1]: val for name, val in master_registry.get_draw_times().items()},
+        masters={name.split('.')[-1]: list(val) for name, val in master_registry.get_stats().items()},
+    )
+    if trace_alloc:
+        result['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        result['alloc_blocks'] = sys.getallocatedblocks() - blocks
+        tracemalloc.stop()
+    return result
+
+
+def run_isolated(fn, *args):
+    """
+        run fn(*args) in a fresh interpreter and return its result.
+
+        every measurement gets its own process, so the peak RSS is the one of that
+        call alone and no template master is reused from an earlier one.
+    """
+
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def write_report(fname, results, **meta):
+    """
+        write the results with the machine and run information as json.
+    """
+
+    report = dict(
+        date=datetime.datetime.now().isoformat(timespec='seconds'),
+        host=platform.node(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results=results,
+    )
+    report.update(meta)
+    lead = os.path.dirname(os.path.abspath(fname))
+    os.makedirs(lead, exist_ok=True)
+    with open(fname, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('report written to %s' % fname)
+
+
+def compare_reports(baseline_file, results, key, fields=('time', 'peak_rss_mb')):
+    """
+        print the ratio of each field to the baseline report, results are matched on key.
+
+        returns {key value: {field: ratio}}.
+    """
+
+    with open(baseline_file, 'r') as f:
+        baseline = {res[key]: res for res in json.load(f)['results']}
+
+    ratios = {}
+    print('%-20s %s' % (key, ' '.join('%14s' % field for field in fields)))
+    for res in results:
+        old = baseline.get(res[key], None)
+        if old is None:
+            continue
+        row = {}
+        for field in fields:
+            if old.get(field, None) and field in res:
+                row[field] = res[field] / old[field]
+        ratios[res[key]] = row
+        print('%-20s %s' % (res[key], ' '.join(('%13.2fx' % row[field]) if field in row else '%14s' % '-'
+                                               for field in fields)))
+    return ratios
@@ -0,0 +1,268 @@
+import os
+import io
+import ast
+import sys
+import json
+import socket
+import argparse
+import importlib
+import traceback
+import socketserver
+from os import path
+from time import time
+from contextlib import redirect_stdout
+
+import yaml
+
+from xbase_logic_repo.scripts import build_lib, timing
+from xbase_logic_repo.scripts._misc import clear_tdb_cache, clear_sch_db_cache
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs
+from bag_xbase_logic.layout import master_registry
+
+
+SOCK_FILE = os.environ.get('BAG_XBASE_LOGIC_DAEMON_SOCK',
+                           '/tmp/bag_xbase_logic_%d.sock' % os.getuid())
+# generator modules reloaded in place when their source changes
+RELOAD_PKGS = ('bag_xbase_logic.layout.', 'bag_xbase_logic.schematic.')
+
+
+class _Tee(io.StringIO):
+    # captures the build output for the client while still printing it here
+    def __init__(self, stream):
+        io.StringIO.__init__(self)
+        self._stream = stream
+
+    def write(self, s):
+        self._stream.write(s)
+        return io.StringIO.write(self, s)
+
+
+def _get_mod_imports(mod_file):
+    with open(mod_file, 'r') as f:
+        tree = ast.parse(f.read(), filename=mod_file)
+    return {node.module for node in ast.walk(tree)
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith(RELOAD_PKGS)}
+
+
+class ModuleReloader(object):
+    """Reloads generator modules whose source changed since they were loaded.
+
+    Modules importing a changed module are reloaded after it, so they pick up
+    the new classes.
+    """
+
+    def __init__(self):
+        self._mtimes = {}
+        self.update()
+
+    def _get_modules(self):
+        return {name: mod for name, mod in list(sys.modules.items())
+                if name.startswith(RELOAD_PKGS) and getattr(mod, '__file__', None)}
+
+    def update(self):
+        # remember the source mtime of every generator module loaded so far
+        for name, mod in self._get_modules().items():
+            if name not in self._mtimes:
+                self._mtimes[name] = os.stat(mod.__file__).st_mtime_ns
+
+    def reload_changed(self):
+        """
+            reload the changed modules and their importers, returns the reloaded module names.
+        """
+
+        mods = self._get_modules()
+        changed = {name for name, mod in mods.items()
+                   if name in self._mtimes and os.stat(mod.__file__).st_mtime_ns != self._mtimes[name]}
+        if not changed:
+            return []
+
+        imports = {name: _get_mod_imports(mod.__file__) & set(mods) for name, mod in mods.items()}
+        added = True
+        while added:
+            added = False
+            for name, mod_imports in imports.items():
+                if name not in changed and mod_imports & changed:
+                    changed.add(name)
+                    added = True
+
+        # reload dependencies first
+        order = []
+        remain = set(changed)
+        while remain:
+            level = sorted(name for name in remain if not imports[name] & remain)
+            if not level:
+                level = sorted(remain)
+            order.extend(level)
+            remain.difference_update(level)
+        for name in order:
+            print('reloading %s' % name)
+            importlib.reload(mods[name])
+            self._mtimes[name] = os.stat(mods[name].__file__).st_mtime_ns
+        return order
+
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    """Serves build requests over a Unix socket with one warm BagProject.
+
+    Requests are handled one at a time.  Each request is one JSON line:
+
+    {"cmd": "build", "cells": ["clkdiv"], "lay_params": {"div_ratio": 8}}
+    {"cmd": "reload"}, {"cmd": "ping"} or {"cmd": "stop"}
+
+    build also accepts sch_params, use_cache (default True), extract and specs.
+
+    Parameters
+    ----------
+    prj : bag.core.BagProject
+        the BAG project, kept for the lifetime of the daemon.
+    sock_file : str
+        the socket file name.
+    spec_file : str
+        the default spec yaml file.
+    """
+
+    def __init__(self, prj, sock_file=SOCK_FILE, spec_file=build_lib.SPEC_FILE):
+        if path.exists(sock_file):
+            os.remove(sock_file)
+        socketserver.UnixStreamServer.__init__(self, sock_file, _RequestHandler)
+        os.chmod(sock_file, 0o600)
+        self.prj = prj
+        self.sock_file = sock_file
+        self.spec_file = spec_file
+        self.reloader = ModuleReloader()
+        self.stopped = False
+
+    def reload(self):
+        reloaded = self.reloader.reload_changed()
+        if reloaded:
+            # masters drawn by the old classes must not be reused
+            clear_tdb_cache()
+            clear_sch_db_cache()
+            master_registry.clear_masters()
+        return reloaded
+
+    def build(self, cells, lay_params=None, sch_params=None, use_cache=True, extract=None, specs=None):
+        spec_file = specs or self.spec_file
+        reloaded = self.reload()
+        master_registry.reset_stats()
+        errors = {}
+        start_time = time()
+        for cell in cells:
+            try:
+                cell_specs = get_cell_specs(spec_file, cell)
+                if extract is not None:
+                    cell_specs[cell + '_opts'] = dict(cell_specs[cell + '_opts'], run_extraction=extract)
+                build_lib.build_cell(self.prj, cell_specs, cell, use_cache=use_cache,
+                                     lay_params=lay_params, sch_params=sch_params)
+            except Exception:
+                errors[cell] = traceback.format_exc()
+                print(errors[cell])
+        self.reloader.update()
+        print('built %d of %d cells in %.1fs' % (len(cells) - len(errors), len(cells), time() - start_time))
+        timing.print_summary(timing.pop_events())
+        master_registry.print_stats()
+        return dict(ok=not errors, errors=errors, reloaded=reloaded)
+
+    def handle(self, request):
+        cmd = request.get('cmd', None)
+        if cmd == 'ping':
+            return dict(ok=True, pid=os.getpid())
+        if cmd == 'stop':
+            self.stopped = True
+            return dict(ok=True)
+        if cmd == 'reload':
+            return dict(ok=True, reloaded=self.reload())
+        if cmd == 'build':
+            kwargs = {key: request[key] for key in ('lay_params', 'sch_params', 'use_cache', 'extract', 'specs')
+                      if key in request}
+            return self.build(request['cells'], **kwargs)
+        return dict(ok=False, errors={'': 'Unknown command %s' % cmd})
+
+    def serve(self):
+        print('bag_xbase_logic daemon listening on %s' % self.sock_file)
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            self.server_close()
+            if path.exists(self.sock_file):
+                os.remove(self.sock_file)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        tee = _Tee(sys.stdout)
+        try:
+            request = json.loads(self.rfile.readline())
+            with redirect_stdout(tee):
+                response = self.server.handle(request)
+        except Exception:
+            response = dict(ok=False, errors={'': traceback.format_exc()})
+        response['log'] = tee.getvalue()
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+def send_request(request, sock_file=SOCK_FILE):
+    """
+        send one request to a running daemon and return its response.
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sock_file)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def _parse_params(items):
+    # key=value pairs, values parsed as yaml so numbers and lists keep their type
+    params = {}
+    for item in items or []:
+        key, val = item.split('=', 1)
+        params[key] = yaml.safe_load(val)
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='bag_xbase_logic build daemon.')
+    parser.add_argument('--sock', default=SOCK_FILE, help='socket file')
+    sub = parser.add_subparsers(dest='cmd')
+    sub.add_parser('serve', help='start the daemon in this process')
+    sub.add_parser('ping', help='check the daemon is running')
+    sub.add_parser('reload', help='reload changed generator modules')
+    sub.add_parser('stop', help='stop the daemon')
+    build_parser = sub.add_parser('build', help='regenerate cells')
+    build_parser.add_argument('cells', help='comma separated cells')
+    build_parser.add_argument('--specs', default=None, help='spec yaml file')
+    build_parser.add_argument('--lay', nargs='*', metavar='KEY=VALUE', help='layout parameter overrides')
+    build_parser.add_argument('--sch', nargs='*', metavar='KEY=VALUE', help='schematic parameter overrides')
+    build_parser.add_argument('--no-cache', action='store_true', help='regenerate even if unchanged')
+    build_parser.add_argument('--extract', action='store_true', help='run extraction')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'serve':
+        import bag.core
+        print('creating BAG project')
+        BuildDaemon(bag.core.BagProject(), sock_file=args.sock).serve()
+        return
+    if args.cmd is None:
+        parser.error('missing command')
+
+    request = dict(cmd=args.cmd)
+    if args.cmd == 'build':
+        request.update(cells=args.cells.split(','), lay_params=_parse_params(args.lay),
+                       sch_params=_parse_params(args.sch), use_cache=not args.no_cache)
+        if args.extract:
+            request['extract'] = True
+        if args.specs:
+            request['specs'] = args.specs
+    response = send_request(request, sock_file=args.sock)
+    print(response.get('log', ''), end='')
+    for cell, err in sorted(response.get('errors', {}).items()):
+        print('%s failed:\n%s' % (cell, err))
+    if not response['ok']:
+        raise Exception('daemon request failed')
+
+
+if __name__ == '__main__':
+    main()
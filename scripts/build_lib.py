@@ -0,0 +1,344 @@
+import os
+import ast
+import argparse
+import importlib
+import traceback
+from os import path
+from time import time
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from xbase_logic_repo.scripts._misc import read_yaml, generate, extract, print_elapsed_time, defer_yaml_export
+from xbase_logic_repo.scripts import spec_cache, timing, dep_tracker, log_queue
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs
+from bag_xbase_logic.layout import master_registry
+
+
+SPEC_FILE = 'bag_xbase_logic/specs/logic_parameters.yaml'
+LAY_DIR = path.join(path.dirname(path.abspath(__file__)), '..', 'src', 'bag_xbase_logic', 'layout')
+LAY_PKG = 'bag_xbase_logic.layout'
+
+# spec cell prefix -> (layout module, layout class).  cells without an entry
+# (tinv, tgate, clk_cell) only have a schematic and a model.
+LAY_CLASSES = {
+    'inv': ('inv', 'Inv'),
+    'nand': ('nand', 'NAND'),
+    'nor': ('nor', 'NOR'),
+    'and': ('and_gate', 'AND'),
+    'or': ('or_gate', 'OR'),
+    'xor': ('xor', 'XOR'),
+    'xnor': ('xnor', 'XNOR'),
+    'buffer': ('buffer', 'Buffer'),
+    'mux': ('mux', 'MUX'),
+    'inv_mux': ('inv_mux', 'InvMUX'),
+    'multi_mux': ('multi_mux', 'MultiMUX'),
+    'dff': ('dff', 'DFF'),
+    'dff_strst': ('dff_strst', 'DFFStRst'),
+    'prbs': ('prbs', 'PRBS'),
+    'clkdiv': ('clkdiv', 'ClkDiv'),
+    'delay_stage': ('delay_stage', 'DelStage'),
+    'ctrl_buf_array': ('ctrl_buf_array', 'CtrlBufArr'),
+    'clk_cell_array': ('clk_cell_array', 'ClkCellArr'),
+    'inv_PI': ('inv_PI', 'InvPI'),
+    'cload': ('cload', 'Cload'),
+}
+
+# per worker process state
+_worker_prj = None
+
+
+def get_cells(specs):
+    """
+        return every cell that has a <cell>_opts block in the spec.
+    """
+
+    cells = (key[:-len('_opts')] for key in specs if key.endswith('_opts'))
+    return sorted(cell for cell in cells if cell + '_cell_name' in specs)
+
+
+def get_lay_imports(lay_mod):
+    """
+        return the layout modules imported by a layout module, found statically.
+    """
+
+    fname = path.join(LAY_DIR, lay_mod + '.py')
+    with open(fname, 'r') as f:
+        tree = ast.parse(f.read(), filename=fname)
+
+    mods = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith(LAY_PKG + '.'):
+            mods.add(node.module[len(LAY_PKG) + 1:])
+    return mods
+
+
+def get_cell_deps(cells):
+    """
+        return the dependency graph {cell: set of cells it instantiates} of the given cells.
+
+        only dependencies inside the given cell list are kept.
+    """
+
+    mod_to_cell = {LAY_CLASSES[cell][0]: cell for cell in cells if cell in LAY_CLASSES}
+    deps = {}
+    for cell in cells:
+        if cell in LAY_CLASSES:
+            mods = get_lay_imports(LAY_CLASSES[cell][0])
+            deps[cell] = {mod_to_cell[mod] for mod in mods if mod in mod_to_cell}
+        else:
+            deps[cell] = set()
+    return deps
+
+
+def get_build_order(deps):
+    """
+        return the cells grouped in levels, every cell only depends on cells of earlier levels.
+    """
+
+    remain = {cell: set(cell_deps) for cell, cell_deps in deps.items()}
+    levels = []
+    while remain:
+        level = sorted(cell for cell, cell_deps in remain.items() if not cell_deps)
+        if not level:
+            raise ValueError('Circular cell dependency among: %s' % ', '.join(sorted(remain)))
+        for cell in level:
+            del remain[cell]
+        for cell_deps in remain.values():
+            cell_deps.difference_update(level)
+        levels.append(level)
+    return levels
+
+
+def get_lay_cls(cell):
+    if cell not in LAY_CLASSES:
+        return None
+    lay_mod, lay_cls = LAY_CLASSES[cell]
+    return getattr(importlib.import_module('%s.%s' % (LAY_PKG, lay_mod)), lay_cls)
+
+
+def build_cell(prj, specs, cell, use_cache=True, lay_params=None, sch_params=None):
+    """
+        generate (and extract, if enabled in <cell>_opts) one cell.
+
+        lay_params and sch_params override entries of the spec parameters.
+    """
+
+    temp_lib = specs['temp_lib']
+    impl_lib = specs['impl_lib']
+    cell_name = specs[cell + '_cell_name']
+    cell_lay_params = specs.get(cell + '_lay_params', None)
+    if cell_lay_params is not None and lay_params:
+        cell_lay_params = dict(cell_lay_params, **lay_params)
+    cell_sch_params = specs.get(cell + '_sch_params', None)
+    if sch_params:
+        cell_sch_params = dict(cell_sch_params or {}, **sch_params)
+    lay_cls = get_lay_cls(cell) if cell_lay_params is not None else None
+
+    generate(prj, temp_lib, impl_lib, cell_name, cell_lay_params, cell_sch_params,
+             specs.get(cell + '_mdl_params', None), specs['grid_opts'], specs['model_dir'],
+             lay_cls=lay_cls, use_cache=use_cache)
+
+    if specs[cell + '_opts'].get('run_extraction', False):
+        extract(prj, impl_lib, cell_name, use_cache=use_cache)
+
+
+def get_dependents(deps, cells):
+    """
+        return cells plus every cell that instantiates one of them, directly or not.
+    """
+
+    out = set(cells)
+    added = True
+    while added:
+        added = False
+        for cell, cell_deps in deps.items():
+            if cell not in out and cell_deps & out:
+                out.add(cell)
+                added = True
+    return out
+
+
+def get_outdated_cells(specs, cells, manifest):
+    """
+        return {cell: reason} of the cells to rebuild, downstream cells of a changed one included.
+    """
+
+    dirty = dep_tracker.get_dirty_cells(specs, cells, LAY_CLASSES, manifest)
+    for cell in sorted(get_dependents(get_cell_deps(cells), dirty)):
+        dirty.setdefault(cell, 'depends on a rebuilt cell')
+    return dirty
+
+
+def _init_worker(prj=None, log_q=None):
+    global _worker_prj
+    if log_q is not None:
+        log_queue.init_worker_logging(log_q)
+    if prj is None:
+        import bag.core
+
+        print('creating BAG project in worker %d' % os.getpid())
+        prj = bag.core.BagProject()
+    _worker_prj = prj
+
+
+class _InlinePool(object):
+    # runs submitted calls right away in this process, used for a single job
+    def __init__(self, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+def _run_cell(spec_file, cell, use_cache):
+    """
+        worker entry point, returns (cell, elapsed time, error message, timing events,
+        template master statistics).
+    """
+
+    master_registry.reset_stats()
+    logger = log_queue.get_logger('build', cell=cell)
+    logger.info('building %s in process %d', cell, os.getpid())
+    start_time = time()
+    err = None
+    try:
+        build_cell(_worker_prj, get_cell_specs(spec_file, cell), cell, use_cache=use_cache)
+    except Exception:
+        err = traceback.format_exc()
+        logger.error('%s failed:\n%s', cell, err)
+    elapsed = time() - start_time
+    if err is None:
+        logger.info('%s done in %.1fs', cell, elapsed)
+    return cell, elapsed, err, timing.pop_events(), master_registry.get_stats()
+
+
+def build_library(spec_file=SPEC_FILE, cells=None, jobs=None, use_cache=True, trace_file=None,
+                  incremental=False, prj=None, log_file=None, cell_log_dir=None):
+    """
+        generate cells in dependency order, independent cells run in parallel.
+
+        with jobs=1 every cell is built in this process with one BagProject, prj if
+        given.  otherwise each worker process creates its project once and keeps it,
+        with its template and schematic databases, for all the cells it builds.
+
+        with log_file, every process logs through one queue to log_file, and to
+        cell_log_dir/<cell>.log if given.
+        with incremental, only cells whose sources or specs changed since their last
+        successful build are generated, together with the cells that instantiate them.
+        the timing spans of all workers are summarized per cell, and written as a
+        Chrome trace to trace_file if given.  the number of template masters drawn
+        and reused is printed per template class.
+        returns a dictionary from failed (or skipped) cell to its error message.
+    """
+
+    # compile the spec cache once here so workers only load their own cell
+    spec_cache.compile_specs(spec_file)
+    specs = read_yaml(spec_file)
+    if cells is None:
+        cells = [cell for cell in get_cells(specs) if specs[cell + '_opts'].get('run_dsn', True)]
+
+    manifest_file = dep_tracker.get_manifest_file(specs['impl_lib'])
+    manifest = dep_tracker.load_manifest(manifest_file)
+    if incremental:
+        outdated = get_outdated_cells(specs, cells, manifest)
+        for cell in sorted(outdated):
+            print('rebuild %s: %s' % (cell, outdated[cell]))
+        cells = [cell for cell in cells if cell in outdated]
+        if not cells:
+            print('all cells are up to date')
+            return {}
+    deps = get_cell_deps(cells)
+    print('build order: %s' % get_build_order(deps))
+
+    start_time = time()
+    remain = {cell: set(cell_deps) for cell, cell_deps in deps.items()}
+    errors = {}
+    running = {}
+    master_stats = {}
+    log_session = None
+    if log_file is not None:
+        log_session = log_queue.LogSession(log_file, cell_dir=cell_log_dir)
+    log_q = None if log_session is None else log_session.queue
+    if jobs == 1:
+        pool = _InlinePool(initializer=_init_worker, initargs=(prj, log_q))
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(None, log_q))
+    try:
+        with pool:
+            while remain or running:
+                # submit every cell whose dependencies are done, skip cells whose dependencies failed
+                for cell in sorted(remain):
+                    if remain[cell] & set(errors):
+                        errors[cell] = 'skipped, dependency failed: %s' % ', '.join(sorted(remain[cell] & set(errors)))
+                        del remain[cell]
+                    elif not remain[cell]:
+                        running[pool.submit(_run_cell, spec_file, cell, use_cache)] = cell
+                        del remain[cell]
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    del running[fut]
+                    cell, elapsed, err, events, stats = fut.result()
+                    timing.add_events(events)
+                    for cls_name, (hits, misses) in stats.items():
+                        old_hits, old_misses = master_stats.get(cls_name, (0, 0))
+                        master_stats[cls_name] = (old_hits + hits, old_misses + misses)
+                    if err is None:
+                        print('%s done in %.1fs' % (cell, elapsed))
+                        manifest[cell] = dep_tracker.get_cell_entry(specs, cell, LAY_CLASSES)
+                        dep_tracker.save_manifest(manifest, manifest_file)
+                        for cell_deps in remain.values():
+                            cell_deps.discard(cell)
+                    else:
+                        print('%s failed:\n%s' % (cell, err))
+                        errors[cell] = err
+    finally:
+        if log_session is not None:
+            log_session.stop()
+
+    print('built %d of %d cells' % (len(cells) - len(errors), len(cells)))
+    print_elapsed_time(start_time)
+    timing.print_summary()
+    master_registry.print_stats(master_stats)
+    if trace_file is not None:
+        timing.write_trace(trace_file)
+        print('timing trace written to %s' % trace_file)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bag_xbase_logic',
+                                     description='Generate cells of the bag_xbase_logic library.')
+    parser.add_argument('--specs', default=SPEC_FILE, help='spec yaml file')
+    parser.add_argument('--cells', default=None, help='comma separated cells, default all with run_dsn')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes, 1 builds in this process')
+    parser.add_argument('--no-cache', action='store_true', help='regenerate cells even if unchanged')
+    parser.add_argument('--trace', default=None, help='Chrome trace json file to write')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='only rebuild cells downstream of changed sources or specs')
+    parser.add_argument('--log', default=None, help='run log file')
+    parser.add_argument('--cell-logs', default=None, help='directory of per-cell log files')
+    args = parser.parse_args(argv)
+
+    cell_list = args.cells.split(',') if args.cells else None
+    with defer_yaml_export():
+        failed = build_library(args.specs, cells=cell_list, jobs=args.jobs,
+                               use_cache=not args.no_cache, trace_file=args.trace,
+                               incremental=args.incremental, log_file=args.log, cell_log_dir=args.cell_logs)
+    if failed:
+        raise Exception('failed cells: %s' % ', '.join(sorted(failed)))
+
+
+if __name__ == '__main__':
+    main()
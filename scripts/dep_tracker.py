@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+from os import path
+
+from xbase_logic_repo.scripts.gen_cache import REPO_DIR, CACHE_DIR, file_hash, get_lay_files, \
+    get_sch_files, normalize_params
+from xbase_logic_repo.scripts.spec_cache import split_specs
+
+
+LAY_DIR = path.join(REPO_DIR, 'src', 'bag_xbase_logic', 'layout')
+
+
+def get_cell_sources(specs, cell, lay_classes):
+    """
+        return every source file the generated cell depends on, relative to the repository.
+
+        lay_classes maps spec cells to their (layout module, layout class).
+    """
+
+    fnames = get_sch_files(specs[cell + '_cell_name'])
+    if cell in lay_classes:
+        fnames.extend(get_lay_files(path.join(LAY_DIR, lay_classes[cell][0] + '.py')))
+    return sorted({path.relpath(path.abspath(fname), REPO_DIR) for fname in fnames})
+
+
+def _spec_hash(specs, cell):
+    # the cell block plus the global entries (grid, libraries) it is generated with
+    global_specs, cell_specs = split_specs(specs)
+    content = json.dumps(normalize_params([global_specs, cell_specs.get(cell, {})]), sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def get_manifest_file(impl_lib, cache_dir=CACHE_DIR):
+    return path.join(cache_dir, 'manifest', impl_lib + '.json')
+
+
+def load_manifest(fname):
+    if not path.isfile(fname):
+        return {}
+    with open(fname, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, fname):
+    os.makedirs(path.dirname(fname), exist_ok=True)
+    tmp_name = '%s.tmp%d' % (fname, os.getpid())
+    with open(tmp_name, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_name, fname)
+
+
+def get_cell_entry(specs, cell, lay_classes):
+    """
+        return the manifest entry of a cell, the hashes of its sources and spec block.
+    """
+
+    src_hash = {fname: file_hash(path.join(REPO_DIR, fname))
+                for fname in get_cell_sources(specs, cell, lay_classes)}
+    return dict(spec=_spec_hash(specs, cell), sources=src_hash)
+
+
+def get_dirty_cells(specs, cells, lay_classes, manifest):
+    """
+        return {cell: reason} of the cells whose sources or specs changed since the manifest.
+    """
+
+    dirty = {}
+    for cell in cells:
+        old = manifest.get(cell, None)
+        if old is None:
+            dirty[cell] = 'never built'
+            continue
+        new = get_cell_entry(specs, cell, lay_classes)
+        if new['spec'] != old['spec']:
+            dirty[cell] = 'specs changed'
+            continue
+        changed = sorted(fname for fname in set(new['sources']) | set(old['sources'])
+                         if new['sources'].get(fname) != old['sources'].get(fname))
+        if changed:
+            dirty[cell] = 'changed: %s' % ', '.join(changed)
+    return dirty
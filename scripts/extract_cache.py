@@ -0,0 +1,156 @@
+import os
+import json
+import shutil
+import hashlib
+from os import path
+
+from xbase_logic_repo.scripts import gen_cache
+from xbase_logic_repo.scripts.gen_cache import REPO_DIR, file_hash, normalize_params
+from xbase_logic_repo.scripts.extract_sched import ExtractRunner
+
+
+CACHE_DIR = os.environ.get('BAG_XBASE_LOGIC_EXTRACT_CACHE', path.join(REPO_DIR, '.extract_cache'))
+VIEWS = ('layout', 'schematic')
+
+
+def get_lib_dir(prj, impl_lib):
+    return path.join(prj.impl_db.default_lib_path, impl_lib)
+
+
+def get_view_files(lib_dir, cell_name, views=VIEWS):
+    """
+        return the files of the given views of a cell in a library directory.
+    """
+
+    fnames = []
+    for view in views:
+        view_dir = path.join(lib_dir, cell_name, view)
+        for root, dirs, files in os.walk(view_dir):
+            dirs.sort()
+            fnames.extend(path.join(root, fname) for fname in sorted(files))
+    return fnames
+
+
+def get_fingerprint(prj, impl_lib, cell_name, options=None):
+    """
+        return the fingerprint of the layout and schematic LVS/RCX run on.
+
+        the generation key recorded by generate() covers the whole hierarchy.  for cells
+        generated elsewhere the views of every cell of the library are hashed instead.
+    """
+
+    lib_dir = get_lib_dir(prj, impl_lib)
+    if not path.isdir(lib_dir):
+        # library not generated yet
+        return None
+    gen_key = gen_cache.get_cell_key(impl_lib, cell_name)
+    cell_list = [cell_name] if gen_key is not None else sorted(os.listdir(lib_dir))
+    view_hash = {}
+    for cell in cell_list:
+        for fname in get_view_files(lib_dir, cell):
+            view_hash[path.relpath(fname, lib_dir)] = file_hash(fname)
+    if not view_hash:
+        # nothing on disk to check against
+        return None
+
+    content = dict(impl_lib=impl_lib, cell_name=cell_name, gen_key=gen_key, views=view_hash,
+                   options=options)
+    content_str = json.dumps(normalize_params(content), sort_keys=True)
+    return hashlib.sha256(content_str.encode('utf-8')).hexdigest()
+
+
+def lookup(fingerprint, step, cache_dir=CACHE_DIR):
+    """
+        return the cached (result, log_file) of an lvs or rcx step, None on a miss.
+
+        a cached rcx netlist is copied back to its original location if it is gone.
+    """
+
+    if fingerprint is None:
+        return None
+    entry_dir = path.join(cache_dir, fingerprint)
+    record_file = path.join(entry_dir, step + '.json')
+    if not path.isfile(record_file):
+        return None
+    with open(record_file, 'r') as f:
+        record = json.load(f)
+
+    for key in ('log', 'netlist'):
+        fname = record[key]
+        if fname and record[key + '_cache'] and not path.isfile(fname):
+            os.makedirs(path.dirname(path.abspath(fname)), exist_ok=True)
+            shutil.copyfile(path.join(entry_dir, record[key + '_cache']), fname)
+    result = record['netlist'] if record['netlist'] else record['passed']
+    return result, record['log']
+
+
+def store(fingerprint, step, result, log_file, cache_dir=CACHE_DIR):
+    """
+        record the outcome of an lvs or rcx step, with copies of its log and netlist.
+
+        result is the first value returned by run_lvs/run_rcx, a pass flag or the
+        extracted netlist file name.
+    """
+
+    if fingerprint is None:
+        return
+    entry_dir = path.join(cache_dir, fingerprint)
+    os.makedirs(entry_dir, exist_ok=True)
+
+    netlist = result if isinstance(result, str) and path.isfile(result) else None
+    record = dict(passed=bool(result), log=log_file, netlist=netlist)
+    for key, fname in (('log', log_file), ('netlist', netlist)):
+        cache_name = None
+        if fname and path.isfile(fname):
+            cache_name = '%s_%s' % (step, path.basename(fname))
+            shutil.copyfile(fname, path.join(entry_dir, cache_name))
+        record[key + '_cache'] = cache_name
+
+    record_file = path.join(entry_dir, step + '.json')
+    tmp_name = record_file + '.tmp%d' % os.getpid()
+    with open(tmp_name, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_name, record_file)
+
+
+def clear(cache_dir=CACHE_DIR):
+    if path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+
+
+class CachedRunner(ExtractRunner):
+    """Wraps an extraction runner, skipping checks of unchanged cells.
+
+    Parameters
+    ----------
+    runner : ExtractRunner
+        the runner used on a cache miss.
+    prj : bag.core.BagProject
+        the BAG project, used to locate the generated library.
+    options : dict
+        extra content of the fingerprint, e.g. the rule deck versions.
+    """
+
+    def __init__(self, runner, prj, options=None, cache_dir=CACHE_DIR):
+        self._runner = runner
+        self._prj = prj
+        self._options = options
+        self._cache_dir = cache_dir
+        self.hits = 0
+
+    async def _run(self, step, impl_lib, cell_name):
+        fingerprint = get_fingerprint(self._prj, impl_lib, cell_name, options=self._options)
+        cached = lookup(fingerprint, step, cache_dir=self._cache_dir)
+        if cached is not None:
+            print('%s %s is up to date, skip extraction' % (cell_name, step))
+            self.hits += 1
+            return cached
+        result, log_file = await getattr(self._runner, 'run_' + step)(impl_lib, cell_name)
+        store(fingerprint, step, result, log_file, cache_dir=self._cache_dir)
+        return result, log_file
+
+    async def run_lvs(self, impl_lib, cell_name):
+        return await self._run('lvs', impl_lib, cell_name)
+
+    async def run_rcx(self, impl_lib, cell_name):
+        return await self._run('rcx', impl_lib, cell_name)
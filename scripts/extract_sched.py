@@ -0,0 +1,183 @@
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from xbase_logic_repo.scripts import timing
+
+
+ExtractResult = namedtuple('ExtractResult', ['impl_lib', 'cell_name', 'lvs_passed', 'lvs_log',
+                                             'rcx_passed', 'rcx_log', 'error', 'attempts'])
+
+
+class ExtractRunner(object):
+    """Interface of the LVS/RCX backends used by the extraction scheduler.
+
+    Both methods are coroutines returning a (passed, log_file) tuple.  A failed
+    check is reported through passed, exceptions are treated as transient and
+    retried.  A check that times out is cancelled, the coroutine must only
+    return once the check has stopped writing to its run directory.
+    """
+
+    async def run_lvs(self, impl_lib, cell_name):
+        raise NotImplementedError
+
+    async def run_rcx(self, impl_lib, cell_name):
+        raise NotImplementedError
+
+
+class BagRunner(ExtractRunner):
+    """Runs LVS/RCX through a BagProject.
+
+    Uses the project's async_run_lvs/async_run_rcx coroutines when present,
+    their tool subprocess is killed on cancellation.  Otherwise the blocking
+    calls run in a thread pool.  A thread cannot be stopped, so a cancelled
+    blocking check only returns once its thread is done, and keeps its job slot
+    until then.
+
+    Parameters
+    ----------
+    prj : bag.core.BagProject
+        the BAG project.
+    max_threads : int
+        thread pool size for the blocking calls.
+    """
+
+    def __init__(self, prj, max_threads=None):
+        self._prj = prj
+        self._executor = ThreadPoolExecutor(max_workers=max_threads)
+
+    async def _run(self, name, impl_lib, cell_name):
+        async_func = getattr(self._prj, 'async_' + name, None)
+        if async_func is not None:
+            return await async_func(impl_lib, cell_name)
+        cfut = self._executor.submit(getattr(self._prj, name), impl_lib, cell_name)
+        try:
+            return await asyncio.wrap_future(cfut)
+        except asyncio.CancelledError:
+            if not cfut.done():
+                print('%s of %s cannot be stopped, waiting for it to finish' % (name, cell_name))
+                await asyncio.wait([asyncio.wrap_future(cfut)])
+            raise
+
+    async def run_lvs(self, impl_lib, cell_name):
+        return await self._run('run_lvs', impl_lib, cell_name)
+
+    async def run_rcx(self, impl_lib, cell_name):
+        return await self._run('run_rcx', impl_lib, cell_name)
+
+
+class FakeRunner(ExtractRunner):
+    """A stand-in runner for testing the scheduler without LVS/RCX tools.
+
+    Parameters
+    ----------
+    delay : float
+        seconds every check takes.
+    fail : set[tuple[str, str]]
+        (cell_name, 'lvs' or 'rcx') checks that do not pass.
+    errors : dict[tuple[str, str], int]
+        number of times a check raises before it runs normally.
+    hang : set[tuple[str, str]]
+        checks that never finish, to exercise timeouts.
+    """
+
+    def __init__(self, delay=0.0, fail=None, errors=None, hang=None):
+        self._delay = delay
+        self._fail = set(fail or [])
+        self._errors = dict(errors or {})
+        self._hang = set(hang or [])
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _run(self, step, impl_lib, cell_name):
+        key = (cell_name, step)
+        self.calls.append(key)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if key in self._hang:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self._delay)
+            if self._errors.get(key, 0) > 0:
+                self._errors[key] -= 1
+                raise RuntimeError('fake %s error on %s' % (step, cell_name))
+            return key not in self._fail, '%s/%s.%s.log' % (impl_lib, cell_name, step)
+        finally:
+            self.running -= 1
+
+    async def run_lvs(self, impl_lib, cell_name):
+        return await self._run('lvs', impl_lib, cell_name)
+
+    async def run_rcx(self, impl_lib, cell_name):
+        return await self._run('rcx', impl_lib, cell_name)
+
+
+async def _run_step(runner, step, impl_lib, cell_name, timeout, retries):
+    # returns (passed, log, error message, attempts)
+    func = getattr(runner, 'run_' + step)
+    error = None
+    for attempt in range(1, retries + 2):
+        with timing.span(step, cell=cell_name):
+            task = asyncio.ensure_future(func(impl_lib, cell_name))
+            done, _ = await asyncio.wait([task], timeout=timeout)
+            if task in done:
+                try:
+                    passed, log = task.result()
+                    return passed, log, None, attempt
+                except Exception as ex:
+                    error = '%s raised %s: %s' % (step, type(ex).__name__, ex)
+            else:
+                error = '%s timed out after %ss' % (step, timeout)
+                print('%s %s attempt %d timed out, stopping it' % (cell_name, step, attempt))
+                # never retry while the check may still write to the run directory
+                task.cancel()
+                await asyncio.wait([task])
+        print('%s %s attempt %d failed: %s' % (cell_name, step, attempt, error))
+    return False, None, error, retries + 1
+
+
+async def _run_job(runner, sem, impl_lib, cell_name, run_rcx, timeout, retries):
+    async with sem:
+        print('running lvs on %s' % cell_name)
+        lvs_passed, lvs_log, error, attempts = await _run_step(runner, 'lvs', impl_lib, cell_name,
+                                                               timeout, retries)
+        if error is None and not lvs_passed:
+            error = 'lvs failed.  See LVS log file %s' % lvs_log
+        rcx_passed, rcx_log = None, None
+        if error is None and run_rcx:
+            print('running rcx on %s' % cell_name)
+            rcx_passed, rcx_log, error, rcx_attempts = await _run_step(runner, 'rcx', impl_lib, cell_name,
+                                                                       timeout, retries)
+            attempts += rcx_attempts
+            if error is None and not rcx_passed:
+                error = 'rcx failed.  See RCX log file %s' % rcx_log
+        return ExtractResult(impl_lib, cell_name, lvs_passed, lvs_log, rcx_passed, rcx_log, error, attempts)
+
+
+async def async_extract_all(jobs, runner, max_concurrent=4, timeout=None, retries=0, run_rcx=True):
+    """
+        run LVS then RCX on every (impl_lib, cell_name) job, max_concurrent jobs at a time.
+
+        timeout is per check in seconds, exceptions and timeouts are retried up to
+        retries times.  returns one ExtractResult per job, in job order.
+    """
+
+    sem = asyncio.Semaphore(max_concurrent)
+    tasks = [_run_job(runner, sem, impl_lib, cell_name, run_rcx, timeout, retries)
+             for impl_lib, cell_name in jobs]
+    return list(await asyncio.gather(*tasks))
+
+
+def extract_all(jobs, runner, max_concurrent=4, timeout=None, retries=0, run_rcx=True):
+    """
+        blocking version of async_extract_all(), prints every failure and returns all results.
+    """
+
+    results = asyncio.run(async_extract_all(jobs, runner, max_concurrent=max_concurrent,
+                                            timeout=timeout, retries=retries, run_rcx=run_rcx))
+    failed = [res for res in results if res.error is not None]
+    for res in failed:
+        print('%s/%s: %s' % (res.impl_lib, res.cell_name, res.error))
+    print('extraction passed on %d of %d cells' % (len(results) - len(failed), len(results)))
+    return results
@@ -0,0 +1,237 @@
+import os
+import re
+import ast
+import json
+import shutil
+import hashlib
+import inspect
+from os import path
+
+
+REPO_DIR = path.normpath(path.join(path.dirname(path.abspath(__file__)), '..'))
+SCH_DIR = path.join(REPO_DIR, 'src', 'bag_xbase_logic', 'schematic')
+CACHE_DIR = os.environ.get('BAG_XBASE_LOGIC_GEN_CACHE', path.join(REPO_DIR, '.gen_cache'))
+SCH_LIB = 'bag_xbase_logic'
+# an indented lib_name/cell_name pair is an instance master, the top level pair is the cell itself
+INST_RE = re.compile(rb'^[ \t]+lib_name: *%s[ \t]*\r?\n[ \t]+cell_name: *(\S+)' % SCH_LIB.encode('ascii'),
+                     re.MULTILINE)
+
+
+def normalize_params(val):
+    """
+        return a json friendly copy of val with sorted keys and python scalars.
+
+        numpy scalars are turned into python numbers and tuples into lists, so
+        equivalent parameter dictionaries always hash the same.
+    """
+
+    if isinstance(val, dict):
+        return {str(key): normalize_params(val[key]) for key in sorted(val, key=str)}
+    if isinstance(val, (list, tuple)):
+        return [normalize_params(v) for v in val]
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if hasattr(val, 'item') and hasattr(val, 'dtype'):
+        # numpy scalar
+        return normalize_params(val.item())
+    if hasattr(val, 'tolist'):
+        # numpy array
+        return normalize_params(val.tolist())
+    if inspect.isclass(val):
+        return '%s.%s' % (val.__module__, val.__qualname__)
+    return repr(val)
+
+
+def file_hash(fname):
+    hasher = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_lay_files(lay_file, found=None):
+    """
+        return lay_file and every layout module it imports, recursively.
+    """
+
+    if found is None:
+        found = []
+    found.append(lay_file)
+    with open(lay_file, 'r') as f:
+        tree = ast.parse(f.read(), filename=lay_file)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and \
+                node.module.startswith('bag_xbase_logic.layout.'):
+            sub_file = path.join(path.dirname(lay_file), node.module.split('.')[-1] + '.py')
+            if path.isfile(sub_file) and sub_file not in found:
+                get_lay_files(sub_file, found)
+    return found
+
+
+def get_sch_imports(sch_cell):
+    """
+        return the bag_xbase_logic schematic cells instantiated by a schematic cell.
+    """
+
+    fname = path.join(SCH_DIR, 'netlist_info', sch_cell + '.yaml')
+    if not path.isfile(fname):
+        return set()
+    # scanned as bytes, netlist files exported from Virtuoso are not always valid utf-8
+    with open(fname, 'rb') as f:
+        content = f.read()
+    return {cell.decode('ascii') for cell in INST_RE.findall(content)}
+
+
+def get_sch_files(sch_cell, found=None):
+    """
+        return the schematic, netlist and model files of sch_cell and of its sub-cells, recursively.
+    """
+
+    if found is None:
+        found = set()
+    if sch_cell in found:
+        return []
+    found.add(sch_cell)
+    fnames = [path.join(SCH_DIR, sch_cell + '.py'),
+              path.join(SCH_DIR, 'netlist_info', sch_cell + '.yaml'),
+              path.join(SCH_DIR, 'models', sch_cell + '.sv')]
+    fnames = [fname for fname in fnames if path.isfile(fname)]
+    for sub_cell in sorted(get_sch_imports(sch_cell)):
+        fnames.extend(get_sch_files(sub_cell, found))
+    return fnames
+
+
+def get_source_files(cell_name, lay_cls=None):
+    """
+        return the schematic, netlist, model template and layout files of a cell and of
+        every schematic sub-cell and layout module it uses.
+    """
+
+    fnames = get_sch_files(cell_name)
+    if lay_cls is not None:
+        fnames.extend(get_lay_files(inspect.getsourcefile(lay_cls)))
+    return fnames
+
+
+def get_gen_key(temp_lib, impl_lib, cell_name, lay_params, sch_params, mdl_params, grid_opts,
+                mdl_opts=None, impl_cell_name=None, lay_cls=None):
+    """
+        return the cache key of one generate() call.
+    """
+
+    src_hash = {path.relpath(fname, REPO_DIR): file_hash(fname)
+                for fname in get_source_files(cell_name, lay_cls)}
+    content = dict(
+        temp_lib=temp_lib,
+        impl_lib=impl_lib,
+        cell_name=cell_name,
+        impl_cell_name=impl_cell_name,
+        lay_cls=lay_cls,
+        lay_params=lay_params,
+        sch_params=sch_params,
+        mdl_params=mdl_params,
+        mdl_opts=mdl_opts,
+        grid_opts=grid_opts,
+        src_hash=src_hash,
+    )
+    content_str = json.dumps(normalize_params(content), sort_keys=True)
+    return hashlib.sha256(content_str.encode('utf-8')).hexdigest()
+
+
+def _cell_exists(prj, impl_lib, cell_name):
+    try:
+        impl_db = prj.impl_db
+    except AttributeError:
+        # no database access, the cell cannot be confirmed
+        return False
+    return cell_name in impl_db.get_cells_in_library(impl_lib)
+
+
+def restore(prj, key, cache_dir=CACHE_DIR):
+    """
+        restore the artifacts recorded under key.
+
+        returns False on a cache miss, if the generated cell is gone from the library,
+        or if the cell was regenerated with another key since.
+    """
+
+    entry_dir = path.join(cache_dir, key)
+    record_file = path.join(entry_dir, 'record.json')
+    if not path.isfile(record_file):
+        return False
+    with open(record_file, 'r') as f:
+        record = json.load(f)
+
+    if get_cell_key(record['impl_lib'], record['top_cell_name'], cache_dir) != key:
+        return False
+    if not _cell_exists(prj, record['impl_lib'], record['top_cell_name']):
+        return False
+
+    for fname, cache_name in record['files'].items():
+        cache_fname = path.join(entry_dir, cache_name)
+        if not path.isfile(fname) or file_hash(fname) != file_hash(cache_fname):
+            os.makedirs(path.dirname(path.abspath(fname)), exist_ok=True)
+            shutil.copyfile(cache_fname, fname)
+    return True
+
+
+def save(key, impl_lib, top_cell_name, files=None, cache_dir=CACHE_DIR):
+    """
+        record a finished generation and copy its file artifacts into the cache.
+    """
+
+    entry_dir = path.join(cache_dir, key)
+    tmp_dir = entry_dir + '.tmp%d' % os.getpid()
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    record = dict(impl_lib=impl_lib, top_cell_name=top_cell_name, files={})
+    for idx, fname in enumerate(files or []):
+        cache_name = '%d_%s' % (idx, path.basename(fname))
+        shutil.copyfile(fname, path.join(tmp_dir, cache_name))
+        record['files'][fname] = cache_name
+    with open(path.join(tmp_dir, 'record.json'), 'w') as f:
+        json.dump(record, f, indent=2)
+
+    # publish atomically, another process may have recorded the same key
+    if path.isdir(entry_dir):
+        shutil.rmtree(tmp_dir)
+    else:
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir)
+
+
+def _cell_record_file(impl_lib, cell_name, cache_dir):
+    return path.join(cache_dir, 'cells', impl_lib, cell_name + '.json')
+
+
+def record_cell(impl_lib, cell_name, key, cache_dir=CACHE_DIR):
+    """
+        remember the key of the generation currently in impl_lib/cell_name.
+    """
+
+    fname = _cell_record_file(impl_lib, cell_name, cache_dir)
+    os.makedirs(path.dirname(fname), exist_ok=True)
+    tmp_name = fname + '.tmp%d' % os.getpid()
+    with open(tmp_name, 'w') as f:
+        json.dump(dict(key=key), f)
+    os.replace(tmp_name, fname)
+
+
+def get_cell_key(impl_lib, cell_name, cache_dir=CACHE_DIR):
+    """
+        return the key of the last generation of impl_lib/cell_name, None if unknown.
+    """
+
+    fname = _cell_record_file(impl_lib, cell_name, cache_dir)
+    if not path.isfile(fname):
+        return None
+    with open(fname, 'r') as f:
+        return json.load(f)['key']
+
+
+def clear(cache_dir=CACHE_DIR):
+    if path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
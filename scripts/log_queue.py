@@ -0,0 +1,153 @@
+import os
+import atexit
+import logging
+import multiprocessing
+from os import path
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+DEFAULT_FMT = '%(asctime)s %(processName)s %(levelname)s %(cell)s: %(message)s'
+LOGGER_NAME = 'xbase_logic_repo'
+
+
+class _CellFilter(logging.Filter):
+    # gives every record a cell attribute, so formats can always use %(cell)s
+    def filter(self, record):
+        if not hasattr(record, 'cell'):
+            record.cell = '-'
+        return True
+
+
+class CellFileHandler(logging.Handler):
+    """Writes the records of each cell to <log_dir>/<cell>.log.
+
+    Records without a cell are ignored.  Runs in the listener thread only.
+
+    Parameters
+    ----------
+    log_dir : str
+        the per-cell log directory.
+    mode : str
+        file open mode, 'w' to start every cell file from scratch.
+    """
+
+    def __init__(self, log_dir, mode='w'):
+        logging.Handler.__init__(self)
+        self._log_dir = log_dir
+        self._mode = mode
+        self._handlers = {}
+        os.makedirs(log_dir, exist_ok=True)
+
+    def emit(self, record):
+        cell = getattr(record, 'cell', '-')
+        if cell == '-':
+            return
+        if cell not in self._handlers:
+            handler = logging.FileHandler(path.join(self._log_dir, cell + '.log'), self._mode)
+            handler.setFormatter(self.formatter)
+            self._handlers[cell] = handler
+        self._handlers[cell].emit(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers = {}
+        logging.Handler.close(self)
+
+
+class LogSession(object):
+    """A logging queue with the listener writing its records.
+
+    Records are put on the queue without blocking by every process, the
+    listener thread of the creating process does all file I/O.  The session
+    is stopped at exit if stop() was not called, so no queued record is lost.
+
+    Parameters
+    ----------
+    log_file : str
+        the run log file.  the log of the previous run is rotated to log_file.1.
+    level : int
+        the logging level.
+    fmt : str
+        the record format, may use %(cell)s.
+    cell_dir : str
+        if given, the records of each cell are also written to <cell_dir>/<cell>.log.
+    max_bytes : int
+        rotate the run log when it grows past this size, 0 to never rotate.
+    backup_count : int
+        number of rotated logs kept.
+    stream : bool
+        True to also print the records.
+    """
+
+    def __init__(self, log_file, level=logging.INFO, fmt=DEFAULT_FMT, cell_dir=None,
+                 max_bytes=50 * 1024 * 1024, backup_count=5, stream=False, overwrite=True):
+        self.level = level
+        self.queue = multiprocessing.Queue(-1)
+
+        lead = path.dirname(path.abspath(log_file))
+        os.makedirs(lead, exist_ok=True)
+        formatter = logging.Formatter(fmt or None)
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+        if overwrite and backup_count and path.isfile(log_file) and os.stat(log_file).st_size:
+            # one log per run, keep the previous runs as backups
+            file_handler.doRollover()
+        handlers = [file_handler]
+        if cell_dir is not None:
+            handlers.append(CellFileHandler(cell_dir))
+        if stream:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            handler.addFilter(_CellFilter())
+
+        self._handlers = handlers
+        self._listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self.stop)
+        init_worker_logging(self.queue, level)
+
+    def stop(self):
+        """
+            write out the queued records, then close the log files.
+        """
+
+        if self._listener is not None:
+            atexit.unregister(self.stop)
+            self._listener.stop()
+            self._listener = None
+            for handler in self._handlers:
+                handler.close()
+            _remove_queue_handlers(logging.getLogger(LOGGER_NAME))
+
+
+def _remove_queue_handlers(logger):
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler):
+            logger.removeHandler(handler)
+
+
+def init_worker_logging(queue, level=logging.INFO):
+    """
+        send the records of this process to queue, safe to call more than once.
+
+        use as (part of) a process pool initializer with the LogSession queue.
+    """
+
+    logger = logging.getLogger(LOGGER_NAME)
+    _remove_queue_handlers(logger)
+    logger.addHandler(QueueHandler(queue))
+    logger.setLevel(level)
+    # the listener writes the records, do not pass them on to the root handlers as well
+    logger.propagate = False
+
+
+def get_logger(name=None, cell=None):
+    """
+        return a logger sending to the session queue, tagged with cell if given.
+    """
+
+    logger = logging.getLogger(LOGGER_NAME if name is None else '%s.%s' % (LOGGER_NAME, name))
+    if cell is None:
+        return logger
+    return logging.LoggerAdapter(logger, dict(cell=cell))
@@ -0,0 +1,179 @@
+import os
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+PLOT_FUNCS = {
+    ('linear', 'linear'): 'plot',
+    ('log', 'linear'): 'semilogx',
+    ('linear', 'log'): 'semilogy',
+    ('log', 'log'): 'loglog',
+}
+
+# plot job defaults, same meaning as the plot_generic() arguments
+JOB_DEFAULTS = dict(
+    title_str='',
+    legend_list=None,
+    xlabel_str='',
+    ylabel_str='',
+    xscale='linear',
+    yscale='linear',
+    plot_style_str='-',
+    xlim=None,
+    ylim=None,
+    linewidth=1.5,
+    fontsize=15,
+    figsize=(6.4, 4.8),
+    dpi=100,
+    formats=('png',),
+    decimate='minmax',
+)
+
+
+def get_plot_func(xscale, yscale):
+    if (xscale, yscale) not in PLOT_FUNCS:
+        raise Exception('xscale = %s, yscale = %s, both should be linear or log!!' % (xscale, yscale))
+    return PLOT_FUNCS[(xscale, yscale)]
+
+
+def get_traces(x, y_list):
+    """
+        return a list of (x, y) traces, following the plot_generic() conventions.
+
+        x can be a list with one x array per y, otherwise all y share x.
+    """
+
+    if isinstance(x, list) and len(x) and isinstance(x[0], (list, np.ndarray)) \
+            and len(x) == len(y_list):
+        return [(np.asarray(xi), np.asarray(yi)) for xi, yi in zip(x, y_list)]
+    x = np.asarray(x)
+    if isinstance(y_list, list):
+        return [(x, np.asarray(y)) for y in y_list]
+    y_list = np.asarray(y_list)
+    if y_list.ndim == 2:
+        return [(x, y) for y in y_list]
+    return [(x, y_list)]
+
+
+def _get_bins(x, num_bins, log=False):
+    # index of the first sample in each of num_bins equal width x bins
+    if log:
+        edges = np.logspace(np.log10(x[0]), np.log10(x[-1]), num_bins + 1)
+    else:
+        edges = np.linspace(x[0], x[-1], num_bins + 1)
+    return np.unique(np.searchsorted(x, edges[:-1]))
+
+
+def decimate_minmax(x, y, num_bins, log=False):
+    """
+        keep the min and max sample of each x bin, in x order.
+
+        x must be increasing.  the envelope of the trace is preserved exactly.
+    """
+
+    if len(x) <= 2 * num_bins:
+        return x, y
+    starts = _get_bins(x, num_bins, log=log)
+    seg_id = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(x))))
+    # sort samples by (segment, y): first of each segment is its min, last its max
+    order = np.lexsort((y, seg_id))
+    seg_start = np.searchsorted(seg_id[order], np.arange(len(starts)))
+    seg_end = np.append(seg_start[1:], len(x)) - 1
+    keep = np.unique(np.concatenate((order[seg_start], order[seg_end])))
+    return x[keep], y[keep]
+
+
+def decimate_lttb(x, y, num_out):
+    """
+        largest-triangle-three-buckets downsampling of a trace to num_out points.
+    """
+
+    num = len(x)
+    if num <= num_out or num_out < 3:
+        return x, y
+    edges = np.linspace(1, num - 1, num_out - 1).astype(int)
+    keep = np.empty(num_out, dtype=int)
+    keep[0] = 0
+    keep[-1] = num - 1
+    prev = 0
+    for idx in range(num_out - 2):
+        start, stop = edges[idx], edges[idx + 1]
+        nstart, nstop = edges[idx + 1], (edges[idx + 2] if idx + 2 < len(edges) else num)
+        avg_x = x[nstart:nstop].mean()
+        avg_y = y[nstart:nstop].mean()
+        # twice the triangle area, the constant factor does not change the argmax
+        area = np.abs((x[prev] - avg_x) * (y[start:stop] - y[prev]) -
+                      (x[prev] - x[start:stop]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        keep[idx + 1] = prev
+    return x[keep], y[keep]
+
+
+def decimate(x, y, num_px, method='minmax', log=False):
+    if method is None or len(x) < 2:
+        return x, y
+    if method == 'minmax':
+        return decimate_minmax(x, y, num_px, log=log)
+    if method == 'lttb':
+        return decimate_lttb(x, y, 2 * num_px)
+    raise ValueError('Unknown decimation method %s, use minmax, lttb or None.' % method)
+
+
+def render_plot(job):
+    """
+        render one plot job on an Agg canvas, returns the list of written files.
+
+        job holds x, y_list and filename (without extension) plus any JOB_DEFAULTS key.
+        pyplot is not used, the caller's backend and open figures are left alone.
+    """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    opts = dict(JOB_DEFAULTS)
+    opts.update(job)
+    plot_name = get_plot_func(opts['xscale'], opts['yscale'])
+    num_px = int(opts['figsize'][0] * opts['dpi'])
+
+    fig = Figure(figsize=opts['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    plot_func = getattr(ax, plot_name)
+    for x, y in get_traces(opts['x'], opts['y_list']):
+        x, y = decimate(x, y, num_px, method=opts['decimate'], log=opts['xscale'] == 'log')
+        plot_func(x, y, opts['plot_style_str'], linewidth=opts['linewidth'])
+
+    if opts['xlim']:
+        ax.set_xlim(opts['xlim'])
+    if opts['ylim']:
+        ax.set_ylim(opts['ylim'])
+    ax.set_xlabel(opts['xlabel_str'], fontsize=opts['fontsize'])
+    ax.set_ylabel(opts['ylabel_str'], fontsize=opts['fontsize'])
+    if opts['title_str']:
+        ax.set_title(opts['title_str'], fontsize=opts['fontsize'])
+    if opts['legend_list']:
+        ax.legend(opts['legend_list'], loc=0)
+    ax.grid(True, which='both')
+    ax.tick_params(axis='both', which='major', labelsize=opts['fontsize'])
+
+    lead = path.dirname(path.abspath(opts['filename']))
+    os.makedirs(lead, exist_ok=True)
+    fnames = []
+    for fmt in opts['formats']:
+        fname = '%s.%s' % (opts['filename'], fmt)
+        fig.savefig(fname, dpi=opts['dpi'], bbox_inches='tight')
+        fnames.append(fname)
+    return fnames
+
+
+def render_plots(jobs, num_proc=None):
+    """
+        render a list of plot jobs in parallel, returns the written files of each job.
+    """
+
+    if num_proc == 1 or len(jobs) <= 1:
+        return [render_plot(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=num_proc) as pool:
+        return list(pool.map(render_plot, jobs))
@@ -0,0 +1,188 @@
+import os
+import json
+import fcntl
+import hashlib
+from os import path
+from time import time
+from contextlib import contextmanager
+
+from xbase_logic_repo.scripts.gen_cache import normalize_params
+
+
+def get_param_hash(params):
+    """
+        return a short stable hash of a parameter dictionary.
+    """
+
+    if params is None:
+        return None
+    content = json.dumps(normalize_params(params), sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+class ResultsStore(object):
+    """An append-only JSON Lines results log.
+
+    Every append is a single write of one line, so concurrent writers never
+    interleave records.  The latest record of each (cell, corner, param_hash)
+    key is indexed by file offset, and compaction rewrites the log keeping
+    only those.
+
+    Parameters
+    ----------
+    fname : str
+        the log file name.
+    compact_every : int
+        compact after this many appends from this object.  0 to disable.
+    fsync : bool
+        True to fsync after every append.
+    """
+
+    def __init__(self, fname, compact_every=1000, fsync=False):
+        self._fname = fname
+        self._lock_fname = fname + '.lock'
+        self._compact_every = compact_every
+        self._fsync = fsync
+        self._num_append = 0
+        self._index = {}
+        self._scan_pos = 0
+        self._scan_ino = None
+
+        lead = path.dirname(path.abspath(fname))
+        os.makedirs(lead, exist_ok=True)
+
+    @property
+    def fname(self):
+        return self._fname
+
+    @contextmanager
+    def _lock(self, exclusive):
+        with open(self._lock_fname, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def append(self, data, cell=None, corner=None, params=None, param_hash=None):
+        """
+            append one record, returns its param hash.
+        """
+
+        if param_hash is None:
+            param_hash = get_param_hash(params)
+        record = dict(cell=cell, corner=corner, param_hash=param_hash, params=params,
+                      time=time(), data=data)
+        line = (json.dumps(normalize_params(record)) + '\n').encode('utf-8')
+
+        with self._lock(False):
+            fd = os.open(self._fname, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                if self._fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self._num_append += 1
+        if self._compact_every and self._num_append % self._compact_every == 0:
+            self.compact()
+        return param_hash
+
+    def clear(self):
+        with self._lock(True):
+            open(self._fname, 'w').close()
+        self._index = {}
+        self._scan_pos = 0
+
+    def _refresh(self):
+        with self._lock(False):
+            self._scan()
+
+    def _scan(self):
+        # index the records appended since the last scan, restart if the log was compacted
+        if not path.isfile(self._fname):
+            self._index = {}
+            self._scan_pos = 0
+            return
+
+        with open(self._fname, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self._scan_ino or stat.st_size < self._scan_pos:
+                self._index = {}
+                self._scan_pos = 0
+                self._scan_ino = stat.st_ino
+            f.seek(self._scan_pos)
+            pos = self._scan_pos
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # partially written record, pick it up next time
+                    break
+                record = json.loads(line)
+                key = (record['cell'], record['corner'], record['param_hash'])
+                self._index.pop(key, None)
+                self._index[key] = pos
+                pos += len(line)
+            self._scan_pos = pos
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def keys(self):
+        self._refresh()
+        return list(self._index)
+
+    def query(self, cell=None, corner=None, param_hash=None):
+        """
+            return the latest records matching every given field, oldest first.
+        """
+
+        with self._lock(False):
+            self._scan()
+            offsets = [offset for (rec_cell, rec_corner, rec_hash), offset in self._index.items()
+                       if (cell is None or rec_cell == cell) and
+                       (corner is None or rec_corner == corner) and
+                       (param_hash is None or rec_hash == param_hash)]
+            if not offsets:
+                return []
+            with open(self._fname, 'rb') as f:
+                return [self._read_at(f, offset) for offset in offsets]
+
+    def get(self, cell=None, corner=None, params=None):
+        records = self.query(cell=cell, corner=corner, param_hash=get_param_hash(params))
+        return records[-1] if records else None
+
+    def merged(self, **kwargs):
+        """
+            return the data of the latest matching records merged in append order.
+        """
+
+        result = {}
+        for record in self.query(**kwargs):
+            result.update(record['data'])
+        return result
+
+    def compact(self):
+        """
+            rewrite the log with only the latest record of each key.
+        """
+
+        with self._lock(True):
+            self._scan()
+            if not path.isfile(self._fname):
+                return
+            tmp_name = '%s.tmp%d' % (self._fname, os.getpid())
+            index = {}
+            with open(self._fname, 'rb') as fin, open(tmp_name, 'wb') as fout:
+                for key, offset in self._index.items():
+                    fin.seek(offset)
+                    index[key] = fout.tell()
+                    fout.write(fin.readline())
+                fout.flush()
+                os.fsync(fout.fileno())
+            os.replace(tmp_name, self._fname)
+            stat = os.stat(self._fname)
+            self._index = index
+            self._scan_pos = stat.st_size
+            self._scan_ino = stat.st_ino
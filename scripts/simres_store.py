@@ -0,0 +1,400 @@
+import os
+import json
+import shutil
+from os import path
+from itertools import product
+
+import numpy as np
+
+
+INDEX_NAME = 'index.json'
+DATA_DIR = 'data'
+SWEEP_DIR = 'sweep'
+VERSION = 1
+
+
+def _to_list(val):
+    return np.asarray(val).tolist()
+
+
+class SimResWriter(object):
+    """Writes simulation results in the columnar format read by SimResStore.
+
+    Every signal is stored as one .npy file per sweep point, the last axis of
+    a signal (time, freq, ...) is kept whole in that file.  Numeric sweep
+    values are stored as .npy files, others (corners) in the index.  When the
+    x axis differs between sweep points, it is written as a signal of its own,
+    with one x vector per point.
+
+    Parameters
+    ----------
+    out_dir : str
+        the output directory, its previous content is removed.
+    """
+
+    def __init__(self, out_dir):
+        self._out_dir = out_dir
+        self._signals = {}
+        self._sweep_values = {}
+        if path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+        os.makedirs(path.join(out_dir, DATA_DIR))
+        os.makedirs(path.join(out_dir, SWEEP_DIR))
+
+    @property
+    def signals(self):
+        return list(self._signals)
+
+    @property
+    def sweeps(self):
+        return list(self._sweep_values)
+
+    def set_sweep(self, name, values):
+        values = np.asarray(values)
+        if values.dtype.kind in 'biuf':
+            fname = path.join(SWEEP_DIR, name + '.npy')
+            np.save(path.join(self._out_dir, fname), values)
+            self._sweep_values[name] = dict(file=fname)
+        else:
+            self._sweep_values[name] = dict(values=_to_list(values))
+
+    def add_signal(self, signal, sweep_names, sweep_shape):
+        """
+            declare a signal swept over sweep_names, sweep_shape excludes the last axis.
+        """
+
+        if len(sweep_names) != len(sweep_shape) + 1:
+            raise ValueError('signal %s needs one sweep name per axis' % signal)
+        os.makedirs(path.join(self._out_dir, DATA_DIR, signal), exist_ok=True)
+        self._signals[signal] = dict(sweep=list(sweep_names), shape=list(sweep_shape), dtype=None, num=None)
+
+    def write(self, signal, point, data):
+        """
+            write the last axis of a signal at one sweep point (a tuple of indices).
+        """
+
+        info = self._signals[signal]
+        data = np.ascontiguousarray(data)
+        if info['dtype'] is None:
+            info['dtype'] = data.dtype.str
+        # last axis length shared by all points, -1 once two points differ
+        if info['num'] is None:
+            info['num'] = len(data)
+        elif info['num'] != len(data):
+            info['num'] = -1
+        flat_idx = int(np.ravel_multi_index(point, info['shape'])) if info['shape'] else 0
+        np.save(path.join(self._out_dir, DATA_DIR, signal, '%d.npy' % flat_idx), data)
+
+    def get_length(self, signal):
+        """
+            return the last axis length shared by every point written so far, None if
+            nothing was written or if the points differ.
+        """
+
+        num = self._signals[signal]['num']
+        return None if num is None or num < 0 else num
+
+    def add_array(self, signal, sweep_names, data):
+        """
+            declare a signal and write all its sweep points from one array.
+        """
+
+        data = np.asarray(data)
+        if data.ndim == 0:
+            data = data.reshape(1)
+            sweep_names = list(sweep_names) + ['']
+        self.add_signal(signal, sweep_names, data.shape[:-1])
+        for point in product(*(range(n) for n in data.shape[:-1])):
+            self.write(signal, point, data[point])
+
+    def close(self):
+        index = dict(version=VERSION, signals=self._signals, sweep_values=self._sweep_values)
+        tmp_name = path.join(self._out_dir, INDEX_NAME + '.tmp')
+        with open(tmp_name, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_name, path.join(self._out_dir, INDEX_NAME))
+
+
+class SimResStore(object):
+    """Lazy reader of columnar simulation results.
+
+    Only the index is read on open.  Signal data is memory mapped per sweep
+    point when requested, so unused signals and sweep points are never read.
+    The object also behaves like the dictionary returned by
+    bag.data.load_sim_results, assembling whole signals on item access.
+
+    Parameters
+    ----------
+    out_dir : str
+        the columnar result directory.
+    """
+
+    def __init__(self, out_dir):
+        self._out_dir = out_dir
+        with open(path.join(out_dir, INDEX_NAME), 'r') as f:
+            index = json.load(f)
+        self._signals = index['signals']
+        self._sweep_values = index['sweep_values']
+
+    @property
+    def signals(self):
+        return list(self._signals)
+
+    @property
+    def sweeps(self):
+        """the names of the sweeps with stored values."""
+        return list(self._sweep_values)
+
+    def get_info(self, signal):
+        """
+            return a copy of the index entry of a signal: its sweep names, including the
+            last axis, the shape of its sweep points, its dtype and its last axis length
+            (-1 if the points differ).
+        """
+
+        info = self._signals[signal]
+        return dict(sweep=list(info['sweep']), shape=list(info['shape']), dtype=info['dtype'],
+                    num=info.get('num', None))
+
+    def sweep_names(self, signal):
+        # scalar signals are stored with a dummy '' last axis
+        return [name for name in self._signals[signal]['sweep'] if name]
+
+    def sweep_values(self, name):
+        info = self._sweep_values[name]
+        if 'file' in info:
+            return np.load(path.join(self._out_dir, info['file']), mmap_mode='r')
+        return info['values']
+
+    def find(self, name, value):
+        """
+            return the index of value on sweep name.
+        """
+
+        values = self.sweep_values(name)
+        if isinstance(values, list):
+            return values.index(value)
+        return int(np.argmin(np.abs(np.asarray(values) - value)))
+
+    def get_x(self, signal, point):
+        """
+            return the x axis of a signal at one sweep point, None for scalar signals.
+
+            the x axis is either a sweep, shared by all points, or a signal with one x
+            vector per sweep point.
+        """
+
+        sweep = self._signals[signal]['sweep']
+        x_name = sweep[-1]
+        if not x_name:
+            return None
+        if x_name not in self._signals:
+            return self.sweep_values(x_name)
+        x_point = tuple(point[sweep.index(name)] for name in self._signals[x_name]['sweep'][:-1])
+        return self.get_point(x_name, x_point)
+
+    def get_point(self, signal, point):
+        """
+            return the memory mapped last axis of a signal at one sweep point.
+        """
+
+        shape = self._signals[signal]['shape']
+        flat_idx = int(np.ravel_multi_index(point, shape)) if shape else 0
+        return np.load(path.join(self._out_dir, DATA_DIR, signal, '%d.npy' % flat_idx), mmap_mode='r')
+
+    def get(self, signal, x_slice=None, x=None, **sel):
+        """
+            return a signal restricted to the selected sweep points.
+
+            sel maps sweep names to an index, a slice or a list of indices, unselected
+            sweeps are kept whole.  x_slice restricts the last axis.  axes selected by
+            a single index are dropped, as in numpy indexing.
+
+            with x, every point is linearly resampled on x using its own x axis.  that
+            is required when the points have different x axes, e.g. adaptive time steps.
+        """
+
+        info = self._signals[signal]
+        axes = []
+        keep = []
+        for name, num in zip(info['sweep'][:-1], info['shape']):
+            idx = sel.pop(name, slice(None))
+            if isinstance(idx, slice):
+                axes.append(range(num)[idx])
+                keep.append(True)
+            elif isinstance(idx, (list, tuple, np.ndarray)):
+                axes.append(list(idx))
+                keep.append(True)
+            else:
+                axes.append([int(idx)])
+                keep.append(False)
+        if sel:
+            raise ValueError('signal %s is not swept over %s' % (signal, ', '.join(sel)))
+
+        if x is not None:
+            if x_slice is not None:
+                raise ValueError('x_slice and x cannot be used together')
+            chunks = [np.interp(x, self.get_x(signal, point), self.get_point(signal, point))
+                      for point in product(*axes)]
+        else:
+            x_slice = slice(None) if x_slice is None else x_slice
+            chunks = [self.get_point(signal, point)[x_slice] for point in product(*axes)]
+            if len({chunk.shape[0] for chunk in chunks}) > 1:
+                raise ValueError('signal %s has a different %s axis at each sweep point, '
+                                 'resample it with x' % (signal, info['sweep'][-1]))
+        out_shape = [len(ax) for ax, k in zip(axes, keep) if k]
+        if not chunks:
+            return np.empty(out_shape + [0])
+        return np.stack(chunks).reshape(out_shape + [chunks[0].shape[0]])
+
+    def keys(self):
+        return list(self._signals) + list(self._sweep_values) + ['sweep_params']
+
+    def __contains__(self, key):
+        return key in self._signals or key in self._sweep_values or key == 'sweep_params'
+
+    def __getitem__(self, key):
+        if key == 'sweep_params':
+            return {signal: self.sweep_names(signal) for signal in self._signals}
+        if key in self._signals:
+            if not self._signals[key]['sweep'][-1]:
+                return self.get(key)[..., 0]
+            return self.get(key)
+        return self.sweep_values(key)
+
+
+def _same_values(val0, val1):
+    if isinstance(val0, list) or isinstance(val1, list):
+        return list(val0) == list(val1)
+    return np.array_equal(val0, val1)
+
+
+def merge_simres(sub_dirs, axis_name, axis_values, out_dir):
+    """
+        merge result sets that each hold one point of axis_name into out_dir.
+
+        axis_name must be the first sweep of every signal.  other sweeps must have
+        the same values in every set, x axes that differ between sets have to be
+        stored per point, as run_sweep() does.  signals missing from a set, or sets
+        without results, read as NaN.
+    """
+
+    stores = [SimResStore(sub_dir) if path.isfile(path.join(sub_dir, INDEX_NAME)) else None
+              for sub_dir in sub_dirs]
+    writer = SimResWriter(out_dir)
+    writer.set_sweep(axis_name, axis_values)
+
+    # sweep name -> values, signal -> (sweep names, shape of one set)
+    sweeps = {}
+    signals = {}
+    for store in stores:
+        if store is None:
+            continue
+        for name in store.sweeps:
+            if name == axis_name:
+                continue
+            values = store.sweep_values(name)
+            if name not in sweeps:
+                sweeps[name] = values
+                writer.set_sweep(name, values)
+            elif not _same_values(sweeps[name], values):
+                raise ValueError('sweep %s differs between the sets of %s' % (name, axis_name))
+        for signal in store.signals:
+            info = store.get_info(signal)
+            if info['sweep'][0] != axis_name:
+                raise ValueError('signal %s is not swept over %s first' % (signal, axis_name))
+            sub_info = (info['sweep'], info['shape'][1:])
+            if signals.setdefault(signal, sub_info) != sub_info:
+                raise ValueError('signal %s is not swept the same way in every set' % signal)
+
+    num_sets = len(sub_dirs)
+    for signal, (sweep, sub_shape) in signals.items():
+        writer.add_signal(signal, sweep, [num_sets] + sub_shape)
+        sub_points = list(product(*(range(n) for n in sub_shape)))
+        missing = []
+        for set_idx, store in enumerate(stores):
+            if store is not None and signal in store.signals:
+                for sub_point in sub_points:
+                    writer.write(signal, (set_idx,) + sub_point, store.get_point(signal, (0,) + sub_point))
+            else:
+                missing.append(set_idx)
+        # as long as the shared x sweep, or as the other points if they all agree
+        if sweep[-1] in sweeps:
+            num = len(sweeps[sweep[-1]])
+        else:
+            num = writer.get_length(signal) or 1
+        for set_idx in missing:
+            for sub_point in sub_points:
+                writer.write(signal, (set_idx,) + sub_point, np.full(num, np.nan))
+    writer.close()
+
+
+def get_x_names(sweep_params):
+    """
+        return the sweep names used as a waveform axis (time, freq, ...) in sweep_params.
+
+        an x axis is only ever the last sweep of a signal, and never the corner.  a
+        sweep that some signal has before its last axis is a parameter sweep.
+    """
+
+    last_names = {names[-1] for names in sweep_params.values() if names}
+    swp_names = {name for names in sweep_params.values() for name in names[:-1]}
+    return last_names - swp_names - {'corner'}
+
+
+def convert_simres(results, out_dir, x_names=None):
+    """
+        write a bag.data.load_sim_results dictionary in the columnar format.
+
+        signals whose last sweep is not in x_names, get_x_names() by default, are
+        swept scalars.  they are stored with the dummy '' last axis, one value per
+        sweep point.
+    """
+
+    sweep_params = results['sweep_params']
+    if x_names is None:
+        x_names = get_x_names(sweep_params)
+    writer = SimResWriter(out_dir)
+    swp_names = set()
+    for signal, names in sweep_params.items():
+        data = np.asarray(results[signal])
+        if data.ndim != len(names):
+            raise ValueError('signal %s has %d axes but %d sweeps' % (signal, data.ndim, len(names)))
+        if names and names[-1] not in x_names:
+            # pure sweep signal, keep every sweep as a sweep axis
+            writer.add_array(signal, list(names) + [''], data[..., np.newaxis])
+        else:
+            writer.add_array(signal, names, data)
+        swp_names.update(names)
+    for name in swp_names:
+        if name in results:
+            writer.set_sweep(name, results[name])
+    writer.close()
+
+
+def open_simres(sim_dir, out_dir=None):
+    """
+        return a lazy SimResStore of sim_dir, converting it on first use.
+
+        the conversion is redone when any file of sim_dir is newer than the index.
+    """
+
+    if out_dir is None:
+        out_dir = path.join(sim_dir, 'columnar')
+    index_file = path.join(out_dir, INDEX_NAME)
+
+    if path.isfile(index_file):
+        index_mtime = os.stat(index_file).st_mtime
+        stale = False
+        for root, dirs, files in os.walk(sim_dir):
+            if path.abspath(root).startswith(path.abspath(out_dir)):
+                continue
+            if any(os.stat(path.join(root, fname)).st_mtime > index_mtime for fname in files):
+                stale = True
+                break
+        if not stale:
+            return SimResStore(out_dir)
+
+    from bag.data import load_sim_results
+    convert_simres(load_sim_results(sim_dir), out_dir)
+    return SimResStore(out_dir)
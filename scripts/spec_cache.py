@@ -0,0 +1,128 @@
+import os
+import pickle
+import hashlib
+from os import path
+
+
+# keys of a cell block are named <cell>_<suffix>, everything else is global
+CELL_SUFFIXES = ('cell_name', 'tb_cell', 'sch_params', 'lay_params', 'mdl_params',
+                 'sim_envs', 'tb_params', 'opts')
+GLOBAL_NAME = '_global'
+INDEX_NAME = '_index'
+
+
+def load_yaml(fname):
+    """
+        parse a yaml file with the C loader when available, anchors and merge keys resolved.
+    """
+
+    # imported here, workers reading the compiled cache never need yaml
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(fname, 'r') as f:
+        return yaml.load(f, Loader=loader)
+
+
+def get_cache_dir(yaml_file):
+    lead, name = path.split(path.abspath(yaml_file))
+    return path.join(lead, '.%s.cache' % name)
+
+
+def split_specs(specs):
+    """
+        split a spec dictionary into its global entries and one dictionary per cell.
+    """
+
+    cell_names = {key[:-len('_cell_name')] for key in specs if key.endswith('_cell_name')}
+    global_specs = {}
+    cell_specs = {}
+    for key, val in specs.items():
+        for suffix in CELL_SUFFIXES:
+            cell = key[:-len(suffix) - 1]
+            if key.endswith('_' + suffix) and cell in cell_names:
+                cell_specs.setdefault(cell, {})[key] = val
+                break
+        else:
+            global_specs[key] = val
+    return global_specs, cell_specs
+
+
+def _file_hash(fname):
+    with open(fname, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _dump(obj, fname):
+    # write then rename, readers in other processes never see a partial file
+    tmp_name = '%s.tmp%d' % (fname, os.getpid())
+    with open(tmp_name, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_name, fname)
+
+
+def _load(fname):
+    with open(fname, 'rb') as f:
+        return pickle.load(f)
+
+
+def compile_specs(yaml_file):
+    """
+        parse yaml_file once and store its global block and every cell block in the cache.
+    """
+
+    cache_dir = get_cache_dir(yaml_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(yaml_file)
+    global_specs, cell_specs = split_specs(load_yaml(yaml_file))
+
+    _dump(global_specs, path.join(cache_dir, GLOBAL_NAME + '.pkl'))
+    for cell, cell_dict in cell_specs.items():
+        _dump(cell_dict, path.join(cache_dir, cell + '.pkl'))
+    index = dict(mtime=stat.st_mtime_ns, size=stat.st_size, sha256=_file_hash(yaml_file),
+                 cells=sorted(cell_specs))
+    _dump(index, path.join(cache_dir, INDEX_NAME + '.pkl'))
+    return index
+
+
+def get_index(yaml_file):
+    """
+        return the cache index of yaml_file, recompiling the cache if it is stale.
+
+        a changed mtime alone does not recompile if the content hash still matches.
+    """
+
+    index_file = path.join(get_cache_dir(yaml_file), INDEX_NAME + '.pkl')
+    try:
+        index = _load(index_file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return compile_specs(yaml_file)
+
+    stat = os.stat(yaml_file)
+    if index['mtime'] == stat.st_mtime_ns and index['size'] == stat.st_size:
+        return index
+    if index['sha256'] != _file_hash(yaml_file):
+        return compile_specs(yaml_file)
+    index['mtime'] = stat.st_mtime_ns
+    index['size'] = stat.st_size
+    _dump(index, index_file)
+    return index
+
+
+def get_cells(yaml_file):
+    return get_index(yaml_file)['cells']
+
+
+def get_cell_specs(yaml_file, *cells):
+    """
+        return the global entries plus the blocks of the given cells only.
+    """
+
+    index = get_index(yaml_file)
+    cache_dir = get_cache_dir(yaml_file)
+    specs = _load(path.join(cache_dir, GLOBAL_NAME + '.pkl'))
+    for cell in cells:
+        if cell not in index['cells']:
+            raise ValueError('cell %s not found in %s' % (cell, yaml_file))
+        specs.update(_load(path.join(cache_dir, cell + '.pkl')))
+    return specs
@@ -0,0 +1,449 @@
+import os
+import json
+import zlib
+import hashlib
+import traceback
+from os import path
+from time import time, sleep
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from xbase_logic_repo.scripts import timing
+
+
+CORNER_NAME = 'corner'
+CORNER_KEY_NAME = 'cache_key'
+
+# per worker process state
+_worker_backend = None
+
+
+def expand_jobs(tb_params, sim_envs):
+    """
+        expand testbench parameters and corners into a job matrix.
+
+        list values of tb_params are swept, all other values are fixed.  returns
+        (sweep names, sweep values, jobs), the corner is the first sweep and every
+        job holds its index in the matrix, its corner and its scalar parameters.
+    """
+
+    tb_params = tb_params or {}
+    swp_names = sorted(key for key, val in tb_params.items() if isinstance(val, (list, tuple)))
+    fixed = {key: val for key, val in tb_params.items() if key not in swp_names}
+    names = [CORNER_NAME] + swp_names
+    values = [list(sim_envs)] + [list(tb_params[key]) for key in swp_names]
+
+    jobs = []
+    for index in product(*(range(len(vals)) for vals in values)):
+        params = dict(fixed)
+        params.update((name, values[axis][idx]) for axis, (name, idx) in enumerate(zip(names, index)) if axis)
+        corner = values[0][index[0]]
+        # named by corner, so jobs of separately run corners never collide
+        name = '_'.join([str(corner)] + [str(idx) for idx in index[1:]])
+        jobs.append(dict(index=index, name=name, corner=corner, params=params))
+    return names, values, jobs
+
+
+class SimBackend(object):
+    """Interface of the simulators used by the sweep engine.
+
+    A backend is pickled to every worker process, setup() is called there once
+    before its first job.  simulate() returns a dictionary from output name to
+    a scalar or a 1D array, arrays share the x axis named x_name, which is
+    included in the outputs.
+    """
+
+    x_name = 'time'
+
+    def prepare(self):
+        """
+            called once in the main process before the jobs are started.
+        """
+        pass
+
+    def get_cache_key(self):
+        """
+            return a json friendly description of everything the results depend on
+            besides the job, or None if the results must not be cached.
+        """
+        return None
+
+    def setup(self):
+        pass
+
+    def simulate(self, job):
+        raise NotImplementedError
+
+
+class FakeBackend(SimBackend):
+    """A stand-in simulator producing deterministic waveforms, for tests.
+
+    Every job outputs the step response vout over x_name and its delay, both
+    depending on the corner and the parameters.
+
+    Parameters
+    ----------
+    num_points : int
+        number of points of every waveform.
+    sim_time : float
+        seconds of simulated time per job, to mimic the simulator run time.
+    fail : set[str]
+        names of jobs that raise.
+    adaptive : bool
+        True to give every job its own number of points, like a simulator with
+        adaptive time steps.
+    """
+
+    corner_scale = dict(tt=1.0, ff=0.8, ss=1.25, ff_hot=0.85, ss_cold=1.3)
+
+    def __init__(self, num_points=101, sim_time=0.0, fail=None, adaptive=False):
+        self.num_points = num_points
+        self.sim_time = sim_time
+        self.fail = set(fail or [])
+        self.adaptive = adaptive
+
+    def get_cache_key(self):
+        return dict(backend='fake', num_points=self.num_points, fail=sorted(self.fail), adaptive=self.adaptive)
+
+    def simulate(self, job):
+        import numpy as np
+
+        if job['name'] in self.fail:
+            raise RuntimeError('fake simulation %s failed' % job['name'])
+        sleep(self.sim_time)
+
+        seed = zlib.crc32(repr(sorted(job['params'].items())).encode('utf-8')) % 1000
+        delay = 10e-12 * self.corner_scale.get(job['corner'], 1.0) * (1 + seed / 1000)
+        num_points = self.num_points + (seed % 10 if self.adaptive else 0)
+        time_vec = np.linspace(0, 100e-12, num_points)
+        vout = 1 / (1 + np.exp(-(time_vec - delay) / 2e-12))
+        return {self.x_name: time_vec, 'vout': vout, 'delay': delay}
+
+
+class BagBackend(SimBackend):
+    """Simulates a testbench through BAG, one testbench copy per job.
+
+    The testbench schematic is designed once, each job implements a copy named
+    after the job so parallel jobs never share simulator state.
+
+    Parameters
+    ----------
+    temp_lib : str
+        the testbench template library.
+    tb_lib : str
+        the library the testbenches are implemented in.
+    impl_lib : str
+        the library of the device under test.
+    dut_cell : str
+        the device under test cell.
+    tb_cell : str
+        the testbench template cell.
+    sim_view : str
+        the simulation view of the device under test.
+    tb_sch_params : dict
+        the testbench schematic parameters.
+    outputs : dict
+        output name to expression, all outputs of the testbench if None.
+    x_name : str
+        the sweep name of the waveform x axis, time or freq.
+    prj : bag.core.BagProject
+        the project used when jobs run in this process, workers create their own.
+    """
+
+    def __init__(self, temp_lib, tb_lib, impl_lib, dut_cell, tb_cell, sim_view='schematic',
+                 tb_sch_params=None, outputs=None, x_name='time', prj=None):
+        self.temp_lib = temp_lib
+        self.tb_lib = tb_lib
+        self.impl_lib = impl_lib
+        self.dut_cell = dut_cell
+        self.tb_cell = tb_cell
+        self.sim_view = sim_view
+        self.tb_sch_params = tb_sch_params or {}
+        self.outputs = outputs
+        self.x_name = x_name
+        self._prj = prj
+        self._tb_sch = None
+
+    def __getstate__(self):
+        # the project stays in the process that created it
+        state = dict(self.__dict__)
+        state['_prj'] = None
+        state['_tb_sch'] = None
+        return state
+
+    def get_cache_key(self):
+        from xbase_logic_repo.scripts import gen_cache
+
+        # results are only reusable for a known generation of the device under test
+        gen_key = gen_cache.get_cell_key(self.impl_lib, self.dut_cell)
+        if gen_key is None:
+            return None
+        return dict(backend='bag', temp_lib=self.temp_lib, tb_cell=self.tb_cell, dut_gen_key=gen_key,
+                    sim_view=self.sim_view, tb_sch_params=self.tb_sch_params, outputs=self.outputs,
+                    x_name=self.x_name)
+
+    def setup(self):
+        if self._prj is None:
+            import bag.core
+            print('creating BAG project in worker %d' % os.getpid())
+            self._prj = bag.core.BagProject()
+        self._tb_sch = self._prj.create_design_module(self.temp_lib, self.tb_cell)
+        self._tb_sch.design(dut_lib=self.impl_lib, dut_cell=self.dut_cell, **self.tb_sch_params)
+
+    def simulate(self, job):
+        from bag.data import load_sim_results
+
+        tb_name = '%s_%s' % (self.tb_cell, job['name'])
+        self._tb_sch.implement_design(self.tb_lib, top_cell_name=tb_name)
+        tb = self._prj.configure_testbench(self.tb_lib, tb_name)
+        for param, value in job['params'].items():
+            tb.set_parameter(param, value)
+        tb.set_simulation_environments([job['corner']])
+        tb.set_simulation_view(self.impl_lib, self.dut_cell, self.sim_view)
+        for key, expr in (self.outputs or {}).items():
+            tb.add_output(key, expr)
+        tb.update_testbench()
+        tb.run_simulation()
+
+        results = load_sim_results(tb.save_dir)
+        names = list(self.outputs) if self.outputs else [key for key in results['sweep_params']]
+        outputs = {}
+        for name in names:
+            # single corner, drop the corner axis
+            sweep = results['sweep_params'][name]
+            data = results[name]
+            if sweep and sweep[0] == CORNER_NAME:
+                data = data[0]
+            outputs[name] = data
+            for swp_name in sweep:
+                if swp_name != CORNER_NAME and swp_name in results:
+                    outputs[swp_name] = results[swp_name]
+        return outputs
+
+
+def _init_worker(backend):
+    global _worker_backend
+    _worker_backend = backend
+    backend.setup()
+
+
+def _run_job(job):
+    """
+        worker entry point, returns (job, outputs, error message, timing events).
+    """
+
+    outputs, err = None, None
+    try:
+        with timing.span('simulate', cell=job['name'], corner=job['corner']):
+            outputs = _worker_backend.simulate(job)
+    except Exception:
+        err = traceback.format_exc()
+    return job, outputs, err, timing.pop_events()
+
+
+class _SweepWriter(object):
+    # declares signals as they first appear and writes every job point as it arrives.
+    # the x axis of each job is stored as a signal too, simulators with adaptive steps
+    # return a different time vector for every job.
+    def __init__(self, out_dir, names, values, x_name):
+        from xbase_logic_repo.scripts.simres_store import SimResWriter
+
+        self._writer = SimResWriter(out_dir)
+        self._names = names
+        self._shape = [len(vals) for vals in values]
+        self._x_name = x_name
+        self._written = {}
+        for name, vals in zip(names, values):
+            self._writer.set_sweep(name, vals)
+
+    def write(self, job, outputs):
+        import numpy as np
+
+        x_len = np.size(outputs[self._x_name]) if self._x_name in outputs else None
+        for signal, data in outputs.items():
+            is_wave = np.ndim(data) > 0
+            data = np.asarray(data).reshape(-1)
+            if is_wave and signal != self._x_name and len(data) != x_len:
+                raise ValueError('job %s: %s has %d points but %s has %s' % (job['name'], signal, len(data),
+                                                                            self._x_name, x_len))
+            if signal not in self._written:
+                last = self._x_name if is_wave else ''
+                self._writer.add_signal(signal, self._names + [last], self._shape)
+                self._written[signal] = set()
+            self._writer.write(signal, job['index'], data)
+            self._written[signal].add(job['index'])
+
+    def close(self):
+        import numpy as np
+
+        # points of failed jobs read as NaN, as long as the other points if they all agree
+        for signal, written in self._written.items():
+            num = self._writer.get_length(signal) or 1
+            for index in product(*(range(n) for n in self._shape)):
+                if index not in written:
+                    self._writer.write(signal, index, np.full(num, np.nan))
+        self._writer.close()
+
+
+def _run_job_sets(job_sets, backend, num_proc):
+    # run the jobs of every (writer, jobs) set in one pool, returns one error dictionary per set.
+    # a single job runs in this process, a pool would only add its start up and a new backend
+    errors = [{} for _ in job_sets]
+
+    def collect(set_idx, job, outputs, err, events):
+        timing.add_events(events)
+        if err is None:
+            job_sets[set_idx][0].write(job, outputs)
+        else:
+            print('simulation %s failed:\n%s' % (job['name'], err))
+            errors[set_idx][job['name']] = err
+
+    if num_proc == 1 or sum(len(jobs) for _, jobs in job_sets) <= 1:
+        _init_worker(backend)
+        for set_idx, (_, jobs) in enumerate(job_sets):
+            for job in jobs:
+                collect(set_idx, *_run_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=num_proc, initializer=_init_worker, initargs=(backend,)) as pool:
+            futures = {pool.submit(_run_job, job): set_idx
+                       for set_idx, (_, jobs) in enumerate(job_sets) for job in jobs}
+            for fut in as_completed(futures):
+                collect(futures[fut], *fut.result())
+    for writer, _ in job_sets:
+        writer.close()
+    return errors
+
+
+def _print_sweep(names, values, num_jobs):
+    print('running %d simulations over %s' % (num_jobs, ', '.join('%s[%d]' % (name, len(vals))
+                                                                  for name, vals in zip(names, values))))
+
+
+def run_sweep(jobs_info, backend, out_dir, num_proc=None):
+    """
+        run every job of expand_jobs() output and stream the results into out_dir.
+
+        jobs run in a process pool of num_proc workers, or in this process if num_proc
+        is 1 or there is a single job.  failed jobs do not stop the sweep.  returns (SimResStore, {job name: error}).
+    """
+
+    from xbase_logic_repo.scripts.simres_store import SimResStore
+
+    names, values, jobs = jobs_info
+    _print_sweep(names, values, len(jobs))
+    start_time = time()
+    backend.prepare()
+    errors = _run_job_sets([(_SweepWriter(out_dir, names, values, backend.x_name), jobs)],
+                           backend, num_proc)[0]
+
+    elapsed = time() - start_time
+    print('%d of %d simulations passed in %.1fs' % (len(jobs) - len(errors), len(jobs), elapsed))
+    return SimResStore(out_dir), errors
+
+
+def get_corner_key(backend, tb_params, corner):
+    """
+        return the cache key of one corner of a sweep, None if it cannot be cached.
+    """
+
+    from xbase_logic_repo.scripts.gen_cache import normalize_params
+
+    backend_key = backend.get_cache_key()
+    if backend_key is None:
+        return None
+    content = json.dumps(normalize_params(dict(backend=backend_key, tb_params=tb_params or {},
+                                               corner=corner)), sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def run_corners(tb_params, sim_envs, backend, out_dir, num_proc=None, use_cache=True):
+    """
+        run every corner as an independent sweep and merge them along the corner axis.
+
+        the jobs of all corners share one process pool.  each corner is kept in
+        <out_dir>.corners/<corner>, with use_cache a corner is only simulated again if
+        its parameters, backend or device under test changed, or if it had failures.
+        returns (SimResStore, {job name: error}).
+    """
+
+    from xbase_logic_repo.scripts.simres_store import SimResStore, INDEX_NAME, merge_simres
+
+    corner_root = out_dir + '.corners'
+    corner_dirs = [path.join(corner_root, str(corner)) for corner in sim_envs]
+    keys = [get_corner_key(backend, tb_params, corner) for corner in sim_envs]
+
+    job_sets = []
+    run_idx = []
+    for idx, (corner, corner_dir, key) in enumerate(zip(sim_envs, corner_dirs, keys)):
+        key_file = path.join(corner_dir, CORNER_KEY_NAME)
+        if use_cache and key is not None and path.isfile(path.join(corner_dir, INDEX_NAME)) and \
+                path.isfile(key_file):
+            with open(key_file, 'r') as f:
+                if f.read() == key:
+                    print('corner %s is up to date, skip simulation' % corner)
+                    continue
+        names, values, jobs = expand_jobs(tb_params, [corner])
+        job_sets.append((_SweepWriter(corner_dir, names, values, backend.x_name), jobs))
+        run_idx.append(idx)
+
+    errors = {}
+    if job_sets:
+        num_jobs = sum(len(jobs) for _, jobs in job_sets)
+        names, values, _ = expand_jobs(tb_params, [sim_envs[idx] for idx in run_idx])
+        _print_sweep(names, values, num_jobs)
+        start_time = time()
+        backend.prepare()
+        set_errors = _run_job_sets(job_sets, backend, num_proc)
+        for idx, corner_errors in zip(run_idx, set_errors):
+            errors.update(corner_errors)
+            # only corners without failures are reused
+            if not corner_errors and keys[idx] is not None:
+                with open(path.join(corner_dirs[idx], CORNER_KEY_NAME), 'w') as f:
+                    f.write(keys[idx])
+        print('%d of %d simulations passed in %.1fs' % (num_jobs - len(errors), num_jobs, time() - start_time))
+
+    merge_simres(corner_dirs, CORNER_NAME, list(sim_envs), out_dir)
+    return SimResStore(out_dir), errors
+
+
+def get_bag_backend(specs, cell, prj=None):
+    """
+        return the BAG backend of a cell, from its spec entries.
+    """
+
+    return BagBackend(specs['temp_lib'], specs['tb_lib'], specs['impl_lib'], specs[cell + '_cell_name'],
+                      specs[cell + '_tb_cell'], sim_view=specs.get('sim_view', 'schematic'),
+                      tb_sch_params=specs.get(cell + '_tb_sch_params', None),
+                      outputs=specs.get(cell + '_tb_outputs', None),
+                      x_name=specs.get(cell + '_tb_x_name', 'time'), prj=prj)
+
+
+def get_out_dir(specs, cell):
+    return path.join(specs.get('sim_dir', 'sim_results'), specs[cell + '_cell_name'])
+
+
+if __name__ == '__main__':
+    import argparse
+    from xbase_logic_repo.scripts.spec_cache import get_cell_specs
+    from xbase_logic_repo.scripts._misc import simulate
+
+    parser = argparse.ArgumentParser(description='Run the corner sweeps of bag_xbase_logic cells.')
+    parser.add_argument('cells', help='comma separated cells')
+    parser.add_argument('--specs', default='bag_xbase_logic/specs/logic_parameters.yaml', help='spec yaml file')
+    parser.add_argument('--corners', default=None, help='comma separated corners, overrides <cell>_sim_envs')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--no-cache', action='store_true', help='simulate every corner again')
+    parser.add_argument('--fake', action='store_true', help='use the fake simulator')
+    args = parser.parse_args()
+
+    failed = []
+    for cell_arg in args.cells.split(','):
+        cell_specs = get_cell_specs(args.specs, cell_arg)
+        if args.corners:
+            cell_specs[cell_arg + '_sim_envs'] = args.corners.split(',')
+        sim_backend = FakeBackend() if args.fake else None
+        _, sim_errors = simulate(None, cell_specs, cell_arg, backend=sim_backend, num_proc=args.jobs,
+                                 per_corner=True, use_cache=not args.no_cache)
+        failed.extend(sim_errors)
+    if failed:
+        raise Exception('failed simulations: %s' % ', '.join(failed))
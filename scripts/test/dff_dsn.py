@@ -1,12 +1,12 @@
 import bag.core
 from xbase_logic_repo.src.xbase_logic_repo.layout.dff import DFF
-from bag.io.file import read_yaml
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs
 from xbase_logic_repo.scripts._misc import generate, extract, simulate
 
 
 def run_main(prj):
     config_file = 'bag_xbase_logic/specs/logic_parameters.yaml'
-    specs = read_yaml(config_file)
+    specs = get_cell_specs(config_file, 'dff')
 
     # lib and cells
     temp_lib = specs['temp_lib']
@@ -42,7 +42,7 @@ def run_main(prj):
         extract(prj, impl_lib, cell_name)
 
     if run_simulation:
-        simulate(prj)
+        simulate(prj, specs, 'dff')
 
 
 if __name__ == '__main__':
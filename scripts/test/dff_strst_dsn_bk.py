@@ -1,74 +1,12 @@
-import pprint
-import bag
+import bag.core
+from bag_xbase_logic.layout.dff_strst import DFFStRst
+from xbase_logic_repo.scripts.spec_cache import get_cell_specs
+from xbase_logic_repo.scripts._misc import generate, extract, simulate
 
-from xbase_logic_repo.layout.dff_strst import DFFStRst
-from bag.layout import RoutingGrid, TemplateDB
-from bag.data import load_sim_results
-from BAG_framework.bag.io.file import read_yaml
-from xbase_logic_repo.dsn_scripts._misc import make_tdb
 
-import pdb
-
-import numpy as np
-import matplotlib.pyplot as plt
-
-
-def generate(prj, temp_lib, impl_lib, cell_name, lay_params, sch_params, grid_opts, impl_cell_name=None):
-
-    temp_db = make_tdb(prj, impl_lib, grid_opts)
-
-    print('designing module')
-    # layout
-    print(lay_params)
-    template = temp_db.new_template(params=lay_params, temp_cls=DFFStRst, debug=True)
-    if impl_cell_name is None:
-        temp_db.instantiate_layout(prj, template, cell_name, debug=True)
-    else:
-        temp_db.instantiate_layout(prj, template, impl_cell_name, debug=True)
-
-    # schematic
-    if sch_params is None:
-        sch_params = {}
-    sch_params.update(template.sch_params)
-    print(sch_params)
-
-    dsn = prj.create_design_module(temp_lib, cell_name)
-    dsn.design(**sch_params)
-    if impl_cell_name is None:
-        dsn.implement_design(impl_lib, top_cell_name=cell_name)
-    else:
-        dsn.implement_design(impl_lib, top_cell_name=impl_cell_name)
-
-
-def extract(prj):
-    print('running lvs')
-    lvs_passed, lvs_log = prj.run_lvs(impl_lib, cell_name)
-    if not lvs_passed:
-        raise Exception('oops lvs died.  See LVS log file %s' % lvs_log)
-    print('lvs passed')
-
-    # run rcx
-    print('running rcx')
-    rcx_passed, rcx_log = prj.run_rcx(impl_lib, cell_name)
-    if not rcx_passed:
-        raise Exception('oops rcx died.  See RCX log file %s' % rcx_log)
-    print('rcx passed')
-
-
-def simulate(prj):
-    pass
-
-
-if __name__ == '__main__':
-    local_dict = locals()
-    if 'bprj' not in local_dict:
-        print('creating BAG project')
-        bprj = bag.BagProject()
-    else:
-        print('loading BAG project')
-
-    config_file = 'bag_xbase_logic/test/logic_parameters.yaml'
-    specs = read_yaml(config_file)
+def run_main(prj):
+    config_file = 'bag_xbase_logic/specs/logic_parameters.yaml'
+    specs = get_cell_specs(config_file, 'dff_strst')
 
     # lib and cells
     temp_lib = specs['temp_lib']
@@ -77,10 +15,14 @@ if __name__ == '__main__':
     cell_name = specs['dff_strst_cell_name']
     tb_cell = specs['dff_strst_tb_cell']
 
+    # get directories
+    mdl_dir = specs['model_dir']
+
     # parameters
     grid_opts = specs['grid_opts']
     sch_params = specs['dff_strst_sch_params']
     lay_params = specs['dff_strst_lay_params']
+    mdl_params = specs.get('dff_strst_mdl_params', None)
 
     # testbench sweep parameters
     sim_envs = specs['dff_strst_sim_envs']
@@ -93,10 +35,20 @@ if __name__ == '__main__':
 
     print('generating tdb')
     if run_dsn:
-        generate(bprj, temp_lib, impl_lib, cell_name, lay_params, sch_params, grid_opts)
+        generate(prj, temp_lib, impl_lib, cell_name, lay_params, sch_params, mdl_params,
+                 grid_opts, mdl_dir, lay_cls=DFFStRst)
 
     if run_dsn and run_extraction:
-        extract(bprj)
+        extract(prj, impl_lib, cell_name)
 
     if run_simulation:
-        simulate(bprj)
+        simulate(prj, specs, 'dff_strst')
+
+
+if __name__ == '__main__':
+    bprj = locals().get('bprj', None)
+    if bprj is None:
+        print('creating BAG project')
+        bprj = bag.core.BagProject()
+
+    run_main(bprj)
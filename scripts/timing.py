@@ -0,0 +1,106 @@
+import os
+import json
+import threading
+from time import time
+from contextlib import contextmanager
+
+
+# finished spans of this process, in Chrome trace event format
+_events = []
+_local = threading.local()
+
+
+def _get_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, cell=None, **args):
+    """
+        time the enclosed block as one span.
+
+        cell defaults to the cell of the enclosing span, extra keyword arguments
+        are stored with the event.
+    """
+
+    stack = _get_stack()
+    if cell is None and stack:
+        cell = stack[-1]
+    stack.append(cell)
+    start = time()
+    try:
+        yield
+    finally:
+        end = time()
+        stack.pop()
+        args = dict(args)
+        if cell is not None:
+            args['cell'] = cell
+        _events.append(dict(name=name, cat='bag', ph='X', ts=start * 1e6, dur=(end - start) * 1e6,
+                            pid=os.getpid(), tid=threading.get_ident() % (1 << 31), args=args))
+
+
+def get_events():
+    return list(_events)
+
+
+def pop_events():
+    """
+        return and forget the recorded events, used to ship them out of worker processes.
+    """
+
+    events = list(_events)
+    del _events[:]
+    return events
+
+
+def add_events(events):
+    _events.extend(events)
+
+
+def write_trace(fname, events=None):
+    """
+        write the events as a Chrome trace / Perfetto json file.
+    """
+
+    if events is None:
+        events = _events
+    lead = os.path.dirname(os.path.abspath(fname))
+    os.makedirs(lead, exist_ok=True)
+    with open(fname, 'w') as f:
+        json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+
+
+def get_summary(events=None):
+    """
+        return {cell: {phase: [count, total seconds]}}, nested spans are inclusive.
+    """
+
+    if events is None:
+        events = _events
+    summary = {}
+    for event in events:
+        cell = event['args'].get('cell', '')
+        entry = summary.setdefault(cell, {}).setdefault(event['name'], [0, 0.0])
+        entry[0] += 1
+        entry[1] += event['dur'] * 1e-6
+    return summary
+
+
+def print_summary(events=None):
+    summary = get_summary(events)
+    phases = sorted({phase for cell_summary in summary.values() for phase in cell_summary})
+    cell_w = max([len('cell')] + [len(str(cell)) for cell in summary])
+    col_w = max([10] + [len(phase) for phase in phases])
+
+    print(' '.join(['cell'.ljust(cell_w)] + [phase.rjust(col_w) for phase in phases]))
+    for cell in sorted(summary, key=str):
+        cols = []
+        for phase in phases:
+            if phase in summary[cell]:
+                cols.append(('%.2fs' % summary[cell][phase][1]).rjust(col_w))
+            else:
+                cols.append('-'.rjust(col_w))
+        print(' '.join([str(cell).ljust(cell_w)] + cols))
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from setuptools import setup, find_packages
+from setuptools import setup, find_namespace_packages
 
 
 setup(
-    name'bag_xbase_logic',
+    name='bag_xbase_logic',
     version='0.1',
     license='BSD 3-Clause License',
     description='BAG custom digital generators',
@@ -24,6 +24,12 @@ setup(
         'pytest',
         'pytest-xdist',
     ],
-    packages=find_packages('src'),
+    packages=find_namespace_packages('src', include=['bag_xbase_logic', 'bag_xbase_logic.*']),
     package_dir={'': 'src'},
+    entry_points={
+        # cli imports the build scripts from the BAG workspace checkout at run time
+        'console_scripts': [
+            'bag_xbase_logic = bag_xbase_logic.cli:main',
+        ],
+    },
 )
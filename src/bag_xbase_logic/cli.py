@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+# noinspection PyUnresolvedReferences,PyCompatibility
+from builtins import *
+
+
+def main(argv=None):
+    """Entry point of the bag_xbase_logic console script.
+
+    The build scripts are not installed with the package, they are imported
+    from the xbase_logic_repo checkout of the BAG workspace, so the command
+    has to be run from the workspace directory.
+
+    Parameters
+    ----------
+    argv : list[str] or None
+        the command line arguments, sys.argv[1:] if None.
+    """
+    try:
+        from xbase_logic_repo.scripts.build_lib import main as build_main
+    except ImportError as ex:
+        raise SystemExit('bag_xbase_logic: cannot import the build scripts (%s), run it from the BAG '
+                         'workspace with xbase_logic_repo on the path.' % ex)
+    build_main(argv)
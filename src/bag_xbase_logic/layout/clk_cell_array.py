@@ -14,6 +14,7 @@ from bag.layout.routing import TrackID
 from abs_templates_ec.analog_core import AnalogBase, AnalogBaseInfo
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.track_util import get_track_ids
 
 
 class ClkCellArr(AnalogBase):
@@ -181,61 +182,16 @@ class ClkCellArr(AnalogBase):
         ndrain_id = self.make_track_id('nch', 0, 'ds', 0, width=ds_width_ntr)
         pdrain_id = self.make_track_id('pch', 0, 'ds', 0, width=ds_width_ntr)
 
-        # define wire array
-        dum_in_arr = []
-        dum_ctrl_arr = []
-        dum_ctrlb_arr = []
-        clk_i_arr = []
-        clk_q_arr = []
-        clk_ib_arr = []
-        clk_qb_arr = []
-        clko_arr = []
-        ctrli_arr = []
-        ctrli_b_arr = []
-        ctrlq_arr = []
-        ctrlq_b_arr = []
-        ctrlib_arr = []
-        ctrlib_b_arr = []
-        ctrlqb_arr = []
-        ctrlqb_b_arr = []
-
-        # draw dummy
-        inv_in, ng_tinv1, pg_tinv1, tinv_out = self.draw_clk_cell(idx=0, dum=True)
-        dum_in_arr.append(inv_in)
-        dum_ctrl_arr.append(ng_tinv1)
-        dum_ctrlb_arr.append(pg_tinv1)
-
-        inv_in, ng_tinv1, pg_tinv1, tinv_out = self.draw_clk_cell(idx=pi_res+1, dum=True)
-        dum_in_arr.append(inv_in)
-        dum_ctrl_arr.append(ng_tinv1)
-        dum_ctrlb_arr.append(pg_tinv1)
-
-        for i in range(pi_res):
-            # draw clk cell
-            inv_in, ng_tinv1, pg_tinv1, tinv_out = self.draw_clk_cell(idx=i+1)      # 1 is for dummy
-            if i % 4 == 0:
-                clk_i_arr.append(inv_in)
-                ctrli_arr.append(ng_tinv1)
-                ctrli_b_arr.append(pg_tinv1)
-                clko_arr.append(tinv_out)
-            elif i % 4 == 1:
-                clk_q_arr.append(inv_in)
-                ctrlq_arr.append(ng_tinv1)
-                ctrlq_b_arr.append(pg_tinv1)
-                clko_arr.append(tinv_out)
-            elif i % 4 == 2:
-                clk_ib_arr.append(inv_in)
-                ctrlib_arr.append(ng_tinv1)
-                ctrlib_b_arr.append(pg_tinv1)
-                clko_arr.append(tinv_out)
-            else:
-                clk_qb_arr.append(inv_in)
-                ctrlqb_arr.append(ng_tinv1)
-                ctrlqb_b_arr.append(pg_tinv1)
-                clko_arr.append(tinv_out)
+        # draw dummies
+        dum_in_arr, dum_ctrl_arr, dum_ctrlb_arr, _ = self.draw_clk_cells([0, pi_res+1], dum=True)
 
-        ctrl_arr = ctrli_arr + ctrlq_arr + ctrlib_arr + ctrlqb_arr
-        ctrlb_arr = ctrli_b_arr + ctrlq_b_arr + ctrlib_b_arr + ctrlqb_b_arr
+        # draw clk cells, all slices in one pass, 1 is for dummy
+        inv_in, ng_tinv1, pg_tinv1, clko_arr = self.draw_clk_cells(list(range(1, pi_res+1)))
+
+        # slices are interleaved i, q, ib, qb
+        clk_i_arr, clk_q_arr, clk_ib_arr, clk_qb_arr = [inv_in[phase::4] for phase in range(4)]
+        ctrl_arr = [warr for phase in range(4) for warr in ng_tinv1[phase::4]]
+        ctrlb_arr = [warr for phase in range(4) for warr in pg_tinv1[phase::4]]
 
         # connect all clk_i_arr
         idx = self.grid.coord_to_nearest_track(clk_i_arr[0].layer_id+1,
@@ -264,14 +220,13 @@ class ClkCellArr(AnalogBase):
             self.connect_to_tracks(ptap_wire_arrs, dum_in.track_id,
                                    track_upper=dum_in.get_bbox_array(self.grid).top_unit,
                                    unit_mode=True, min_len_mode=0)
-        for dum_ctrl in dum_ctrl_arr:
-            idx = self.grid.coord_to_nearest_track(dum_ctrl.layer_id+1, dum_ctrl.middle)
-            tid = TrackID(dum_ctrl.layer_id+1, idx)
+        dum_gate_arr = dum_ctrl_arr + dum_ctrlb_arr
+        dum_tids = get_track_ids(self.grid, [dum_gate.layer_id+1 for dum_gate in dum_gate_arr],
+                                 [dum_gate.middle for dum_gate in dum_gate_arr])
+        for dum_ctrl, tid in zip(dum_ctrl_arr, dum_tids[:len(dum_ctrl_arr)]):
             self.connect_to_tracks([ptap_wire_arrs[0], dum_ctrl], tid,
                                    track_lower=dum_ctrl.get_bbox_array(self.grid).top_unit, min_len_mode=0)
-        for dum_ctrlb in dum_ctrlb_arr:
-            idx = self.grid.coord_to_nearest_track(dum_ctrlb.layer_id + 1, dum_ctrlb.middle)
-            tid = TrackID(dum_ctrlb.layer_id + 1, idx)
+        for dum_ctrlb, tid in zip(dum_ctrlb_arr, dum_tids[len(dum_ctrl_arr):]):
             self.connect_to_tracks([ntap_wire_arrs[0], dum_ctrlb], tid,
                                    track_lower=dum_ctrlb.get_bbox_array(self.grid).top_unit, min_len_mode=0)
 
@@ -304,75 +259,113 @@ class ClkCellArr(AnalogBase):
         )
 
     def draw_clk_cell(self, idx, dum=False):
+        inv_in, ng_tinv1, pg_tinv1, tinv_out = self.draw_clk_cells([idx], dum=dum)
+        return inv_in[0], ng_tinv1[0], pg_tinv1[0], tinv_out[0]
 
-        # Step1: connect inverter
-        fg_base = ndum_side+(fg_cell+ndum)*idx
-        # group transistors
-        if dum is False:
-            inv_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv, 1, 1, s_net='VSS', d_net='clk_m{}'.format(idx))
-            inv_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv, 1, 1, s_net='VDD', d_net='clk_m{}'.format(idx))
-        else:
-            inv_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv, 1, 1, s_net='VSS', d_net='clk_md{}'.format(idx))
-            inv_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv, 1, 1, s_net='VDD', d_net='clk_md{}'.format(idx))
-
-        # connect gate
-        ng_inv = self.connect_to_tracks(inv_n_ports['g'], ngate_id, min_len_mode=0)
-        pg_inv = self.connect_to_tracks(inv_p_ports['g'], pgate_id, min_len_mode=0)
-        # connect gate vertically
-        vgate_idx = self.grid.coord_to_nearest_track(m5v_layer, ng_inv.middle)
-        vgate_tid = TrackID(m5v_layer, vgate_idx)
-        inv_in = self.connect_to_tracks([ng_inv, pg_inv], vgate_tid, min_len_mode=0)  # input wire
-        # connect drain
-        inv_d_warr = self.connect_to_tracks([inv_n_ports['d'], inv_p_ports['d']], out_id, min_len_mode=0)
-        # connect gate
-        self.connect_to_substrate('ptap', inv_n_ports['s'])
-        self.connect_to_substrate('ntap', inv_p_ports['s'])
-
-        # Step2: connect tri-inverter
-        # group transistors
-        if dum is False:
+    def draw_clk_cells(self, idx_list, dum=False):
+        """Draws the clock cells of the given slices in one pass.
+
+        Every step is done for all slices before the next one, so the vertical
+        tracks are found with one grid query and the sources are connected to
+        the substrate with one call per tap.  The cells all drive clko, so their
+        tri-inverter drains take one horizontal wire and, when the slices sit on
+        evenly spaced tracks, one multi-track vertical wire.
+
+        Returns
+        -------
+        inv_in : list[:class:`bag.layout.routing.WireArray`]
+            the input wire of each slice.
+        ng_tinv1 : list[:class:`bag.layout.routing.WireArray`]
+            the nmos control gate of each slice.
+        pg_tinv1 : list[:class:`bag.layout.routing.WireArray`]
+            the pmos control gate of each slice.
+        tinv_out : list[:class:`bag.layout.routing.WireArray`]
+            the output wire of each dummy slice, or the clko wires of the cells.
+        """
+        ptap_ports = []
+        ntap_ports = []
+        gate_list = []
+        inv_d_list = []
+        ng_tinv1 = []
+        pg_tinv1 = []
+        tinv_d_list = []
+        tinv_d_ports = []
+        for idx in idx_list:
+            # Step1: draw inverter
+            fg_base = ndum_side+(fg_cell+ndum)*idx
+            if dum is False:
+                inv_d_net = 'clk_m{}'.format(idx)
+                ns_net = 'ns_{}'.format(idx)
+                ps_net = 'ps_{}'.format(idx)
+                tinv_d_net = 'clko'
+            else:
+                inv_d_net = 'clk_md{}'.format(idx)
+                ns_net = 'ns_d_{}'.format(idx)
+                ps_net = 'ps_d_{}'.format(idx)
+                tinv_d_net = ''     # d_net is floating
+            inv_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv, 1, 1, s_net='VSS', d_net=inv_d_net)
+            inv_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv, 1, 1, s_net='VDD', d_net=inv_d_net)
+
+            # Step2: draw tri-inverter
             tinv0_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_inv + ndum, nf_tinv0, 1, 1, s_net='VSS',
-                                               d_net='ns_{}'.format(idx))
+                                               d_net=ns_net)
             tinv0_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_inv + ndum, nf_tinv0, 1, 1, s_net='VDD',
-                                               d_net='ps_{}'.format(idx))
+                                               d_net=ps_net)
             tinv1_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_tinv0 + nf_inv + 2 * ndum, nf_tinv1, 1, 1,
-                                               s_net='ns_{}'.format(idx), d_net='clko')
+                                               s_net=ns_net, d_net=tinv_d_net)
             tinv1_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_tinv0 + nf_inv + 2 * ndum, nf_tinv1, 1, 1,
-                                               s_net='ps_{}'.format(idx), d_net='clko')
+                                               s_net=ps_net, d_net=tinv_d_net)
+
+            # connect gates
+            gate_list.append(self.connect_to_tracks(inv_n_ports['g'], ngate_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(inv_p_ports['g'], pgate_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(tinv0_n_ports['g'], ngate1_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(tinv0_p_ports['g'], pgate_id, min_len_mode=0))
+            ng_tinv1.append(self.connect_to_tracks(tinv1_n_ports['g'], ngate_id, min_len_mode=0))  # input wire
+            pg_tinv1.append(self.connect_to_tracks(tinv1_p_ports['g'], pgate_id, min_len_mode=0))  # input wire
+            # connect drains
+            inv_d_list.append(self.connect_to_tracks([inv_n_ports['d'], inv_p_ports['d']], out_id,
+                                                     min_len_mode=0))
+            self.connect_to_tracks([tinv0_n_ports['d'], tinv1_n_ports['s']], ndrain_id, min_len_mode=0)
+            self.connect_to_tracks([tinv0_p_ports['d'], tinv1_p_ports['s']], pdrain_id, min_len_mode=0)
+            tinv_d_ports.append([tinv1_n_ports['d'], tinv1_p_ports['d']])
+            if dum is True:
+                tinv_d_list.append(self.connect_to_tracks(tinv_d_ports[-1], outp_id, min_len_mode=0))
+            ptap_ports.extend((inv_n_ports['s'], tinv0_n_ports['s']))
+            ntap_ports.extend((inv_p_ports['s'], tinv0_p_ports['s']))
+
+        # find the vertical tracks of all slices in one query, the output track is
+        # right of the middle of the tri-inverter drains
+        num = len(inv_d_list)
+        tinv_d_mid = []
+        for ports in tinv_d_ports:
+            bounds = [port.track_id.get_bounds(self.grid, unit_mode=True) for port in ports]
+            tinv_d_mid.append((min(b[0] for b in bounds) + max(b[1] for b in bounds)) // 2)
+        coords = [warr.middle_unit for warr in gate_list[0::2]] + tinv_d_mid
+        tids = get_track_ids(self.grid, m5v_layer, coords, offset=[0] * (2 * num) + [1] * num, unit_mode=True)
+        inv_in = []
+        for i, inv_d in enumerate(inv_d_list):
+            ng_inv, pg_inv, ng_tinv0, pg_tinv0 = gate_list[4*i:4*i+4]
+            inv_in.append(self.connect_to_tracks([ng_inv, pg_inv], tids[2*i], min_len_mode=0))  # input wire
+            # also connect inverter drain
+            self.connect_to_tracks([inv_d, ng_tinv0, pg_tinv0], tids[2*i+1], min_len_mode=0)
+
+        # connect outputs
+        out_tids = tids[2*num:]
+        if dum is True:
+            tinv_out = [self.connect_to_tracks(tinv_d, tid, min_len_mode=0)
+                        for tinv_d, tid in zip(tinv_d_list, out_tids)]
         else:
-            tinv0_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_inv + ndum, nf_tinv0, 1, 1, s_net='VSS',
-                                               d_net='ns_d_{}'.format(idx))
-            tinv0_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_inv + ndum, nf_tinv0, 1, 1, s_net='VDD',
-                                               d_net='ps_d_{}'.format(idx))
-            tinv1_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_tinv0 + nf_inv + 2 * ndum, nf_tinv1, 1, 1,
-                                               s_net='ns_d_{}'.format(idx))     # d_net is floating
-            tinv1_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_tinv0 + nf_inv + 2 * ndum, nf_tinv1, 1, 1,
-                                               s_net='ps_d_{}'.format(idx))     # d_net is floating
-
-        # connect top/bottom MOSs
-        # connect gate
-        ng_tinv0 = self.connect_to_tracks(tinv0_n_ports['g'], ngate1_id, min_len_mode=0)
-        pg_tinv0 = self.connect_to_tracks(tinv0_p_ports['g'], pgate_id, min_len_mode=0)
-        # connect gate vertically
-        vgate_idx = self.grid.coord_to_nearest_track(m5v_layer, ng_tinv0.middle)
-        vgate_tid = TrackID(m5v_layer, vgate_idx)
-        # also connect inverter drain
-        tinv0_g = self.connect_to_tracks([inv_d_warr, ng_tinv0, pg_tinv0], vgate_tid, min_len_mode=0)
-
-        # connect middle MOSs
-        ng_tinv1 = self.connect_to_tracks(tinv1_n_ports['g'], ngate_id, min_len_mode=0)  # input wire
-        pg_tinv1 = self.connect_to_tracks(tinv1_p_ports['g'], pgate_id, min_len_mode=0)  # input wire
-        # connect source
-        ns_tinv0 = self.connect_to_tracks([tinv0_n_ports['d'], tinv1_n_ports['s']], ndrain_id, min_len_mode=0)
-        ps_tinv0 = self.connect_to_tracks([tinv0_p_ports['d'], tinv1_p_ports['s']], pdrain_id, min_len_mode=0)
-        # connect drain
-        tinv_out = self.connect_to_tracks([tinv1_n_ports['d'], tinv1_p_ports['d']], outp_id, min_len_mode=0)  # output wire
-        # connect source
-        self.connect_to_substrate('ptap', tinv0_n_ports['s'])
-        self.connect_to_substrate('ntap', tinv0_p_ports['s'])
-        # connect middl
-        idx = self.grid.coord_to_nearest_track(tinv_out.layer_id+1, tinv_out.middle)
-        tid = TrackID(tinv_out.layer_id+1, idx+1)
-        tinv_out = self.connect_to_tracks(tinv_out, tid, min_len_mode=0)
+            tinv_d = self.connect_to_tracks([port for ports in tinv_d_ports for port in ports], outp_id,
+                                            min_len_mode=0)  # output wire
+            out_idx = [tid.base_index for tid in out_tids]
+            pitch = out_idx[1] - out_idx[0] if num > 1 else 0
+            if num > 0 and all(out_idx[i+1] - out_idx[i] == pitch for i in range(num-1)):
+                out_tids = [TrackID(m5v_layer, out_idx[0], num=num, pitch=pitch)]
+            tinv_out = [self.connect_to_tracks(tinv_d, tid, min_len_mode=0) for tid in out_tids]
+
+        # connect sources
+        self.connect_to_substrate('ptap', ptap_ports)
+        self.connect_to_substrate('ntap', ntap_ports)
 
         return inv_in, ng_tinv1, pg_tinv1, tinv_out
@@ -16,6 +16,9 @@ from bag.layout.template import TemplateBase, TemplateDB
 
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
+from bag_xbase_logic.layout.track_util import coords_to_nearest_tracks
+from bag_xbase_logic.layout.row_util import place_rows, get_cell_pin, tie_to_tracks
 from bag_xbase_logic.layout.dff_strst import DFFStRst
 from bag_xbase_logic.layout.buffer import Buffer
 from bag_xbase_logic.layout.xor import XOR
@@ -93,6 +96,7 @@ class ClkDiv(TemplateBase):
             clk_rst_sp='clk rst space in tracks',
             rst_list='rst list for each dff',
             out_list='output list for dffs',
+            dff_per_row='if given, fold the DFFs into arrayed rows of at most this many cells',
 
             ptap_w='NMOS substrate width, in meters/number of fins.',
             ntap_w='PMOS substrate width, in meters/number of fins.',
@@ -126,6 +130,7 @@ class ClkDiv(TemplateBase):
             clk_rst_sp=2,
             out_list=None,
             power_width_ntr=None,
+            dff_per_row=None,
         )
 
     def draw_layout(self, **kwargs):
@@ -137,7 +142,8 @@ class ClkDiv(TemplateBase):
                             dff_nfn_nand3, dff_nfp_nand3, dff_nf_tgate0, dff_nf_tgate1,
                             buf_nf_inv0, buf_nf_inv1, ptap_w, ntap_w,
                             g_width_ntr, ds_width_ntr, intent, ndum, ndum_side, show_pins, power_width_ntr,
-                            div_ratio, rst_list, clk_rst_sp, clock_track, out_list, debug, **kwargs):
+                            div_ratio, rst_list, clk_rst_sp, clock_track, out_list, debug, dff_per_row,
+                            **kwargs):
         """Draw the layout of a transistor for characterization.
         Notes
         -------
@@ -165,6 +171,8 @@ class ClkDiv(TemplateBase):
         for i in out_list:
             if i not in list(range(div_ratio)):
                 raise ValueError("out_list have value out of bound")
+        if dff_per_row is not None and dff_per_row < 1:
+            raise ValueError("dff_per_row must be at least 1")
 
         # get dff
         dff_params = dict(
@@ -201,7 +209,7 @@ class ClkDiv(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        dff_master = self.new_template(params=dff_params, temp_cls=DFFStRst, debug=True)
+        dff_master = new_master(self, DFFStRst, dff_params)
 
         # get mux size
         dff_toplay, dff_w, dff_h = dff_master.size
@@ -229,7 +237,7 @@ class ClkDiv(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        buf_master = self.new_template(params=buf_params, temp_cls=Buffer, debug=True)
+        buf_master = new_master(self, Buffer, buf_params)
         
         # get buf size
         buf_toplay, buf_w, buf_h = buf_master.size
@@ -241,176 +249,199 @@ class ClkDiv(TemplateBase):
         rstbuf_inst = self.add_instance(buf_master, inst_name='RSTBUF', loc=(0, 0))
         clkbuf_inst = self.add_instance(buf_master, inst_name='CLKBUF', loc=(buf_width, 0),
                                         unit_mode=True)
-        dff_inst = []
-        # place all stages
-        # import pdb
-        # pdb.set_trace()
-
-        for i in range(div_ratio):
-            if i%2 == 0:
-                dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
-                                                  loc=(buf_width*2+dff_width*i, 0), orient='R0',
-                                                  unit_mode=True))
-            else:
-                dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
-                                                  loc=(buf_width*2+dff_width * (i+1), 0), orient='MY',
-                                                  unit_mode=True))
+        x0 = buf_width*2
+        if dff_per_row is not None:
+            n_row = -(-div_ratio // dff_per_row)
+            if n_row > 1:
+                # the clk, rst and ring spines get a channel of their own, clear of the buffers
+                spine_layer = clkbuf_inst.get_all_port_pins('data_o')[0].layer_id+2
+                spine_width = (2*clock_track+6) * self.grid.get_track_pitch(spine_layer, unit_mode=True)
+                x0 += -(-spine_width // w_pitch_dff) * w_pitch_dff
+            out_warr, clk_i, vdd_wire, vss_wire = self._draw_dff_rows(dff_master, div_ratio, dff_per_row, rst_list,
+                                                                      out_list, x0, clock_track, clk_rst_sp,
+                                                                      rstbuf_inst, clkbuf_inst)
+            width = x0 + dff_width*min(div_ratio, dff_per_row)
+            height = dff_height*n_row
+            # the rows are joined by vertical spines one layer up
+            top_layer = dff_toplay+2 if n_row > 1 else dff_toplay+1
+            sup_labels = ('VDD:', 'VSS:') if n_row > 1 else ('VDD', 'VSS')
+            clk = clkbuf_inst.get_all_port_pins('data')
+            rst = rstbuf_inst.get_all_port_pins('data')[0]
+        else:
+            dff_inst = []
+            # place all stages
+            # import pdb
+            # pdb.set_trace()
 
-        # connect clock
-        clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
-        clk_idx = self.grid.coord_to_nearest_track(clk_i.layer_id + 1, clk_i.get_bbox_array(self.grid).top_unit,
-                                                   unit_mode=True)
-        tid = TrackID(clk_i.layer_id + 1, clk_idx, width=clock_track)
-        clk_warr = [clk_i]
-        for i in range(div_ratio):
-            clk_warr.append(dff_inst[i].get_all_port_pins('CLK')[0])
-        clk_i = self.connect_to_tracks(clk_warr, tid)
-        clk = clkbuf_inst.get_all_port_pins('data')
-
-        # connect dff input and output, also connect rst/st
-        rst_warr = []
-        out_warr = []
-        if div_ratio % 2 == 0:
-            # connect between different ffs
             for i in range(div_ratio):
-                if 2 * (i+1) < div_ratio:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id+1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id+1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2*i].get_all_port_pins('RST')[0]
-                    st = dff_inst[2*i].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2*i].get_all_port_pins('VSS')[0]
-
-                elif 2 * (i+1) == div_ratio:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*i+1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2 * i].get_all_port_pins('RST')[0]
-                    st = dff_inst[2 * i].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2 * i].get_all_port_pins('VSS')[0]
+                if i%2 == 0:
+                    dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
+                                                      loc=(buf_width*2+dff_width*i, 0), orient='R0',
+                                                      unit_mode=True))
                 else:
-                    if i != div_ratio-1:
-                        idx1 = 2 * div_ratio - 3 - 2 * i
+                    dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
+                                                      loc=(buf_width*2+dff_width * (i+1), 0), orient='MY',
+                                                      unit_mode=True))
+
+            # connect clock
+            clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
+            clk_idx = self.grid.coord_to_nearest_track(clk_i.layer_id + 1, clk_i.get_bbox_array(self.grid).top_unit,
+                                                       unit_mode=True)
+            tid = TrackID(clk_i.layer_id + 1, clk_idx, width=clock_track)
+            clk_warr = [clk_i]
+            for i in range(div_ratio):
+                clk_warr.append(dff_inst[i].get_all_port_pins('CLK')[0])
+            clk_i = self.connect_to_tracks(clk_warr, tid)
+            clk = clkbuf_inst.get_all_port_pins('data')
+
+            # data output pins and their track indices, found with one grid query
+            dff_o_list = [inst.get_all_port_pins('O', layer=dff_toplay)[0] for inst in dff_inst]
+            dff_o_idx = coords_to_nearest_tracks(self.grid, [dff_o.layer_id+1 for dff_o in dff_o_list],
+                                                 [dff_o.get_bbox_array(self.grid).top_unit for dff_o in dff_o_list],
+                                                 unit_mode=True)
+
+            # connect dff input and output, also connect rst/st
+            rst_warr = []
+            out_warr = []
+            if div_ratio % 2 == 0:
+                # connect between different ffs
+                for i in range(div_ratio):
+                    if 2 * (i+1) < div_ratio:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id+1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2*i].get_all_port_pins('RST')[0]
+                        st = dff_inst[2*i].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2*i].get_all_port_pins('VSS')[0]
+
+                    elif 2 * (i+1) == div_ratio:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*i+1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id + 1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2 * i].get_all_port_pins('RST')[0]
+                        st = dff_inst[2 * i].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2 * i].get_all_port_pins('VSS')[0]
                     else:
-                        idx1 = 0
-                    idx0 = 2*div_ratio-1-2*i
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('RST')[0]
-                    st = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('VSS')[0]
-
-                # rst/st connection
-                if rst_list[i] == 1:
-                    rst_warr.append(st)
-                    self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
-                                           unit_mode=True)
-                else:
-                    rst_warr.append(rst)
-                    self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
-                                           unit_mode=True)
-                # get output
-                for j in out_list:
-                    if j == i:
-                        out_warr.append(dff_o)
+                        if i != div_ratio-1:
+                            idx1 = 2 * div_ratio - 3 - 2 * i
+                        else:
+                            idx1 = 0
+                        idx0 = 2*div_ratio-1-2*i
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('RST')[0]
+                        st = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2*div_ratio-1-2*i].get_all_port_pins('VSS')[0]
+
+                    # rst/st connection
+                    if rst_list[i] == 1:
+                        rst_warr.append(st)
+                        self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
+                                               unit_mode=True)
+                    else:
+                        rst_warr.append(rst)
+                        self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
+                                               unit_mode=True)
+                    # get output
+                    for j in out_list:
+                        if j == i:
+                            out_warr.append(dff_o)
 
-        else:
-            for i in range(div_ratio):
-                if 2*i < div_ratio-1:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id+1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id+1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2 * i].get_all_port_pins('RST')[0]
-                    st = dff_inst[2 * i].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2 * i].get_all_port_pins('VSS')[0]
-
-                elif 2*i == div_ratio-1:
-                    idx0 = 2*(div_ratio-1)-2*i
-                    idx1 = 2*(div_ratio-1)-2*i-1
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('RST')[0]
-                    st = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('VSS')[0]
-                else:
-                    if i != div_ratio-1:
-                        idx1 = 2 * div_ratio - 2 * (i + 1) - 1
+            else:
+                for i in range(div_ratio):
+                    if 2*i < div_ratio-1:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id+1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2 * i].get_all_port_pins('RST')[0]
+                        st = dff_inst[2 * i].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2 * i].get_all_port_pins('VSS')[0]
+
+                    elif 2*i == div_ratio-1:
+                        idx0 = 2*(div_ratio-1)-2*i
+                        idx1 = 2*(div_ratio-1)-2*i-1
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('RST')[0]
+                        st = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2*(div_ratio-1)-2*i].get_all_port_pins('VSS')[0]
                     else:
-                        idx1 = 0
-                    idx0 = 2*div_ratio-2*i-1
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-                    # get rst/st vss
-                    rst = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('RST')[0]
-                    st = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('ST')[0]
-                    vss = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('VSS')[0]
-
-                # rst/st connection
-                if rst_list[i] == 1:
-                    rst_warr.append(st)
-                    self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
-                                           unit_mode=True)
-                else:
-                    rst_warr.append(rst)
-                    self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
-                                           unit_mode=True)
-                # get output
-                for j in out_list:
-                    if j == i:
-                        out_warr.append(dff_o)
-
-        # connect to rst
-        tid = TrackID(st.layer_id + 1, clk_idx - clk_rst_sp - clock_track)
-        rst_warr.append(rstbuf_inst.get_all_port_pins('data_o')[0])
-        self.connect_to_tracks(rst_warr, tid)
-        rst = rstbuf_inst.get_all_port_pins('data')[0]
-
-        # connect VDD/VSS
-        vdd_warr = rstbuf_inst.get_all_port_pins('VDD')
-        vss_warr = rstbuf_inst.get_all_port_pins('VSS')
-        vdd_warr.append(clkbuf_inst.get_all_port_pins('VDD')[0])
-        vss_warr.append(clkbuf_inst.get_all_port_pins('VSS')[0])
-        for i in range(div_ratio):
-            vdd_warr.append(dff_inst[i].get_all_port_pins('VDD')[0])
-            vss_warr.append(dff_inst[i].get_all_port_pins('VSS')[0])
-        vdd_wire = self.connect_wires(vdd_warr)
-        vss_wire = self.connect_wires(vss_warr)
+                        if i != div_ratio-1:
+                            idx1 = 2 * div_ratio - 2 * (i + 1) - 1
+                        else:
+                            idx1 = 0
+                        idx0 = 2*div_ratio-2*i-1
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                        # get rst/st vss
+                        rst = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('RST')[0]
+                        st = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('ST')[0]
+                        vss = dff_inst[2*div_ratio-2*i-1].get_all_port_pins('VSS')[0]
+
+                    # rst/st connection
+                    if rst_list[i] == 1:
+                        rst_warr.append(st)
+                        self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
+                                               unit_mode=True)
+                    else:
+                        rst_warr.append(rst)
+                        self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
+                                               unit_mode=True)
+                    # get output
+                    for j in out_list:
+                        if j == i:
+                            out_warr.append(dff_o)
+
+            # connect to rst
+            tid = TrackID(st.layer_id + 1, clk_idx - clk_rst_sp - clock_track)
+            rst_warr.append(rstbuf_inst.get_all_port_pins('data_o')[0])
+            self.connect_to_tracks(rst_warr, tid)
+            rst = rstbuf_inst.get_all_port_pins('data')[0]
+
+            # connect VDD/VSS
+            vdd_warr = rstbuf_inst.get_all_port_pins('VDD')
+            vss_warr = rstbuf_inst.get_all_port_pins('VSS')
+            vdd_warr.append(clkbuf_inst.get_all_port_pins('VDD')[0])
+            vss_warr.append(clkbuf_inst.get_all_port_pins('VSS')[0])
+            for i in range(div_ratio):
+                vdd_warr.append(dff_inst[i].get_all_port_pins('VDD')[0])
+                vss_warr.append(dff_inst[i].get_all_port_pins('VSS')[0])
+            vdd_wire = self.connect_wires(vdd_warr)
+            vss_wire = self.connect_wires(vss_warr)
+            width = dff_width*div_ratio+buf_width*2
+            height = dff_height
+            top_layer = dff_toplay+1
+            sup_labels = ('VDD', 'VSS')
 
         # add pins
-        self.add_pin('VDD', vdd_wire, show=show_pins)
-        self.add_pin('VSS', vss_wire, show=show_pins)
+        self.add_pin('VDD', vdd_wire, label=sup_labels[0], show=show_pins)
+        self.add_pin('VSS', vss_wire, label=sup_labels[1], show=show_pins)
         self.add_pin('clk', clk, show=show_pins)
         self.add_pin('rst', rst, show=show_pins)
         if len(out_warr) != 1:
@@ -423,10 +454,6 @@ class ClkDiv(TemplateBase):
 
         # get size
         # get size and array box
-        width = dff_width*div_ratio+buf_width*2
-        # width = buf_width
-        height = dff_height
-        top_layer = dff_toplay+1
         w_pitch, h_pitch = self.grid.get_size_pitch(top_layer, unit_mode=True)
 
         # get block size rounded by top 2 layers pitch
@@ -453,3 +480,110 @@ class ClkDiv(TemplateBase):
             out_list=out_list,
             debug=debug,
         )
+
+    def _draw_dff_rows(self, dff_master, div_ratio, dff_per_row, rst_list, out_list, x0, clock_track,
+                       clk_rst_sp, rstbuf_inst, clkbuf_inst):
+        """Folds the DFF ring into arrayed rows of at most dff_per_row cells and routes it.
+
+        The ring snakes up the rows and returns to the first DFF through a spine.
+        Each row gets its own clk and rst track, connected with one
+        connect_to_tracks() per row, and the rows are joined by clk and rst
+        spines left of x0, where the caller leaves a channel clear of the
+        buffers.  The clock wire of a row never spans
+        more than dff_per_row cells however large div_ratio is.
+
+        Returns
+        -------
+        out_warr : list[:class:`bag.layout.routing.WireArray`]
+            the output wires of the DFFs in out_list, in stage order like the single row.
+        clk_i : :class:`bag.layout.routing.WireArray`
+            the internal clock wire of the first row.
+        vdd_wire : list[:class:`bag.layout.routing.WireArray`]
+            the VDD wires of every row.
+        vss_wire : list[:class:`bag.layout.routing.WireArray`]
+            the VSS wires of every row.
+        """
+        grid = self.grid
+        dff_toplay, dff_w, dff_h = dff_master.size
+        dff_height = dff_h * grid.get_size_pitch(dff_toplay, unit_mode=True)[1]
+        n_row = -(-div_ratio // dff_per_row)
+
+        # place the rows, dff[k] is the (row instance, column) of stage k
+        row_inst, dff = place_rows(self, dff_master, div_ratio, dff_per_row, x0, inst_name='DFF_ROW')
+
+        # connect the ring, the output track of every stage in one grid query
+        dff_o_list = [get_cell_pin(dff[k], 'O', layer=dff_toplay) for k in range(div_ratio)]
+        o_layer = dff_o_list[0].layer_id+1
+        dff_o_idx = coords_to_nearest_tracks(grid, o_layer, [dff_o.get_bbox_array(grid).top_unit
+                                                             for dff_o in dff_o_list], unit_mode=True)
+        for k in range(div_ratio-1):
+            dff_i = get_cell_pin(dff[k+1], 'I')
+            # the next stage sits right above at a row turn
+            off = 1 if (k+1) % dff_per_row == 0 else 0
+            self.connect_to_tracks([dff_o_list[k], dff_i], TrackID(o_layer, dff_o_idx[k]+off))
+
+        # clk and rst tracks of every row
+        clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
+        clk_layer = clk_i.layer_id+1
+        clk_top = clk_i.get_bbox_array(grid).top_unit
+        clk_idx = coords_to_nearest_tracks(grid, clk_layer, [clk_top + row*dff_height for row in range(n_row)],
+                                           unit_mode=True)
+
+        # spines in the channel left of the first DFF column
+        spine_layer = clk_layer+1
+        spine0 = grid.coord_to_nearest_track(spine_layer, x0, unit_mode=True) - clock_track
+        spine_idx = [spine0, spine0-clock_track-1, spine0-clock_track-3]
+        spine_x = [grid.track_to_coord(spine_layer, idx, unit_mode=True) for idx in spine_idx]
+        spine_lower = min(spine_x)
+
+        # close the ring
+        dff_i = get_cell_pin(dff[0], 'I')
+        if n_row == 1:
+            self.connect_to_tracks([dff_o_list[-1], dff_i], TrackID(o_layer, dff_o_idx[-1]-1))
+        else:
+            ring = self.connect_to_tracks(dff_o_list[-1], TrackID(o_layer, dff_o_idx[-1]-1),
+                                          track_lower=spine_x[2], unit_mode=True)
+            ring_in = self.connect_to_tracks(dff_i, TrackID(o_layer, dff_o_idx[0]-1),
+                                             track_lower=spine_x[2], unit_mode=True)
+            self.connect_to_tracks([ring, ring_in], TrackID(spine_layer, spine_idx[2]))
+
+        # connect clk, rst and supplies row by row
+        vdd_wire = []
+        vss_wire = []
+        clk_warr = []
+        rst_warr = []
+        for row, inst in enumerate(row_inst):
+            stages = range(row*dff_per_row, min(div_ratio, (row+1)*dff_per_row))
+            clk_list = inst.get_all_port_pins('CLK')
+            vdd_list = inst.get_all_port_pins('VDD')
+            vss_list = inst.get_all_port_pins('VSS')
+            # stages in rst_list are set on reset, the unused input is tied low
+            rst_list_row = [get_cell_pin(dff[k], 'ST' if rst_list[k] == 1 else 'RST') for k in stages]
+            tie_lists = [[get_cell_pin(dff[k], 'RST') for k in stages if rst_list[k] == 1],
+                         [get_cell_pin(dff[k], 'ST') for k in stages if rst_list[k] != 1]]
+            if row == 0:
+                clk_list.append(clk_i)
+                rst_list_row.append(rstbuf_inst.get_all_port_pins('data_o')[0])
+                for sup_inst in (rstbuf_inst, clkbuf_inst):
+                    vdd_list.append(sup_inst.get_all_port_pins('VDD')[0])
+                    vss_list.append(sup_inst.get_all_port_pins('VSS')[0])
+                lower = None
+            else:
+                lower = spine_lower
+
+            vdd_wire += self.connect_wires(vdd_list)
+            row_vss = self.connect_wires(vss_list)
+            vss_wire += row_vss
+            for tie_list in tie_lists:
+                tie_to_tracks(self, row_vss, tie_list)
+            clk_tid = TrackID(clk_layer, clk_idx[row], width=clock_track)
+            rst_tid = TrackID(clk_layer, clk_idx[row]-clk_rst_sp-clock_track)
+            clk_warr.append(self.connect_to_tracks(clk_list, clk_tid, track_lower=lower, unit_mode=True))
+            rst_warr.append(self.connect_to_tracks(rst_list_row, rst_tid, track_lower=lower, unit_mode=True))
+
+        if n_row > 1:
+            self.connect_to_tracks(clk_warr, TrackID(spine_layer, spine_idx[0], width=clock_track))
+            self.connect_to_tracks(rst_warr, TrackID(spine_layer, spine_idx[1]))
+
+        out_warr = [dff_o_list[k] for k in sorted(out_list)]
+        return out_warr, clk_warr[0], vdd_wire, vss_wire
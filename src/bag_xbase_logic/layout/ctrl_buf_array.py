@@ -9,11 +9,11 @@ from builtins import *
 import bag
 import math
 
-from bag.layout.routing import TrackID
 
 from abs_templates_ec.analog_core import AnalogBase, AnalogBaseInfo
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.track_util import get_track_ids
 
 
 class CtrlBufArr(AnalogBase):
@@ -183,50 +183,16 @@ class CtrlBufArr(AnalogBase):
         out_id = self.make_track_id('nch', 0, 'ds', 0, width=ds_width_ntr)
         outp_id = self.make_track_id('pch', 0, 'ds', 0, width=ds_width_ntr)
 
-        # define wire array
-        dum_in_arr = []
-        ctrli_in_arr = []
-        ctrlq_in_arr = []
-        ctrlib_in_arr = []
-        ctrlqb_in_arr = []
-        ctrli_o_arr = []
-        ctrlq_o_arr = []
-        ctrlib_o_arr = []
-        ctrlqb_o_arr = []
-        ctrli_ob_arr = []
-        ctrlq_ob_arr = []
-        ctrlib_ob_arr = []
-        ctrlqb_ob_arr = []
-
-        # Step1: draw dummy cell
-        inv0_in, inv0_out, inv1_out = self.draw_ctrl_buf(idx=0, dum=True)
-        dum_in_arr.append(inv0_in)
-        inv0_in, inv0_out, inv1_out = self.draw_ctrl_buf(idx=pi_res+1, dum=True)
-        dum_in_arr.append(inv0_in)
-
-        # Step2: draw cells
-        for i in range(0, pi_res):
-            inv0_in, inv0_out, inv1_out = self.draw_ctrl_buf(idx=i+1)
-            if i % 4 == 0:
-                ctrli_in_arr.append(inv0_in)
-                ctrli_o_arr.append(inv1_out)
-                ctrli_ob_arr.append(inv0_out)
-            elif i % 4 == 1:
-                ctrlq_in_arr.append(inv0_in)
-                ctrlq_o_arr.append(inv1_out)
-                ctrlq_ob_arr.append(inv0_out)
-            elif i % 4 == 2:
-                ctrlib_in_arr.append(inv0_in)
-                ctrlib_o_arr.append(inv1_out)
-                ctrlib_ob_arr.append(inv0_out)
-            else:
-                ctrlqb_in_arr.append(inv0_in)
-                ctrlqb_o_arr.append(inv1_out)
-                ctrlqb_ob_arr.append(inv0_out)
+        # Step1: draw dummy cells
+        dum_in_arr, _, _ = self.draw_ctrl_bufs([0, pi_res+1], dum=True)
+
+        # Step2: draw cells, all slices in one pass
+        inv0_in, inv0_out, inv1_out = self.draw_ctrl_bufs(list(range(1, pi_res+1)))
 
-        ctrl_in_arr = ctrli_in_arr + ctrlq_in_arr + ctrlib_in_arr + ctrlqb_in_arr
-        ctrl_o_arr = ctrli_o_arr + ctrlq_o_arr + ctrlib_o_arr + ctrlqb_o_arr
-        ctrl_ob_arr = ctrli_ob_arr + ctrlq_ob_arr + ctrlib_ob_arr + ctrlqb_ob_arr
+        # slices are interleaved i, q, ib, qb
+        ctrl_in_arr = [warr for phase in range(4) for warr in inv0_in[phase::4]]
+        ctrl_o_arr = [warr for phase in range(4) for warr in inv1_out[phase::4]]
+        ctrl_ob_arr = [warr for phase in range(4) for warr in inv0_out[phase::4]]
 
         # add pins
         for i, ctrl_in in enumerate(ctrl_in_arr):
@@ -263,60 +229,75 @@ class CtrlBufArr(AnalogBase):
         )
 
     def draw_ctrl_buf(self, idx, dum=False):
+        inv0_in, inv0_out, inv1_out = self.draw_ctrl_bufs([idx], dum=dum)
+        return inv0_in[0], inv0_out[0], inv1_out[0]
 
-        # Step1: connect inverter
-        fg_base = ndum_side+(fg_cell+ndum)*idx
-        # group transistors
-        if dum is False:
-            inv0_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv0, 1, 1, s_net='VSS',
-                                              d_net='ctrl_ob<{}>'.format(idx-1))
-            inv0_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv1, 1, 1, s_net='VDD',
-                                              d_net='ctrl_ob<{}>'.format(idx-1))
-        else:
-            inv0_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv0, 1, 1, s_net='VSS',
-                                              d_net='ctrl_db_{}'.format(idx))
-            inv0_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv1, 1, 1, s_net='VDD',
-                                              d_net='ctrl_db_{}'.format(idx))
-
-        # connect gate
-        ng_inv0_warr = self.connect_to_tracks(inv0_n_ports['g'], ngate_id, min_len_mode=0)
-        pg_inv0_warr = self.connect_to_tracks(inv0_p_ports['g'], pgate_id, min_len_mode=0)
-        # connect gate vertically
-        vgate_idx = self.grid.coord_to_nearest_track(m5v_layer, ng_inv0_warr.middle)
-        vgate_tid = TrackID(m5v_layer, vgate_idx)
-        inv0_in = self.connect_to_tracks([ng_inv0_warr, pg_inv0_warr], vgate_tid, min_len_mode=0)  # input wire
-        # connect drain
-        inv0_d = self.connect_to_tracks([inv0_n_ports['d'], inv0_p_ports['d']], outp_id, min_len_mode=0)
-        # connect gate
-        self.connect_to_substrate('ptap', inv0_n_ports['s'])
-        self.connect_to_substrate('ntap', inv0_p_ports['s'])
-
-        # Step2: connect tri-inverter
-        # group transistors
-        if dum is False:
-            inv1_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_inv0 + ndum, nf_inv1, 1, 1,
-                                              s_net='VSS', d_net='ctrl_o<{}>'.format(idx-1))
-            inv1_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_inv0 + ndum, nf_inv1, 1, 1,
-                                              s_net='VDD', d_net='ctrl_o<{}>'.format(idx-1))
-        else:
+    def draw_ctrl_bufs(self, idx_list, dum=False):
+        """Draws the control buffers of the given slices in one pass.
+
+        Every step is done for all slices before the next one, so the vertical
+        gate tracks are found with one grid query and the sources are connected
+        to the substrate with one call per tap.
+
+        Returns
+        -------
+        inv0_in : list[:class:`bag.layout.routing.WireArray`]
+            the input wire of each slice.
+        inv0_out : list[:class:`bag.layout.routing.WireArray`]
+            the inverted output wire of each slice.
+        inv1_out : list[:class:`bag.layout.routing.WireArray`]
+            the output wire of each slice.
+        """
+        ptap_ports = []
+        ntap_ports = []
+        inv0_d_list = []
+        inv1_out = []
+        gate_list = []
+        for idx in idx_list:
+            # Step1: draw inverter
+            fg_base = ndum_side+(fg_cell+ndum)*idx
+            if dum is False:
+                inv0_d_net = 'ctrl_ob<{}>'.format(idx-1)
+                inv1_d_net = 'ctrl_o<{}>'.format(idx-1)
+            else:
+                inv0_d_net = 'ctrl_db_{}'.format(idx)
+                inv1_d_net = 'ctrl_d_{}'.format(idx)
+            inv0_n_ports = self.draw_mos_conn('nch', 0, fg_base, nf_inv0, 1, 1, s_net='VSS', d_net=inv0_d_net)
+            inv0_p_ports = self.draw_mos_conn('pch', 0, fg_base, nf_inv1, 1, 1, s_net='VDD', d_net=inv0_d_net)
+
+            # Step2: draw tri-inverter
             inv1_n_ports = self.draw_mos_conn('nch', 0, fg_base + nf_inv0 + ndum, nf_inv1, 1, 1,
-                                              s_net='VSS', d_net='ctrl_d_{}'.format(idx))
+                                              s_net='VSS', d_net=inv1_d_net)
             inv1_p_ports = self.draw_mos_conn('pch', 0, fg_base + nf_inv0 + ndum, nf_inv1, 1, 1,
-                                              s_net='VDD', d_net='ctrl_d_{}'.format(idx))
-
-        # connect top/bottom MOSs
-        # connect gate
-        ng_inv1_warr = self.connect_to_tracks(inv1_n_ports['g'], ngate_id, min_len_mode=0)
-        pg_inv1_warr = self.connect_to_tracks(inv1_p_ports['g'], pgate_id, min_len_mode=0)
-        # connect gate vertically
-        vgate_idx = self.grid.coord_to_nearest_track(m5v_layer, ng_inv1_warr.middle)
-        vgate_tid = TrackID(m5v_layer, vgate_idx)
-        # connect inv0 drain with inv1 gate
-        inv0_out = self.connect_to_tracks([inv0_d, ng_inv1_warr, pg_inv1_warr], vgate_tid, min_len_mode=0)
-        # inv1_d_warr
-        inv1_out = self.connect_to_tracks([inv1_n_ports['d'], inv1_p_ports['d']], out_id, min_len_mode=2)  # output wire
-        # connect source
-        self.connect_to_substrate('ptap', inv1_n_ports['s'])
-        self.connect_to_substrate('ntap', inv1_p_ports['s'])
+                                              s_net='VDD', d_net=inv1_d_net)
+
+            # connect gates
+            gate_list.append(self.connect_to_tracks(inv0_n_ports['g'], ngate_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(inv0_p_ports['g'], pgate_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(inv1_n_ports['g'], ngate_id, min_len_mode=0))
+            gate_list.append(self.connect_to_tracks(inv1_p_ports['g'], pgate_id, min_len_mode=0))
+            # connect drains
+            inv0_d_list.append(self.connect_to_tracks([inv0_n_ports['d'], inv0_p_ports['d']], outp_id,
+                                                      min_len_mode=0))
+            inv1_out.append(self.connect_to_tracks([inv1_n_ports['d'], inv1_p_ports['d']], out_id,
+                                                   min_len_mode=2))  # output wire
+            ptap_ports.extend((inv0_n_ports['s'], inv1_n_ports['s']))
+            ntap_ports.extend((inv0_p_ports['s'], inv1_p_ports['s']))
+
+        # connect gates vertically, the tracks of all slices in one query
+        vgate_tids = get_track_ids(self.grid, m5v_layer, [warr.middle for warr in gate_list[0::2]])
+        inv0_in = []
+        inv0_out = []
+        for i, inv0_d in enumerate(inv0_d_list):
+            ng_inv0, pg_inv0, ng_inv1, pg_inv1 = gate_list[4*i:4*i+4]
+            inv0_in.append(self.connect_to_tracks([ng_inv0, pg_inv0], vgate_tids[2*i],
+                                                  min_len_mode=0))  # input wire
+            # connect inv0 drain with inv1 gate
+            inv0_out.append(self.connect_to_tracks([inv0_d, ng_inv1, pg_inv1], vgate_tids[2*i+1],
+                                                   min_len_mode=0))
+
+        # connect sources
+        self.connect_to_substrate('ptap', ptap_ports)
+        self.connect_to_substrate('ntap', ntap_ports)
 
         return inv0_in, inv0_out, inv1_out
@@ -16,6 +16,7 @@ from bag.layout.template import TemplateBase, TemplateDB
 
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
 from bag_xbase_logic.layout.dff import DFF
 from bag_xbase_logic.layout.buffer import Buffer
 
@@ -162,7 +163,7 @@ class DelStage(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        dff_master = self.new_template(params=dff_params, temp_cls=DFF, debug=True)
+        dff_master = new_master(self, DFF, dff_params)
 
         # get mux size
         dff_toplay, dff_w, dff_h = dff_master.size
@@ -190,7 +191,7 @@ class DelStage(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        buf_master = self.new_template(params=buf_params, temp_cls=Buffer, debug=True)
+        buf_master = new_master(self, Buffer, buf_params)
         
         # get buf size
         buf_toplay, buf_w, buf_h = buf_master.size
@@ -14,6 +14,7 @@ from bag.layout.routing import TrackID
 from abs_templates_ec.analog_core import AnalogBase, AnalogBaseInfo
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
 
 from bag_xbase_logic.layout.clk_cell_array import ClkCellArr
 from bag_xbase_logic.layout.ctrl_buf_array import CtrlBufArr
@@ -144,7 +145,7 @@ class InvPI(AnalogBase):
             g_space=1,
             ds_space=1,
         )
-        ctrl_master = self.new_template(params=ctrl_params, temp_cls=CtrlBufArr, debug=True)
+        ctrl_master = new_master(self, CtrlBufArr, ctrl_params)
 
         ctrl_toplay, ctrl_w, ctrl_h = ctrl_master.size
         w_pitch_ctrl, h_pitch_ctrl = self.grid.get_size_pitch(ctrl_toplay, unit_mode=True)
@@ -170,7 +171,7 @@ class InvPI(AnalogBase):
             power_width_ntr=power_width_ntr,
             show_pins=False,
         )
-        clk_master = self.new_template(params=clk_params, temp_cls=ClkCellArr, debug=True)
+        clk_master = new_master(self, ClkCellArr, clk_params)
 
         clk_toplay, clk_w, clk_h = clk_master.size
         w_pitch_clk, h_pitch_clk = self.grid.get_size_pitch(clk_toplay, unit_mode=True)
@@ -195,7 +196,7 @@ class InvPI(AnalogBase):
             show_pins=False,
             out_M5=False,
         )
-        buf_master = self.new_template(params=buf_params, temp_cls=Buffer, debug=True)
+        buf_master = new_master(self, Buffer, buf_params)
 
         buf_toplay, buf_w, buf_h = buf_master.size
         buf_width = buf_master.bound_box.right_unit
@@ -219,7 +220,7 @@ class InvPI(AnalogBase):
             power_width_ntr=power_width_ntr,
             show_pins=False,
         )
-        cload_master = self.new_template(params=cload_params, temp_cls=Cload, debug=True)
+        cload_master = new_master(self, Cload, cload_params)
 
         buf_toplay, buf_w, buf_h = buf_master.size
         buf_width = cload_master.bound_box.right_unit
@@ -16,6 +16,7 @@ from bag.layout.template import TemplateBase, TemplateDB
 
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
 
 from bag_xbase_logic.layout.inv import Inv
 from bag_xbase_logic.layout.mux import MUX
@@ -148,7 +149,7 @@ class InvMUX(TemplateBase):
             power_width_ntr=power_width_ntr,
 
         )
-        inv_master = self.new_template(params=inv_params, temp_cls=Inv, debug=True)
+        inv_master = new_master(self, Inv, inv_params)
 
         # get mux size
         inv_toplay, inv_w, inv_h = inv_master.size
@@ -178,7 +179,7 @@ class InvMUX(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        mux_master = self.new_template(params=mux_params, temp_cls=MUX, debug=True)
+        mux_master = new_master(self, MUX, mux_params)
 
         # get mux size
         mux_toplay, mux_w, mux_h = mux_master.size
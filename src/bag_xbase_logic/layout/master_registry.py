@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+# noinspection PyUnresolvedReferences,PyCompatibility
+from builtins import *
+
+import weakref
+from time import perf_counter
+
+
+# template database -> {(class name, frozen parameters): master}
+_masters = weakref.WeakKeyDictionary()
+# class name -> [hits, misses]
+_stats = {}
+# class name -> seconds spent drawing new masters, children included
+_draw_time = {}
+
+
+def canonical_params(val):
+    """Returns a copy of val with sorted dictionary keys and python scalars.
+
+    numpy scalars and arrays are converted to python numbers and lists, so that
+    parameters computed with numpy compare equal to the same values typed in
+    the spec file.
+
+    Parameters
+    ----------
+    val : any
+        the parameter value.
+
+    Returns
+    -------
+    val : any
+        the canonical parameter value.
+    """
+    if isinstance(val, dict):
+        return {key: canonical_params(val[key]) for key in sorted(val, key=str)}
+    if isinstance(val, list):
+        return [canonical_params(v) for v in val]
+    if isinstance(val, tuple):
+        return tuple(canonical_params(v) for v in val)
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if hasattr(val, 'item') and hasattr(val, 'dtype'):
+        # numpy scalar
+        return canonical_params(val.item())
+    if hasattr(val, 'tolist'):
+        # numpy array
+        return canonical_params(val.tolist())
+    return val
+
+
+def _freeze(val):
+    # hashable form of canonical parameters, lists and tuples are the same
+    if isinstance(val, dict):
+        return tuple((key, _freeze(v)) for key, v in val.items())
+    if isinstance(val, (list, tuple)):
+        return tuple(_freeze(v) for v in val)
+    return val
+
+
+def _get_cls_name(temp_cls):
+    return '%s.%s' % (temp_cls.__module__, temp_cls.__name__)
+
+
+def new_master(template, temp_cls, params, debug=True):
+    """Returns the master of temp_cls with the given parameters.
+
+    Masters are shared by every template of the same template database, each
+    unique layout is drawn once however its parameters are ordered or typed.
+
+    Parameters
+    ----------
+    template : :class:`bag.layout.template.TemplateBase` or :class:`bag.layout.template.TemplateDB`
+        the parent template, or the template database for a top level master.
+    temp_cls : class
+        the template class.
+    params : dict[str, any]
+        the parameter values.
+    debug : bool
+        True to print debug messages.
+
+    Returns
+    -------
+    master : :class:`bag.layout.template.TemplateBase`
+        the template master.
+    """
+    temp_db = getattr(template, 'template_db', template)
+    params = canonical_params(params)
+    cls_name = _get_cls_name(temp_cls)
+    key = (cls_name, _freeze(params))
+    stats = _stats.setdefault(cls_name, [0, 0])
+
+    db_masters = _masters.setdefault(temp_db, {})
+    if key in db_masters:
+        stats[0] += 1
+        return db_masters[key]
+
+    stats[1] += 1
+    start = perf_counter()
+    if temp_db is template:
+        master = temp_db.new_template(params=params, temp_cls=temp_cls, debug=debug)
+    else:
+        master = template.new_template(params=params, temp_cls=temp_cls, debug=debug)
+    _draw_time[cls_name] = _draw_time.get(cls_name, 0.0) + perf_counter() - start
+    db_masters[key] = master
+    return master
+
+
+def get_stats():
+    """Returns {class name: (hits, misses)} of the masters requested so far."""
+    return {cls_name: tuple(val) for cls_name, val in _stats.items()}
+
+
+def get_draw_times():
+    """Returns {class name: seconds} spent drawing new masters, children included."""
+    return dict(_draw_time)
+
+
+def reset_stats():
+    """Clears the hit and miss counts and the draw times."""
+    _stats.clear()
+    _draw_time.clear()
+
+
+def clear_masters():
+    """Forgets every registered master, used when generator classes are reloaded."""
+    _masters.clear()
+
+
+def print_stats(stats=None):
+    """Prints the hit and miss counts of each template class."""
+    if stats is None:
+        stats = get_stats()
+    if not stats:
+        return
+    print('%-40s %8s %8s' % ('template', 'drawn', 'reused'))
+    for cls_name in sorted(stats):
+        hits, misses = stats[cls_name]
+        print('%-40s %8d %8d' % (cls_name.split('.')[-1], misses, hits))
+    print('%-40s %8d %8d' % ('total', sum(val[1] for val in stats.values()),
+                             sum(val[0] for val in stats.values())))
@@ -16,6 +16,8 @@ from bag.layout.template import TemplateBase, TemplateDB
 
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
+from bag_xbase_logic.layout.track_util import get_track_ids
 from bag_xbase_logic.layout.mux import MUX
 
 
@@ -70,6 +72,7 @@ class MultiMUX(TemplateBase):
             ndum='dummy finger number between different transistors',
             ndum_side='dummy finger number between different transistors',
             mux_stage='number of multi-stage mux',
+            array_rows='True to place each mux row as one arrayed instance',
 
             ptap_w='NMOS substrate width, in meters/number of fins.',
             ntap_w='PMOS substrate width, in meters/number of fins.',
@@ -104,6 +107,7 @@ class MultiMUX(TemplateBase):
             g_space=0,
             ds_space=0,
             power_width_ntr=None,
+            array_rows=False,
 
         )
 
@@ -114,7 +118,7 @@ class MultiMUX(TemplateBase):
                             ptap_w, ntap_w, g_width_ntr, ds_width_ntr,
                             intent, ndum, ndum_side, mux_stage,
                             g_space, ds_space, show_pins, power_width_ntr,
-                            **kwargs):
+                            array_rows, **kwargs):
         """Draw the layout of a transistor for characterization.
         Notes
         -------
@@ -150,7 +154,7 @@ class MultiMUX(TemplateBase):
             debug=False,
         )
 
-        mux_master = self.new_template(params=mux_params, temp_cls=MUX, debug=True)
+        mux_master = new_master(self, MUX, mux_params)
 
         # get mux size
         mux_toplay, mux_w, mux_h = mux_master.size
@@ -158,37 +162,44 @@ class MultiMUX(TemplateBase):
         mux_width = mux_w * w_pitch_mux
         mux_height = mux_h * h_pitch_mux
 
-        mux_inst = []
-        i = 0
-        j = 0
-        n_dum = 0
-        for stage in reversed(range(mux_stage)):
-            mux_inst_row = []
-            for cell in range(2**stage):
-                if stage == mux_stage-1:
-                    xcoord = cell * mux_width
-                    mux_inst_row.append(self.add_instance(mux_master, inst_name='MUX_{}'.format(i), orient='R0',
-                                                          loc=(xcoord, (mux_stage-stage-1)*mux_height),
-                                                          unit_mode=True))
-                    os_list_new = list(range(2**(mux_stage-1)))
-                else:
-                    os = (os_list[cell*2] + os_list[cell*2+1])/2
-                    xcoord = os * mux_width // w_pitch_mux * w_pitch_mux
-                    os_list_new.append(os)
-                    mux_inst_row.append(self.add_instance(mux_master, inst_name='MUX_{}'.format(i), orient='R0',
-                                                          loc=(xcoord, (mux_stage - stage - 1) * mux_height),
-                                                          unit_mode=True))
-                    if cell != 2**stage-1 and stage != 0:
-                        dum_coord = xcoord + mux_width
-                        self.add_instance(mux_master, inst_name='DUM_{}'.format(j), orient='R0',
-                                          loc=(dum_coord, (mux_stage-stage-1) * mux_height),
-                                          nx=2**(mux_stage-1-stage)-1, spx=mux_width, unit_mode=True)
-                        n_dum += 1
-                    i += 1  # index for useful cell
-                    j += 1  # index for dummy cell
-            os_list = os_list_new
-            os_list_new = []
-            mux_inst.append(mux_inst_row)
+        # mux_inst[stage][cell] is the (instance, array column) of a useful mux
+        if array_rows:
+            mux_inst, n_dum = self._place_rows(mux_master, mux_stage, mux_width, mux_height, w_pitch_mux)
+        else:
+            mux_inst = []
+            i = 0
+            j = 0
+            n_dum = 0
+            for stage in reversed(range(mux_stage)):
+                mux_inst_row = []
+                for cell in range(2**stage):
+                    if stage == mux_stage-1:
+                        xcoord = cell * mux_width
+                        mux_inst_row.append((self.add_instance(mux_master, inst_name='MUX_{}'.format(i),
+                                                               orient='R0',
+                                                               loc=(xcoord, (mux_stage-stage-1)*mux_height),
+                                                               unit_mode=True), 0))
+                        os_list_new = list(range(2**(mux_stage-1)))
+                    else:
+                        os = (os_list[cell*2] + os_list[cell*2+1])/2
+                        xcoord = os * mux_width // w_pitch_mux * w_pitch_mux
+                        os_list_new.append(os)
+                        mux_inst_row.append((self.add_instance(mux_master, inst_name='MUX_{}'.format(i),
+                                                               orient='R0',
+                                                               loc=(xcoord, (mux_stage - stage - 1) * mux_height),
+                                                               unit_mode=True), 0))
+                        if cell != 2**stage-1 and stage != 0:
+                            dum_coord = xcoord + mux_width
+                            self.add_instance(mux_master, inst_name='DUM_{}'.format(j), orient='R0',
+                                              loc=(dum_coord, (mux_stage-stage-1) * mux_height),
+                                              nx=2**(mux_stage-1-stage)-1, spx=mux_width, unit_mode=True)
+                            # the schematic counts dummy cells, not dummy arrays
+                            n_dum += 2**(mux_stage-1-stage)-1
+                        i += 1  # index for useful cell
+                        j += 1  # index for dummy cell
+                os_list = os_list_new
+                os_list_new = []
+                mux_inst.append(mux_inst_row)
 
         # connect sel for each row, connect VDD and VSS
         mux_inst.reverse()
@@ -199,9 +210,15 @@ class MultiMUX(TemplateBase):
             vdd_list = []
             vss_list = []
             for cell in range(2**stage):
-                sel_list += mux_inst[stage][cell].get_all_port_pins('sel')
-                vdd_list += mux_inst[stage][cell].get_all_port_pins('VDD')
-                vss_list += mux_inst[stage][cell].get_all_port_pins('VSS')
+                sel_list += self._get_pins(mux_inst[stage][cell], 'sel')
+            if array_rows:
+                # dummies of the row share its supplies
+                vdd_list += mux_inst[stage][0][0].get_all_port_pins('VDD')
+                vss_list += mux_inst[stage][0][0].get_all_port_pins('VSS')
+            else:
+                for cell in range(2**stage):
+                    vdd_list += self._get_pins(mux_inst[stage][cell], 'VDD')
+                    vss_list += self._get_pins(mux_inst[stage][cell], 'VSS')
 
             sel_idx = self.grid.coord_to_nearest_track(sel_list[0].track_id.layer_id+1,
                                     sel_list[0].get_bbox_array(self.grid).top_unit,
@@ -219,31 +236,29 @@ class MultiMUX(TemplateBase):
         # connect output and input between different stages
         for stage in reversed(range(mux_stage)):
             if stage == 0:
-                self.reexport(mux_inst[stage][0].get_port('o'), 'o', show=show_pins)
+                self.reexport(self._get_port(mux_inst[stage][0], 'o'), 'o', show=show_pins)
                 continue
             if stage == mux_stage-1:
                 for i in range(2**stage):
-                    self.reexport(mux_inst[stage][i].get_port('i0'), 'i<{}>'.format(i*2), show=show_pins)
-                    self.reexport(mux_inst[stage][i].get_port('i1'), 'i<{}>'.format(i*2+1), show=show_pins)
+                    self.reexport(self._get_port(mux_inst[stage][i], 'i0'), 'i<{}>'.format(i*2), show=show_pins)
+                    self.reexport(self._get_port(mux_inst[stage][i], 'i1'), 'i<{}>'.format(i*2+1),
+                                  show=show_pins)
+            # output tracks of the whole row in one grid query
+            out_list = [self._get_pins(mux_inst[stage][i], 'o')[0] for i in range(2**stage)]
+            out_tids = get_track_ids(self.grid, [out.layer_id+1 for out in out_list],
+                                     [out.upper for out in out_list], offset=1)
+            # input track between this row and the next one
+            in_layer = self._get_pins(mux_inst[stage-1][0], 'i0')[0].layer_id-1
+            coord_y = (mux_stage - stage) * mux_height
+            tid = get_track_ids(self.grid, in_layer, [coord_y], unit_mode=True)[0]
             for i in range(2**(stage-1)):
-                out0 = mux_inst[stage][i*2].get_all_port_pins('o')[0]
-                out1 = mux_inst[stage][i*2+1].get_all_port_pins('o')[0]
                 # connect out0/1 to higher level
-                # out0 = self.draw_wire_stack(out0, out0.layer_id+1, tr_list=[1])
-                # out1 = self.draw_wire_stack(out1, out1.layer_id+1, tr_list=[1])
-                idx = self.grid.coord_to_nearest_track(out0.layer_id+1, out0.upper)
-                tid = TrackID(out0.layer_id+1, idx+1)
-                out0 = self.connect_to_tracks(out0, tid)
-                idx = self.grid.coord_to_nearest_track(out1.layer_id + 1, out1.upper)
-                tid = TrackID(out1.layer_id + 1, idx+1)
-                out1 = self.connect_to_tracks(out1, tid)  # input wire
+                out0 = self.connect_to_tracks(out_list[i*2], out_tids[i*2])
+                out1 = self.connect_to_tracks(out_list[i*2+1], out_tids[i*2+1])  # input wire
 
                 # get inputs
-                in0 = mux_inst[stage-1][i].get_all_port_pins('i0')[0]
-                in1 = mux_inst[stage-1][i].get_all_port_pins('i1')[0]
-                coord_y = (mux_stage - stage) * mux_height
-                idx = self.grid.coord_to_nearest_track(in0.layer_id-1, coord_y, unit_mode=True)
-                tid = TrackID(in0.layer_id-1, idx)
+                in0 = self._get_pins(mux_inst[stage-1][i], 'i0')[0]
+                in1 = self._get_pins(mux_inst[stage-1][i], 'i1')[0]
                 # connect inputs and outputs
                 self.connect_to_tracks([out0, in0], tid, min_len_mode=0)
                 self.connect_to_tracks([out1, in1], tid, min_len_mode=0)
@@ -278,3 +293,39 @@ class MultiMUX(TemplateBase):
             mux_stage=mux_stage,
             n_dum=n_dum,
         )
+
+    def _place_rows(self, mux_master, mux_stage, mux_width, mux_height, w_pitch_mux):
+        """Places every mux row as one arrayed instance.
+
+        Row stage has 2**stage useful muxes, every step-th element of the array,
+        with the dummies in between.  The elements sit where the single instances
+        would, so both placements draw the same layout.
+
+        Returns
+        -------
+        mux_inst : list[list[tuple]]
+            the (instance, array column) of each useful mux, indexed by stage and cell.
+        n_dum : int
+            the number of dummy cells.
+        """
+        mux_inst = []
+        n_dum = 0
+        for stage in reversed(range(mux_stage)):
+            # useful cells are centered between their two inputs of the row below
+            step = 2**(mux_stage-1-stage)
+            xcoord = (step-1) * mux_width // 2 // w_pitch_mux * w_pitch_mux
+            inst = self.add_instance(mux_master, inst_name='MUX_ROW{}'.format(stage), orient='R0',
+                                     loc=(xcoord, (mux_stage-stage-1) * mux_height),
+                                     nx=(2**stage-1) * step + 1, spx=mux_width, unit_mode=True)
+            mux_inst.append([(inst, cell * step) for cell in range(2**stage)])
+            n_dum += (2**stage-1) * (step-1)
+        return mux_inst, n_dum
+
+    @staticmethod
+    def _get_port(mux, name):
+        inst, col = mux
+        return inst.get_port(name, col=col)
+
+    @classmethod
+    def _get_pins(cls, mux, name):
+        return cls._get_port(mux, name).get_pins()
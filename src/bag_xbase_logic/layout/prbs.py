@@ -16,6 +16,9 @@ from bag.layout.template import TemplateBase, TemplateDB
 
 from bag.layout.util import BBox
 from typing import Union
+from bag_xbase_logic.layout.master_registry import new_master
+from bag_xbase_logic.layout.track_util import coords_to_nearest_tracks
+from bag_xbase_logic.layout.row_util import place_rows, get_cell_pin, tie_to_tracks
 from bag_xbase_logic.layout.dff_strst import DFFStRst
 from bag_xbase_logic.layout.buffer import Buffer
 from bag_xbase_logic.layout.xor import XOR
@@ -94,6 +97,7 @@ class PRBS(TemplateBase):
             clock_track='clock track width',
             fb_idx='feedback index',
             clk_rst_sp='clk rst space in tracks',
+            dff_per_row='if given, place the DFFs as arrayed rows of at most this many cells (not LVS checked)',
 
             ptap_w='NMOS substrate width, in meters/number of fins.',
             ntap_w='PMOS substrate width, in meters/number of fins.',
@@ -126,6 +130,7 @@ class PRBS(TemplateBase):
             fb_idx=None,
             clk_rst_sp=2,
             power_width_ntr=None,
+            dff_per_row=None,
 
         )
 
@@ -138,7 +143,8 @@ class PRBS(TemplateBase):
                             dff_nfn_nand3, dff_nfp_nand3, dff_nf_tgate0, dff_nf_tgate1,
                             buf_nf_inv0, buf_nf_inv1, xor_nf_inv, xor_nf_xor, ptap_w, ntap_w,
                             g_width_ntr, ds_width_ntr, intent, ndum, ndum_side, show_pins,
-                            stage, fb_idx, clk_rst_sp, clock_track, power_width_ntr, debug, **kwargs):
+                            stage, fb_idx, clk_rst_sp, clock_track, power_width_ntr, debug, dff_per_row,
+                            **kwargs):
         """Draw the layout of a transistor for characterization.
         Notes
         -------
@@ -152,6 +158,8 @@ class PRBS(TemplateBase):
         # get feedback index
         if fb_idx is None:
             fb_idx = stage-2
+        if dff_per_row is not None and dff_per_row < 1:
+            raise ValueError("dff_per_row must be at least 1")
 
         dff_params = dict(
             lch=lch, 
@@ -188,7 +196,7 @@ class PRBS(TemplateBase):
 
         )
 
-        dff_master = self.new_template(params=dff_params, temp_cls=DFFStRst, debug=True)
+        dff_master = new_master(self, DFFStRst, dff_params)
 
         # get mux size
         dff_toplay, dff_w, dff_h = dff_master.size
@@ -215,7 +223,7 @@ class PRBS(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        buf_master = self.new_template(params=buf_params, temp_cls=Buffer, debug=True)
+        buf_master = new_master(self, Buffer, buf_params)
         
         # get buf size
         buf_toplay, buf_w, buf_h = buf_master.size
@@ -242,7 +250,7 @@ class PRBS(TemplateBase):
             power_width_ntr=power_width_ntr,
         )
 
-        xor_master = self.new_template(params=xor_params, temp_cls=XOR, debug=True)
+        xor_master = new_master(self, XOR, xor_params)
 
         # get xor size
         xor_toplay, xor_w, xor_h = xor_master.size
@@ -256,166 +264,189 @@ class PRBS(TemplateBase):
                                         unit_mode=True)
         xor_inst = self.add_instance(xor_master, inst_name='XOR', loc=(buf_width*2+xor_width, 0),
                                      orient='MY', unit_mode=True)
-        dff_inst = []
-        # place all stages
-        for i in range(stage):
-            if i%2 == 0:
-                dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
-                                                  loc=(buf_width*2+xor_width+dff_width*i, 0), orient='R0',
-                                                  unit_mode=True))
-            else:
-                dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
-                                                  loc=(buf_width*2+xor_width+dff_width * (i+1), 0), orient='MY',
-                                                  unit_mode=True))
-
-        # connect dff input and output
-        if stage % 2 == 0:
-            # connect between different ffs
-            for i in range(stage):
-                if 2 * (i+1) < stage:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id+1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id+1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-                elif 2 * (i+1) == stage:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*i+1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-                else:
-                    if i == stage-1:
-                        break
-                    idx0 = 2*stage-1-2*i
-                    idx1 = 2*stage-3-2*i
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-            # get output port for xor
-            if 2*(fb_idx+1) <= stage:
-                fb_idx0 = 2*fb_idx
-                fb_o = True
-            else:
-                fb_idx0 = 2*stage-2*fb_idx-1
-                fb_o = False
-
+        x0 = buf_width*2+xor_width
+        if dff_per_row is not None:
+            n_row = -(-stage // dff_per_row)
+            if n_row > 1:
+                # the clk, rst and feedback spines get a channel of their own, clear of the XOR
+                spine_layer = clkbuf_inst.get_all_port_pins('data_o')[0].layer_id+2
+                spine_width = (2*clock_track+8) * self.grid.get_track_pitch(spine_layer, unit_mode=True)
+                x0 += -(-spine_width // w_pitch_dff) * w_pitch_dff
+            out, clk_i, vdd_wire, vss_wire = self._draw_dff_rows(dff_master, stage, dff_per_row, fb_idx, x0,
+                                                                 clock_track, clk_rst_sp, rstbuf_inst,
+                                                                 clkbuf_inst, xor_inst)
+            width = x0 + dff_width*min(stage, dff_per_row)
+            height = dff_height*n_row
+            # the rows are joined by vertical spines one layer up
+            top_layer = dff_toplay+2 if n_row > 1 else dff_toplay+1
+            sup_labels = ('VDD:', 'VSS:') if n_row > 1 else ('VDD', 'VSS')
+            clk = clkbuf_inst.get_all_port_pins('data')
+            rst = rstbuf_inst.get_all_port_pins('data')[0]
         else:
+            dff_inst = []
+            # place all stages
             for i in range(stage):
-                if 2*i < stage-1:
-                    dff_o = dff_inst[2*i].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id+1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id+1, idx)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-                elif 2*i == stage-1:
-                    idx0 = 2*(stage-1)-2*i
-                    idx1 = 2*(stage-1)-2*i-1
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
+                if i%2 == 0:
+                    dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
+                                                      loc=(buf_width*2+xor_width+dff_width*i, 0), orient='R0',
+                                                      unit_mode=True))
                 else:
-                    if i == stage-1:
-                        break
-                    idx0 = 2*stage-2*i-1
-                    idx1 = 2*stage-2*(i+1)-1
-                    dff_o = dff_inst[idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-                    dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
-                    idx = self.grid.coord_to_nearest_track(dff_o.layer_id + 1, dff_o.get_bbox_array(self.grid)
-                                                           .top_unit, unit_mode=True)
-                    tid = TrackID(dff_o.layer_id + 1, idx-1)
-                    self.connect_to_tracks([dff_o, dff_i], tid)
-
-            if 2*fb_idx <= stage-1:
-                fb_idx0 = 2*fb_idx
-                fb_o = True
-            else:
-                fb_idx0 = 2*stage-2*fb_idx-1
-                fb_o = False
+                    dff_inst.append(self.add_instance(dff_master, inst_name='DFF{}'.format(i),
+                                                      loc=(buf_width*2+xor_width+dff_width * (i+1), 0), orient='MY',
+                                                      unit_mode=True))
+
+            # data output pins and their track indices, found with one grid query
+            dff_o_list = [inst.get_all_port_pins('O', layer=dff_toplay)[0] for inst in dff_inst]
+            dff_o_idx = coords_to_nearest_tracks(self.grid, [dff_o.layer_id+1 for dff_o in dff_o_list],
+                                                 [dff_o.get_bbox_array(self.grid).top_unit for dff_o in dff_o_list],
+                                                 unit_mode=True)
+
+            # connect dff input and output
+            if stage % 2 == 0:
+                # connect between different ffs
+                for i in range(stage):
+                    if 2 * (i+1) < stage:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id+1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+                    elif 2 * (i+1) == stage:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*i+1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id + 1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+                    else:
+                        if i == stage-1:
+                            break
+                        idx0 = 2*stage-1-2*i
+                        idx1 = 2*stage-3-2*i
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+                # get output port for xor
+                if 2*(fb_idx+1) <= stage:
+                    fb_idx0 = 2*fb_idx
+                    fb_o = True
+                else:
+                    fb_idx0 = 2*stage-2*fb_idx-1
+                    fb_o = False
 
-        # connect dff to xor
-        if fb_o is True:
-            fb0 = dff_inst[fb_idx0].get_all_port_pins('O', layer=dff_toplay)[0]
-        else:
-            fb0 = dff_inst[fb_idx0-2].get_all_port_pins('I', layer=dff_toplay)[0]
-        fb1 = dff_inst[1].get_all_port_pins('O', layer=dff_toplay)[0]
-        xor_a = xor_inst.get_all_port_pins('A')[0]
-        xor_b = xor_inst.get_all_port_pins('B')[0]
-        idx = self.grid.coord_to_nearest_track(fb0.layer_id+1, fb0.get_bbox_array(self.grid)
-                                               .top_unit, unit_mode=True)
-        tid0 = TrackID(fb0.layer_id+1, idx+1)
-        tid1 = TrackID(fb0.layer_id+1, idx-1)
-        self.connect_to_tracks([fb0, xor_a], tid0)
-        self.connect_to_tracks([fb1, xor_b], tid1)
+            else:
+                for i in range(stage):
+                    if 2*i < stage-1:
+                        dff_o = dff_o_list[2*i]
+                        dff_i = dff_inst[2*(i+1)].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[2*i]
+                        tid = TrackID(dff_o.layer_id+1, idx)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+                    elif 2*i == stage-1:
+                        idx0 = 2*(stage-1)-2*i
+                        idx1 = 2*(stage-1)-2*i-1
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+                    else:
+                        if i == stage-1:
+                            break
+                        idx0 = 2*stage-2*i-1
+                        idx1 = 2*stage-2*(i+1)-1
+                        dff_o = dff_o_list[idx0]
+                        dff_i = dff_inst[idx1].get_all_port_pins('I')[0]
+                        idx = dff_o_idx[idx0]
+                        tid = TrackID(dff_o.layer_id + 1, idx-1)
+                        self.connect_to_tracks([dff_o, dff_i], tid)
+
+                if 2*fb_idx <= stage-1:
+                    fb_idx0 = 2*fb_idx
+                    fb_o = True
+                else:
+                    fb_idx0 = 2*stage-2*fb_idx-1
+                    fb_o = False
 
-        # connect xor to dff
-        xor_o = xor_inst.get_all_port_pins('O')[0]
-        dff_i = dff_inst[0].get_all_port_pins('I')[0]
-        idx = self.grid.coord_to_nearest_track(xor_o.layer_id + 1, xor_o.get_bbox_array(self.grid)
-                                               .right_unit, unit_mode=True)
-        tid = TrackID(xor_o.layer_id + 1, idx)
-        xor_o1 = self.connect_to_tracks(xor_o, tid)
-        idx = self.grid.coord_to_nearest_track(xor_o1.layer_id + 1, xor_o1.get_bbox_array(self.grid)
-                                               .top_unit, unit_mode=True)
-        tid = TrackID(xor_o1.layer_id + 1, idx+1)
-        out = self.connect_to_tracks([xor_o1, dff_i], tid)
-
-        # connect VDD/VSS
-        vdd_warr = rstbuf_inst.get_all_port_pins('VDD')
-        vss_warr = rstbuf_inst.get_all_port_pins('VSS')
-        vdd_warr.append(clkbuf_inst.get_all_port_pins('VDD')[0])
-        vss_warr.append(clkbuf_inst.get_all_port_pins('VSS')[0])
-        for i in range(stage):
-            vdd_warr.append(dff_inst[i].get_all_port_pins('VDD')[0])
-            vss_warr.append(dff_inst[i].get_all_port_pins('VSS')[0])
-        vdd_warr.append(xor_inst.get_all_port_pins('VDD')[0])
-        vss_warr.append(xor_inst.get_all_port_pins('VSS')[0])
-        vdd_wire = self.connect_wires(vdd_warr)
-        vss_wire = self.connect_wires(vss_warr)
-
-        # connect clock
-        clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
-        clk_idx = self.grid.coord_to_nearest_track(clk_i.layer_id+1, clk_i.get_bbox_array(self.grid).top_unit,
-                                                   unit_mode=True)
-        tid = TrackID(clk_i.layer_id+1, clk_idx, width=clock_track)
-        clk_warr = [clk_i]
-        for i in range(stage):
-            clk_warr.append(dff_inst[i].get_all_port_pins('CLK')[0])
-        clk_i = self.connect_to_tracks(clk_warr, tid)
-        clk = clkbuf_inst.get_all_port_pins('data')
-
-        # connect reset and set
-        rst_warr = []
-        for i in range(stage):
-            if i == 0:
-                rst_warr.append(dff_inst[i].get_all_port_pins('ST')[0])
-                rst = dff_inst[i].get_all_port_pins('RST')[0]
-                vss = dff_inst[i].get_all_port_pins('VSS')[0]
-                self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
-                                       unit_mode=True)
+            # connect dff to xor
+            if fb_o is True:
+                fb0 = dff_inst[fb_idx0].get_all_port_pins('O', layer=dff_toplay)[0]
             else:
-                rst_warr.append(dff_inst[i].get_all_port_pins('RST')[0])
-                st = dff_inst[i].get_all_port_pins('ST')[0]
-                vss = dff_inst[i].get_all_port_pins('VSS')[0]
-                self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
-                                       unit_mode=True)
-        tid = TrackID(st.layer_id+1, clk_idx-clk_rst_sp-clock_track)
-        rst_warr.append(rstbuf_inst.get_all_port_pins('data_o')[0])
-        self.connect_to_tracks(rst_warr, tid)
-        rst = rstbuf_inst.get_all_port_pins('data')[0]
+                fb0 = dff_inst[fb_idx0-2].get_all_port_pins('I', layer=dff_toplay)[0]
+            fb1 = dff_inst[1].get_all_port_pins('O', layer=dff_toplay)[0]
+            xor_a = xor_inst.get_all_port_pins('A')[0]
+            xor_b = xor_inst.get_all_port_pins('B')[0]
+            idx = self.grid.coord_to_nearest_track(fb0.layer_id+1, fb0.get_bbox_array(self.grid)
+                                                   .top_unit, unit_mode=True)
+            tid0 = TrackID(fb0.layer_id+1, idx+1)
+            tid1 = TrackID(fb0.layer_id+1, idx-1)
+            self.connect_to_tracks([fb0, xor_a], tid0)
+            self.connect_to_tracks([fb1, xor_b], tid1)
+
+            # connect xor to dff
+            xor_o = xor_inst.get_all_port_pins('O')[0]
+            dff_i = dff_inst[0].get_all_port_pins('I')[0]
+            idx = self.grid.coord_to_nearest_track(xor_o.layer_id + 1, xor_o.get_bbox_array(self.grid)
+                                                   .right_unit, unit_mode=True)
+            tid = TrackID(xor_o.layer_id + 1, idx)
+            xor_o1 = self.connect_to_tracks(xor_o, tid)
+            idx = self.grid.coord_to_nearest_track(xor_o1.layer_id + 1, xor_o1.get_bbox_array(self.grid)
+                                                   .top_unit, unit_mode=True)
+            tid = TrackID(xor_o1.layer_id + 1, idx+1)
+            out = self.connect_to_tracks([xor_o1, dff_i], tid)
+
+            # connect VDD/VSS
+            vdd_warr = rstbuf_inst.get_all_port_pins('VDD')
+            vss_warr = rstbuf_inst.get_all_port_pins('VSS')
+            vdd_warr.append(clkbuf_inst.get_all_port_pins('VDD')[0])
+            vss_warr.append(clkbuf_inst.get_all_port_pins('VSS')[0])
+            for i in range(stage):
+                vdd_warr.append(dff_inst[i].get_all_port_pins('VDD')[0])
+                vss_warr.append(dff_inst[i].get_all_port_pins('VSS')[0])
+            vdd_warr.append(xor_inst.get_all_port_pins('VDD')[0])
+            vss_warr.append(xor_inst.get_all_port_pins('VSS')[0])
+            vdd_wire = self.connect_wires(vdd_warr)
+            vss_wire = self.connect_wires(vss_warr)
+
+            # connect clock
+            clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
+            clk_idx = self.grid.coord_to_nearest_track(clk_i.layer_id+1, clk_i.get_bbox_array(self.grid).top_unit,
+                                                       unit_mode=True)
+            tid = TrackID(clk_i.layer_id+1, clk_idx, width=clock_track)
+            clk_warr = [clk_i]
+            for i in range(stage):
+                clk_warr.append(dff_inst[i].get_all_port_pins('CLK')[0])
+            clk_i = self.connect_to_tracks(clk_warr, tid)
+            clk = clkbuf_inst.get_all_port_pins('data')
+
+            # connect reset and set
+            rst_warr = []
+            for i in range(stage):
+                if i == 0:
+                    rst_warr.append(dff_inst[i].get_all_port_pins('ST')[0])
+                    rst = dff_inst[i].get_all_port_pins('RST')[0]
+                    vss = dff_inst[i].get_all_port_pins('VSS')[0]
+                    self.connect_to_tracks(vss, rst.track_id, track_upper=rst.get_bbox_array(self.grid).top_unit,
+                                           unit_mode=True)
+                else:
+                    rst_warr.append(dff_inst[i].get_all_port_pins('RST')[0])
+                    st = dff_inst[i].get_all_port_pins('ST')[0]
+                    vss = dff_inst[i].get_all_port_pins('VSS')[0]
+                    self.connect_to_tracks(vss, st.track_id, track_upper=st.get_bbox_array(self.grid).top_unit,
+                                           unit_mode=True)
+            tid = TrackID(st.layer_id+1, clk_idx-clk_rst_sp-clock_track)
+            rst_warr.append(rstbuf_inst.get_all_port_pins('data_o')[0])
+            self.connect_to_tracks(rst_warr, tid)
+            rst = rstbuf_inst.get_all_port_pins('data')[0]
+            width = dff_width*stage+buf_width*2+xor_width
+            height = dff_height
+            top_layer = dff_toplay+1
+            sup_labels = ('VDD', 'VSS')
 
         # add pins
-        self.add_pin('VDD', vdd_wire, show=show_pins)
-        self.add_pin('VSS', vss_wire, show=show_pins)
+        self.add_pin('VDD', vdd_wire, label=sup_labels[0], show=show_pins)
+        self.add_pin('VSS', vss_wire, label=sup_labels[1], show=show_pins)
         self.add_pin('clk', clk, show=show_pins)
         self.add_pin('rst', rst, show=show_pins)
         self.add_pin('o', out, show=show_pins)
@@ -424,9 +455,6 @@ class PRBS(TemplateBase):
 
         # get size
         # get size and array box
-        width = dff_width*stage+buf_width*2+xor_width
-        height = dff_height
-        top_layer = dff_toplay+1
         w_pitch, h_pitch = self.grid.get_size_pitch(top_layer, unit_mode=True)
 
         # get block size rounded by top 2 layers pitch
@@ -455,3 +483,119 @@ class PRBS(TemplateBase):
             debug=debug,
         )
 
+
+    def _draw_dff_rows(self, dff_master, stage, dff_per_row, fb_idx, x0, clock_track, clk_rst_sp,
+                       rstbuf_inst, clkbuf_inst, xor_inst):
+        """Places the DFFs as arrayed rows of at most dff_per_row cells and routes them.
+
+        Odd rows are mirrored so the data chain snakes up the rows.  clk and rst
+        take one connect_to_tracks() per row, and the rows are joined by vertical
+        spines left of x0, where the caller leaves a channel clear of the XOR.
+
+        Returns
+        -------
+        out : :class:`bag.layout.routing.WireArray`
+            the DFF chain input wire.
+        clk_i : :class:`bag.layout.routing.WireArray`
+            the internal clock wire of the first row.
+        vdd_wire : list[:class:`bag.layout.routing.WireArray`]
+            the VDD wires of every row.
+        vss_wire : list[:class:`bag.layout.routing.WireArray`]
+            the VSS wires of every row.
+        """
+        grid = self.grid
+        dff_toplay, dff_w, dff_h = dff_master.size
+        dff_height = dff_h * grid.get_size_pitch(dff_toplay, unit_mode=True)[1]
+        n_row = -(-stage // dff_per_row)
+
+        # place the rows, dff[k] is the (row instance, column) of stage k
+        row_inst, dff = place_rows(self, dff_master, stage, dff_per_row, x0, inst_name='DFF_ROW')
+
+        # connect the data chain, the output track of every stage in one grid query
+        dff_o_list = [get_cell_pin(dff[k], 'O', layer=dff_toplay) for k in range(stage)]
+        o_layer = dff_o_list[0].layer_id+1
+        dff_o_idx = coords_to_nearest_tracks(grid, o_layer, [dff_o.get_bbox_array(grid).top_unit
+                                                             for dff_o in dff_o_list], unit_mode=True)
+        for k in range(stage-1):
+            dff_i = get_cell_pin(dff[k+1], 'I')
+            # the next stage sits right above at a row turn.  the turn takes the track below the
+            # outputs, the one above carries the XOR A feedback that runs past the turn of odd rows
+            off = -1 if (k+1) % dff_per_row == 0 else 0
+            self.connect_to_tracks([dff_o_list[k], dff_i], TrackID(o_layer, dff_o_idx[k]+off))
+
+        # clk and rst tracks of every row
+        clk_i = clkbuf_inst.get_all_port_pins('data_o')[0]
+        clk_layer = clk_i.layer_id+1
+        clk_top = clk_i.get_bbox_array(grid).top_unit
+        clk_idx = coords_to_nearest_tracks(grid, clk_layer, [clk_top + row*dff_height for row in range(n_row)],
+                                           unit_mode=True)
+
+        # spines in the channel left of the first DFF column
+        spine_layer = clk_layer+1
+        spine0 = grid.coord_to_nearest_track(spine_layer, x0, unit_mode=True) - clock_track
+        spine_idx = [spine0, spine0-clock_track-1, spine0-clock_track-3, spine0-clock_track-5]
+        spine_x = [grid.track_to_coord(spine_layer, idx, unit_mode=True) for idx in spine_idx]
+        spine_lower = min(spine_x)
+
+        # feedback to the XOR on the same tracks as the single row layout, through the spines
+        # for stages above the first row
+        xor_a = xor_inst.get_all_port_pins('A')[0]
+        xor_b = xor_inst.get_all_port_pins('B')[0]
+        for k, xor_in, off, spine in ((fb_idx, xor_a, 1, 2), (stage-1, xor_b, -1, 3)):
+            if k < dff_per_row:
+                self.connect_to_tracks([dff_o_list[k], xor_in], TrackID(o_layer, dff_o_idx[k]+off))
+            else:
+                fb = self.connect_to_tracks(dff_o_list[k], TrackID(o_layer, dff_o_idx[k]+off),
+                                            track_lower=spine_x[spine], unit_mode=True)
+                fb_xor = self.connect_to_tracks(xor_in, TrackID(o_layer, dff_o_idx[0]+off),
+                                                track_upper=spine_x[spine], unit_mode=True)
+                self.connect_to_tracks([fb, fb_xor], TrackID(spine_layer, spine_idx[spine]))
+
+        # connect xor to dff
+        xor_o = xor_inst.get_all_port_pins('O')[0]
+        dff_i = get_cell_pin(dff[0], 'I')
+        idx = grid.coord_to_nearest_track(xor_o.layer_id+1, xor_o.get_bbox_array(grid).right_unit, unit_mode=True)
+        xor_o1 = self.connect_to_tracks(xor_o, TrackID(xor_o.layer_id+1, idx))
+        idx = grid.coord_to_nearest_track(xor_o1.layer_id+1, xor_o1.get_bbox_array(grid).top_unit, unit_mode=True)
+        out = self.connect_to_tracks([xor_o1, dff_i], TrackID(xor_o1.layer_id+1, idx+1))
+
+        # connect clk, rst and supplies row by row
+        vdd_wire = []
+        vss_wire = []
+        clk_warr = []
+        rst_warr = []
+        for row, inst in enumerate(row_inst):
+            clk_list = inst.get_all_port_pins('CLK')
+            vdd_list = inst.get_all_port_pins('VDD')
+            vss_list = inst.get_all_port_pins('VSS')
+            if row == 0:
+                # the first stage is set on reset, its RST is tied low
+                num = min(dff_per_row, stage)
+                rst_list = [get_cell_pin(dff[0], 'ST')] + [get_cell_pin(dff[k], 'RST') for k in range(1, num)]
+                tie_lists = [[get_cell_pin(dff[0], 'RST')], [get_cell_pin(dff[k], 'ST') for k in range(1, num)]]
+                clk_list.append(clk_i)
+                rst_list.append(rstbuf_inst.get_all_port_pins('data_o')[0])
+                for sup_inst in (rstbuf_inst, clkbuf_inst, xor_inst):
+                    vdd_list.append(sup_inst.get_all_port_pins('VDD')[0])
+                    vss_list.append(sup_inst.get_all_port_pins('VSS')[0])
+                lower = None
+            else:
+                rst_list = inst.get_all_port_pins('RST')
+                tie_lists = [inst.get_all_port_pins('ST')]
+                lower = spine_lower
+
+            vdd_wire += self.connect_wires(vdd_list)
+            row_vss = self.connect_wires(vss_list)
+            vss_wire += row_vss
+            for tie_list in tie_lists:
+                tie_to_tracks(self, row_vss, tie_list)
+            clk_tid = TrackID(clk_layer, clk_idx[row], width=clock_track)
+            rst_tid = TrackID(clk_layer, clk_idx[row]-clk_rst_sp-clock_track)
+            clk_warr.append(self.connect_to_tracks(clk_list, clk_tid, track_lower=lower, unit_mode=True))
+            rst_warr.append(self.connect_to_tracks(rst_list, rst_tid, track_lower=lower, unit_mode=True))
+
+        if n_row > 1:
+            self.connect_to_tracks(clk_warr, TrackID(spine_layer, spine_idx[0], width=clock_track))
+            self.connect_to_tracks(rst_warr, TrackID(spine_layer, spine_idx[1]))
+
+        return out, clk_warr[0], vdd_wire, vss_wire
@@ -17,9 +17,9 @@ from typing import Union
 import pprint
 import bag
 
-from bag.layout import RoutingGrid, TemplateDB
 from bag.data import load_sim_results
 from BAG_framework.bag.io.file import read_yaml
+from xbase_logic_repo.scripts._misc import make_tdb
 
 
 
@@ -249,24 +249,9 @@ class AND(AnalogBase):
 
 
 
-def make_tdb(bprj, specs):
-
-    grid_opts = specs['grid_opts'].copy()
-
-    layers = grid_opts['layers']
-    spaces = grid_opts['spaces']
-    widths = grid_opts['widths']
-    bot_dir = grid_opts['bot_dir']
-
-    routing_grid = RoutingGrid(bprj.tech_info, layers, spaces, widths, bot_dir)
-
-    tdb = TemplateDB('template_libs.def', routing_grid, impl_lib)
-    return tdb
-
-
 def generate(prj, temp_lib, impl_lib, cell_name, lay_params, sch_params, grid_opts, impl_cell_name=None):
 
-    temp_db = make_tdb(prj, specs)
+    temp_db = make_tdb(prj, impl_lib, grid_opts)
 
     print('designing module')
     # layout
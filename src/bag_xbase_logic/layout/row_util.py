@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+# noinspection PyUnresolvedReferences,PyCompatibility
+from builtins import *
+
+from bag.layout.routing import TrackID
+
+
+def place_rows(template, master, num, per_row, x0, inst_name='ROW'):
+    """Places num copies of master as arrayed rows of at most per_row cells.
+
+    Rows are stacked from y = 0 up.  Odd rows are mirrored and right aligned, so
+    a chain through the cells in order snakes up the rows and every row turn is
+    between two cells on top of each other.
+
+    Parameters
+    ----------
+    template : :class:`bag.layout.template.TemplateBase`
+        the template to add the rows to.
+    master : :class:`bag.layout.template.TemplateBase`
+        the cell master.
+    num : int
+        the number of cells.
+    per_row : int
+        the maximum number of cells in a row.
+    x0 : int
+        left edge of the rows, in resolution units.
+    inst_name : str
+        row instance name prefix.
+
+    Returns
+    -------
+    row_inst : list[:class:`bag.layout.objects.Instance`]
+        the arrayed instance of every row.
+    cells : list[tuple]
+        the (row instance, column) of every cell, in chain order.
+    """
+    toplay, w, h = master.size
+    w_pitch, h_pitch = template.grid.get_size_pitch(toplay, unit_mode=True)
+    cell_width = w * w_pitch
+    cell_height = h * h_pitch
+
+    row_inst = []
+    cells = []
+    for row in range(-(-num // per_row)):
+        row_num = min(per_row, num - row*per_row)
+        if row % 2 == 0:
+            inst = template.add_instance(master, inst_name='{}{}'.format(inst_name, row), orient='R0',
+                                         loc=(x0, row*cell_height), nx=row_num, spx=cell_width,
+                                         unit_mode=True)
+            cells.extend((inst, col) for col in range(row_num))
+        else:
+            inst = template.add_instance(master, inst_name='{}{}'.format(inst_name, row), orient='MY',
+                                         loc=(x0 + (per_row-row_num+1)*cell_width, row*cell_height),
+                                         nx=row_num, spx=cell_width, unit_mode=True)
+            cells.extend((inst, col) for col in reversed(range(row_num)))
+        row_inst.append(inst)
+    return row_inst, cells
+
+
+def get_cell_pin(cell, name, layer=-1):
+    """Returns the first pin of a port of one element of an arrayed instance.
+
+    Parameters
+    ----------
+    cell : tuple
+        the (instance, column) of the element.
+    name : str
+        the port name.
+    layer : int
+        the pin layer, -1 if the port has pins on one layer only.
+
+    Returns
+    -------
+    pin : :class:`bag.layout.routing.WireArray`
+        the pin.
+    """
+    inst, col = cell
+    return inst.get_port(name, col=col).get_pins(layer)[0]
+
+
+def tie_to_tracks(template, warr, pin_list):
+    """Connects warr to the tracks of every pin, extending them up to the pins.
+
+    Evenly spaced pins, like the same pin of every element of a row, take a
+    single connect_to_tracks() call.
+
+    Parameters
+    ----------
+    template : :class:`bag.layout.template.TemplateBase`
+        the template to draw in.
+    warr : :class:`bag.layout.routing.WireArray` or list[:class:`bag.layout.routing.WireArray`]
+        the wires to connect, usually a supply.
+    pin_list : list[:class:`bag.layout.routing.WireArray`]
+        the pins, all on one layer.
+    """
+    if not pin_list:
+        return
+    grid = template.grid
+    idx_list = sorted(pin.track_id.base_index for pin in pin_list)
+    pitch_set = {idx1 - idx0 for idx0, idx1 in zip(idx_list, idx_list[1:])}
+    upper = max(pin.get_bbox_array(grid).top_unit for pin in pin_list)
+    if len(pitch_set) <= 1:
+        tid = TrackID(pin_list[0].layer_id, idx_list[0], width=pin_list[0].track_id.width,
+                      num=len(idx_list), pitch=pitch_set.pop() if pitch_set else 0)
+        template.connect_to_tracks(warr, tid, track_upper=upper, unit_mode=True)
+    else:
+        for pin in pin_list:
+            template.connect_to_tracks(warr, pin.track_id, track_upper=pin.get_bbox_array(grid).top_unit,
+                                       unit_mode=True)
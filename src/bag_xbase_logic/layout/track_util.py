@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+# noinspection PyUnresolvedReferences,PyCompatibility
+from builtins import *
+
+import numpy as np
+
+
+def coords_to_nearest_tracks(grid, layer_ids, coords, half_track=False, mode=0, unit_mode=False):
+    """Returns the track indices nearest to the given coordinates, in one call.
+
+    Same as calling grid.coord_to_nearest_track() for every (layer, coordinate)
+    pair, but the grid is only queried once per layer.
+
+    Parameters
+    ----------
+    grid : :class:`bag.layout.routing.RoutingGrid`
+        the routing grid.
+    layer_ids : int or list[int]
+        the layer of every coordinate, or one layer for all of them.
+    coords : list[float or int]
+        the coordinates.
+    half_track : bool
+        True to allow half track indices.
+    mode : int
+        0 for the nearest track, ties go to the upper track.  1 for the nearest
+        track at or above the coordinate, -1 for the nearest track at or below.
+    unit_mode : bool
+        True if the coordinates are given in resolution units.
+
+    Returns
+    -------
+    track_idx_list : list[int or float]
+        the track indices, as python numbers.
+    """
+    if mode not in (-1, 0, 1):
+        raise ValueError('Unsupported mode %d' % mode)
+
+    coords = np.asarray(coords, dtype=float)
+    if not unit_mode:
+        coords = np.round(coords / grid.resolution)
+    layer_arr = np.broadcast_to(np.asarray(layer_ids, dtype=int), coords.shape)
+
+    # track index in half track steps
+    htr = np.empty(coords.shape, dtype=int)
+    for layer_id in np.unique(layer_arr).tolist():
+        sel = layer_arr == layer_id
+        tr0 = grid.track_to_coord(layer_id, 0, unit_mode=True)
+        pitch = grid.get_track_pitch(layer_id, unit_mode=True)
+        step = pitch / 2 if half_track else pitch
+        pos = (coords[sel] - tr0) / step
+        if mode == 0:
+            pos = np.floor(pos + 0.5)
+        elif mode > 0:
+            pos = np.ceil(pos)
+        else:
+            pos = np.floor(pos)
+        htr[sel] = pos.astype(int) if half_track else 2 * pos.astype(int)
+
+    return [val // 2 if val % 2 == 0 else val / 2 for val in htr.tolist()]
+
+
+def get_track_ids(grid, layer_ids, coords, offset=0, width=1, unit_mode=False):
+    """Returns a TrackID on the track nearest to each coordinate.
+
+    Parameters
+    ----------
+    grid : :class:`bag.layout.routing.RoutingGrid`
+        the routing grid.
+    layer_ids : int or list[int]
+        the layer of every coordinate, or one layer for all of them.
+    coords : list[float or int]
+        the coordinates.
+    offset : int or list[int]
+        track index offset added to each nearest track.
+    width : int
+        the track width.
+    unit_mode : bool
+        True if the coordinates are given in resolution units.
+
+    Returns
+    -------
+    tid_list : list[:class:`bag.layout.routing.TrackID`]
+        the track IDs.
+    """
+    # imported here so the track index helpers do not need BAG
+    from bag.layout.routing import TrackID
+
+    num = len(coords)
+    layer_list = [layer_ids] * num if isinstance(layer_ids, int) else list(layer_ids)
+    offset_list = [offset] * num if isinstance(offset, int) else list(offset)
+    idx_list = coords_to_nearest_tracks(grid, layer_list, coords, unit_mode=unit_mode)
+    return [TrackID(layer_id, idx + off, width=width)
+            for layer_id, idx, off in zip(layer_list, idx_list, offset_list)]
+
+
+def get_warr_track_ids(template, warr_list, attr='top_unit', offset=0, width=1):
+    """Returns a TrackID one layer above each wire, at the given bounding box edge.
+
+    Parameters
+    ----------
+    template : :class:`bag.layout.template.TemplateBase`
+        the template drawing the wires.
+    warr_list : list[:class:`bag.layout.routing.WireArray`]
+        the wires.
+    attr : str
+        the unit mode bounding box attribute to snap to, e.g. 'top_unit' or 'right_unit'.
+    offset : int or list[int]
+        track index offset added to each nearest track.
+    width : int
+        the track width.
+
+    Returns
+    -------
+    tid_list : list[:class:`bag.layout.routing.TrackID`]
+        the track IDs.
+    """
+    grid = template.grid
+    layer_list = [warr.layer_id + 1 for warr in warr_list]
+    coords = [getattr(warr.get_bbox_array(grid), attr) for warr in warr_list]
+    return get_track_ids(grid, layer_list, coords, offset=offset, width=width, unit_mode=True)
@@ -0,0 +1,21 @@
+import sys
+import types
+from os import path
+
+
+REPO_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+
+# the scripts are imported as xbase_logic_repo.scripts, the name of this checkout in
+# a BAG workspace.  outside a workspace, expose the checkout under that name.
+try:
+    import xbase_logic_repo
+except ImportError:
+    xbase_logic_repo = types.ModuleType('xbase_logic_repo')
+    xbase_logic_repo.__path__ = [REPO_DIR]
+    sys.modules['xbase_logic_repo'] = xbase_logic_repo
+
+# bag_xbase_logic is installed from src in a workspace
+try:
+    import bag_xbase_logic
+except ImportError:
+    sys.path.insert(0, path.join(REPO_DIR, 'src'))
@@ -0,0 +1,39 @@
+import os
+
+from xbase_logic_repo.scripts import gen_cache, extract_cache
+
+
+class _ImplDb(object):
+    def __init__(self, lib_path):
+        self.default_lib_path = lib_path
+
+
+class _Prj(object):
+    def __init__(self, lib_path):
+        self.impl_db = _ImplDb(lib_path)
+
+
+def _write_view(lib_dir, cell, view, text):
+    view_dir = os.path.join(lib_dir, cell, view)
+    os.makedirs(view_dir, exist_ok=True)
+    with open(os.path.join(view_dir, 'data.oa'), 'w') as f:
+        f.write(text)
+
+
+def test_fingerprint_missing_lib(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen_cache, 'get_cell_key', lambda impl_lib, cell_name: None)
+    assert extract_cache.get_fingerprint(_Prj(str(tmp_path)), 'lib', 'clkdiv') is None
+
+
+def test_fingerprint_views(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen_cache, 'get_cell_key', lambda impl_lib, cell_name: None)
+    prj = _Prj(str(tmp_path))
+    lib_dir = str(tmp_path / 'lib')
+    _write_view(lib_dir, 'clkdiv', 'layout', 'a')
+    _write_view(lib_dir, 'dff', 'schematic', 'b')
+    fp0 = extract_cache.get_fingerprint(prj, 'lib', 'clkdiv')
+    assert fp0 is not None
+    assert extract_cache.get_fingerprint(prj, 'lib', 'clkdiv') == fp0
+    # views of other cells in the library count too without a generation key
+    _write_view(lib_dir, 'dff', 'schematic', 'c')
+    assert extract_cache.get_fingerprint(prj, 'lib', 'clkdiv') != fp0
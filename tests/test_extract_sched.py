@@ -0,0 +1,97 @@
+import time
+import threading
+
+from xbase_logic_repo.scripts.extract_sched import FakeRunner, BagRunner, extract_all
+
+
+JOBS = [('lib', 'inv'), ('lib', 'nand'), ('lib', 'nor'), ('lib', 'dff')]
+
+
+def test_all_pass():
+    runner = FakeRunner(delay=0.01)
+    results = extract_all(JOBS, runner, max_concurrent=2)
+    assert [res.cell_name for res in results] == [cell for _, cell in JOBS]
+    assert all(res.error is None and res.lvs_passed and res.rcx_passed for res in results)
+    assert runner.max_running == 2
+
+
+def test_no_rcx():
+    runner = FakeRunner()
+    results = extract_all(JOBS, runner, run_rcx=False)
+    assert all(res.rcx_passed is None for res in results)
+    assert all(step == 'lvs' for _, step in runner.calls)
+
+
+def test_collect_all_failures():
+    runner = FakeRunner(fail={('inv', 'lvs'), ('nor', 'rcx')})
+    results = {res.cell_name: res for res in extract_all(JOBS, runner)}
+    assert 'lvs failed' in results['inv'].error
+    # rcx does not run after a failed lvs
+    assert ('inv', 'rcx') not in runner.calls
+    assert 'rcx failed' in results['nor'].error
+    assert results['nand'].error is None and results['dff'].error is None
+
+
+def test_retry_on_error():
+    runner = FakeRunner(errors={('nand', 'lvs'): 2})
+    results = {res.cell_name: res for res in extract_all(JOBS, runner, retries=2)}
+    assert results['nand'].error is None
+    assert runner.calls.count(('nand', 'lvs')) == 3
+    # 3 lvs attempts plus 1 rcx attempt
+    assert results['nand'].attempts == 4
+
+
+def test_retries_exhausted():
+    runner = FakeRunner(errors={('nand', 'lvs'): 5})
+    results = {res.cell_name: res for res in extract_all(JOBS, runner, retries=1)}
+    assert 'RuntimeError' in results['nand'].error
+    assert runner.calls.count(('nand', 'lvs')) == 2
+    assert results['inv'].error is None
+
+
+def test_timeout():
+    runner = FakeRunner(hang={('dff', 'lvs')})
+    results = {res.cell_name: res for res in extract_all(JOBS, runner, timeout=0.05, retries=1)}
+    assert 'timed out' in results['dff'].error
+    assert runner.calls.count(('dff', 'lvs')) == 2
+    assert results['inv'].error is None
+    # the hung checks were cancelled
+    assert runner.running == 0
+
+
+class _BlockingPrj(object):
+    # blocking run_lvs, the first call on slow_cell outlives the timeout
+    def __init__(self, slow_cell, slow_time):
+        self.slow_cell = slow_cell
+        self.slow_time = slow_time
+        self.lock = threading.Lock()
+        self.calls = []
+        self._active = []
+        self.running = 0
+        self.max_running = 0
+        self.overlap = False
+
+    def run_lvs(self, impl_lib, cell_name):
+        with self.lock:
+            first = cell_name not in self.calls
+            self.overlap = self.overlap or any(cell == cell_name for cell in self._active)
+            self._active.append(cell_name)
+            self.calls.append(cell_name)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.slow_time if first and cell_name == self.slow_cell else 0.01)
+        with self.lock:
+            self._active.remove(cell_name)
+            self.running -= 1
+        return True, '%s.lvs.log' % cell_name
+
+
+def test_blocking_timeout_waits_for_thread():
+    prj = _BlockingPrj('inv', 0.3)
+    runner = BagRunner(prj, max_threads=4)
+    results = {res.cell_name: res for res in extract_all(JOBS, runner, max_concurrent=2, timeout=0.1,
+                                                         retries=1, run_rcx=False)}
+    assert results['inv'].error is None and results['inv'].attempts == 2
+    # the retry never ran next to the timed out call, and the hung thread kept its slot
+    assert not prj.overlap
+    assert prj.max_running <= 2
@@ -0,0 +1,39 @@
+from xbase_logic_repo.scripts import gen_cache
+
+
+class _ImplDb(object):
+    def __init__(self, cells):
+        self._cells = cells
+
+    def get_cells_in_library(self, lib_name):
+        return self._cells
+
+
+class _Prj(object):
+    def __init__(self, cells):
+        self.impl_db = _ImplDb(cells)
+
+
+def test_restore_hit(tmp_path):
+    cache_dir = str(tmp_path)
+    gen_cache.save('k1', 'lib', 'clkdiv', cache_dir=cache_dir)
+    gen_cache.record_cell('lib', 'clkdiv', 'k1', cache_dir=cache_dir)
+    assert gen_cache.restore(_Prj(['clkdiv']), 'k1', cache_dir=cache_dir)
+
+
+def test_restore_regenerated_cell(tmp_path):
+    cache_dir = str(tmp_path)
+    for key in ('k1', 'k2'):
+        gen_cache.save(key, 'lib', 'clkdiv', cache_dir=cache_dir)
+        gen_cache.record_cell('lib', 'clkdiv', key, cache_dir=cache_dir)
+    # the library holds the k2 generation, k1 is stale
+    assert not gen_cache.restore(_Prj(['clkdiv']), 'k1', cache_dir=cache_dir)
+    assert gen_cache.restore(_Prj(['clkdiv']), 'k2', cache_dir=cache_dir)
+
+
+def test_restore_missing_cell(tmp_path):
+    cache_dir = str(tmp_path)
+    gen_cache.save('k1', 'lib', 'clkdiv', cache_dir=cache_dir)
+    gen_cache.record_cell('lib', 'clkdiv', 'k1', cache_dir=cache_dir)
+    assert not gen_cache.restore(_Prj([]), 'k1', cache_dir=cache_dir)
+    assert not gen_cache.restore(object(), 'k1', cache_dir=cache_dir)
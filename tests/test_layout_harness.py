@@ -0,0 +1,67 @@
+import os
+import sys
+import pickle
+import subprocess
+
+import pytest
+
+from conftest import REPO_DIR
+from xbase_logic_repo.scripts.gen_cache import normalize_params
+from xbase_logic_repo.scripts.bench.layout_harness import load_tech_fixture
+
+
+GRID_OPTS = dict(layers=[1, 2, 3], spaces=[0.1, 0.1, 0.2], widths=[0.1, 0.1, 0.2], bot_dir='y')
+
+
+def _write_fixture(fname, grid_opts):
+    with open(fname, 'wb') as f:
+        pickle.dump(dict(grid_opts=normalize_params(grid_opts), layers={}, grid='grid'), f)
+
+
+def test_load_tech_fixture(tmp_path):
+    fname = str(tmp_path / 'tech_grid.pkl')
+    # tuples and lists compare equal once normalized
+    _write_fixture(fname, GRID_OPTS)
+    assert load_tech_fixture(dict(GRID_OPTS, layers=(1, 2, 3)), fname) == 'grid'
+
+
+def test_load_tech_fixture_other_grid(tmp_path):
+    fname = str(tmp_path / 'tech_grid.pkl')
+    _write_fixture(fname, GRID_OPTS)
+    with pytest.raises(ValueError, match='other grid_opts'):
+        load_tech_fixture(dict(GRID_OPTS, bot_dir='x'), fname)
+
+
+def test_bench_imports_without_bag():
+    code = ('import sys, conftest\n'
+            'import xbase_logic_repo.scripts.bench.layout_gen_bench\n'
+            'print("bag" in sys.modules)\n')
+    out = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(REPO_DIR, 'tests'), check=True,
+                         stdout=subprocess.PIPE, universal_newlines=True).stdout
+    assert out.strip() == 'False'
+
+
+def test_run_bench_failed_cell(tmp_path, monkeypatch):
+    from xbase_logic_repo.scripts.bench import layout_gen_bench
+
+    spec_file = str(tmp_path / 'specs.yaml')
+    with open(spec_file, 'w') as f:
+        f.write('grid_opts: {bot_dir: y}\n')
+        for cell in ('inv', 'clkdiv', 'nand'):
+            f.write('%s_cell_name: %s\n%s_lay_params: {nf: 2}\n' % (cell, cell, cell))
+
+    def measure_cell(cell, lay_params, grid_opts, bag_config=None, trace_alloc=False):
+        if cell == 'clkdiv':
+            raise KeyError('rst_list')
+        res = dict(cell=cell, time=0.1, setup_time=0.0, peak_rss_mb=1.0, counts={}, draw_times={})
+        if trace_alloc:
+            res.update(alloc_peak_mb=0.5, alloc_blocks=10)
+        return res
+
+    monkeypatch.setattr(layout_gen_bench, 'measure_cell', measure_cell)
+    monkeypatch.setattr(layout_gen_bench, 'run_isolated', lambda fn, *args: fn(*args))
+    results = layout_gen_bench.run_bench(spec_file, rounds=2, warmup=0)
+    assert [res['cell'] for res in results] == ['clkdiv', 'inv', 'nand']
+    assert results[0] == dict(cell='clkdiv', error="KeyError: 'rst_list'")
+    assert 'error' not in results[1] and results[1]['min'] == 0.1
+    assert results[2]['alloc_blocks'] == 10
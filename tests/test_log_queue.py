@@ -0,0 +1,33 @@
+import os
+import sys
+import subprocess
+
+from conftest import REPO_DIR
+
+
+def test_records_written_at_exit(tmp_path):
+    log_file = str(tmp_path / 'run.log')
+    # the session is never stopped, exiting must still write every queued record
+    code = ('import sys, conftest\n'
+            'from xbase_logic_repo.scripts._misc import write_log\n'
+            'logger = write_log(sys.argv[1])\n'
+            'for i in range(2000):\n'
+            '    logger.info("record %d", i)\n')
+    subprocess.run([sys.executable, '-c', code, log_file], cwd=os.path.join(REPO_DIR, 'tests'), check=True)
+    with open(log_file, 'r') as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 2000
+    assert lines[-1].endswith('record 1999')
+
+
+def test_replaced_session(tmp_path):
+    first, second = str(tmp_path / 'first.log'), str(tmp_path / 'second.log')
+    code = ('import sys, conftest\n'
+            'from xbase_logic_repo.scripts._misc import write_log\n'
+            'write_log(sys.argv[1]).info("first")\n'
+            'write_log(sys.argv[2]).info("second")\n')
+    subprocess.run([sys.executable, '-c', code, first, second], cwd=os.path.join(REPO_DIR, 'tests'),
+                   check=True)
+    for fname, msg in ((first, 'first'), (second, 'second')):
+        with open(fname, 'r') as f:
+            assert f.read().strip().endswith(msg)
@@ -0,0 +1,35 @@
+import multiprocessing
+
+from xbase_logic_repo.scripts._misc import save_yaml, read_yaml, defer_yaml_export
+
+
+def test_save_yaml_exports(tmp_path):
+    yaml_file = str(tmp_path / 'results.yaml')
+    save_yaml(dict(a=1), yaml_file)
+    assert read_yaml(yaml_file) == dict(a=1)
+    save_yaml(dict(b=2), yaml_file, append=True)
+    assert read_yaml(yaml_file) == dict(a=1, b=2)
+
+
+def test_deferred_export(tmp_path):
+    yaml_file = str(tmp_path / 'results.yaml')
+    save_yaml(dict(a=1), yaml_file)
+    with defer_yaml_export():
+        save_yaml(dict(b=2), yaml_file, append=True)
+        save_yaml(dict(c=3), yaml_file, append=True)
+        assert read_yaml(yaml_file) == dict(a=1)
+    assert read_yaml(yaml_file) == dict(a=1, b=2, c=3)
+
+
+def _save_in_worker(yaml_file):
+    save_yaml(dict(w=1), yaml_file)
+
+
+def test_worker_exports_in_deferred_block(tmp_path):
+    # a forked worker never runs the block end or atexit, it must export itself
+    yaml_file = str(tmp_path / 'worker.yaml')
+    with defer_yaml_export():
+        proc = multiprocessing.get_context('fork').Process(target=_save_in_worker, args=(yaml_file,))
+        proc.start()
+        proc.join()
+        assert read_yaml(yaml_file) == dict(w=1)
@@ -0,0 +1,115 @@
+import numpy as np
+
+from xbase_logic_repo.scripts.sweep import FakeBackend, expand_jobs, run_sweep, run_corners
+
+
+class _RecordBackend(FakeBackend):
+    # records the jobs run in this process, failures do not change the cache key
+    def __init__(self, **kwargs):
+        FakeBackend.__init__(self, **kwargs)
+        self.names = []
+
+    def get_cache_key(self):
+        return dict(backend='record', num_points=self.num_points, adaptive=self.adaptive)
+
+    def simulate(self, job):
+        self.names.append(job['name'])
+        return FakeBackend.simulate(self, job)
+
+
+def test_expand_jobs():
+    names, values, jobs = expand_jobs(dict(vdd=[0.8, 0.9], temp=[25, 85, 125], cload=1e-15), ['tt', 'ff'])
+    assert names == ['corner', 'temp', 'vdd']
+    assert values == [['tt', 'ff'], [25, 85, 125], [0.8, 0.9]]
+    assert len(jobs) == 12
+    assert len({job['name'] for job in jobs}) == 12
+    job = jobs[-1]
+    assert job['index'] == (1, 2, 1)
+    assert job['corner'] == 'ff'
+    assert job['params'] == dict(temp=125, vdd=0.9, cload=1e-15)
+
+
+def test_expand_jobs_no_sweep():
+    names, values, jobs = expand_jobs(None, ['tt'])
+    assert names == ['corner']
+    assert [job['params'] for job in jobs] == [{}]
+
+
+def test_run_sweep(tmp_path):
+    backend = FakeBackend(num_points=21)
+    names, values, jobs = expand_jobs(dict(vdd=[0.8, 0.9, 1.0]), ['tt', 'ss'])
+    store, errors = run_sweep((names, values, jobs), backend, str(tmp_path / 'res'), num_proc=1)
+    assert errors == {}
+    assert store['vout'].shape == (2, 3, 21)
+    assert store['delay'].shape == (2, 3)
+    # streamed points match the jobs they came from
+    for job in jobs:
+        out = backend.simulate(job)
+        assert np.allclose(store.get_point('vout', job['index']), out['vout'])
+        assert np.allclose(store.get_x('vout', job['index']), out['time'])
+        assert store.get('delay', corner=job['index'][0], vdd=job['index'][1]) == out['delay']
+
+
+def test_run_sweep_pool(tmp_path):
+    names, values, jobs = expand_jobs(dict(vdd=[0.8, 0.9]), ['tt', 'ff'])
+    store0, _ = run_sweep((names, values, jobs), FakeBackend(), str(tmp_path / 'inline'), num_proc=1)
+    store1, _ = run_sweep((names, values, jobs), FakeBackend(), str(tmp_path / 'pool'), num_proc=2)
+    assert np.array_equal(store0['vout'], store1['vout'])
+    assert np.array_equal(store0['delay'], store1['delay'])
+
+
+def test_run_sweep_single_job(tmp_path):
+    # a single job runs in this process with the caller's backend, even without num_proc
+    backend = _RecordBackend()
+    names, values, jobs = expand_jobs(None, ['tt'])
+    store, errors = run_sweep((names, values, jobs), backend, str(tmp_path / 'res'))
+    assert errors == {}
+    assert backend.names == [jobs[0]['name']]
+
+
+def test_failed_jobs_nan(tmp_path):
+    names, values, jobs = expand_jobs(dict(vdd=[0.8, 0.9]), ['tt', 'ff'])
+    store, errors = run_sweep((names, values, jobs), FakeBackend(num_points=11, fail={'ff_1'}),
+                              str(tmp_path / 'res'), num_proc=1)
+    assert list(errors) == ['ff_1']
+    vout = store['vout']
+    assert vout.shape == (2, 2, 11)
+    assert np.isnan(vout[1, 1]).all()
+    assert not np.isnan(vout[0]).any() and not np.isnan(vout[1, 0]).any()
+    assert np.isnan(store['delay'][1, 1])
+
+
+def test_adaptive_x_axis(tmp_path):
+    names, values, jobs = expand_jobs(dict(vdd=[0.8, 0.9, 1.0]), ['tt'])
+    backend = FakeBackend(num_points=21, adaptive=True)
+    store, _ = run_sweep((names, values, jobs), backend, str(tmp_path / 'res'), num_proc=1)
+    for job in jobs:
+        out = backend.simulate(job)
+        assert np.array_equal(store.get_x('vout', job['index']), out['time'])
+        assert np.array_equal(store.get_point('vout', job['index']), out['vout'])
+    x = np.linspace(0, 100e-12, 5)
+    assert store.get('vout', x=x).shape == (1, 3, 5)
+
+
+def test_run_corners(tmp_path):
+    tb_params = dict(vdd=[0.8, 0.9])
+    out_dir = str(tmp_path / 'res')
+    backend = _RecordBackend(num_points=11, adaptive=True, fail={'ss_0'})
+    store, errors = run_corners(tb_params, ['tt', 'ff', 'ss'], backend, out_dir, num_proc=1)
+    assert list(errors) == ['ss_0']
+    assert store.sweep_values('corner') == ['tt', 'ff', 'ss']
+    assert store['delay'].shape == (3, 2)
+    assert np.isnan(store['delay'][2, 0])
+    _, _, jobs = expand_jobs(tb_params, ['tt', 'ff', 'ss'])
+    for job in jobs:
+        if job['name'] != 'ss_0':
+            out = backend.simulate(job)
+            assert np.array_equal(store.get_x('vout', job['index']), out['time'])
+            assert np.array_equal(store.get_point('vout', job['index']), out['vout'])
+
+    # only the failed corner runs again
+    backend = _RecordBackend(num_points=11, adaptive=True)
+    store, errors = run_corners(tb_params, ['tt', 'ff', 'ss'], backend, out_dir, num_proc=1)
+    assert errors == {}
+    assert sorted(backend.names) == ['ss_0', 'ss_1']
+    assert not np.isnan(store['delay']).any()
@@ -0,0 +1,64 @@
+import pytest
+
+from bag_xbase_logic.layout.track_util import coords_to_nearest_tracks
+
+
+class _Grid(object):
+    # layer 1 tracks at 50 + 100 * n, layer 2 tracks at 100 + 200 * n, in resolution units
+    resolution = 0.001
+    _tracks = {1: (50, 100), 2: (100, 200)}
+
+    def track_to_coord(self, layer_id, track_idx, unit_mode=False):
+        assert unit_mode and track_idx == 0
+        return self._tracks[layer_id][0]
+
+    def get_track_pitch(self, layer_id, unit_mode=False):
+        assert unit_mode
+        return self._tracks[layer_id][1]
+
+
+def _tracks(layer_ids, coords, **kwargs):
+    return coords_to_nearest_tracks(_Grid(), layer_ids, coords, **kwargs)
+
+
+def test_unit_mode():
+    assert _tracks(1, [50, 149, 151, 350], unit_mode=True) == [0, 1, 1, 3]
+    # layout units are rounded to the resolution first
+    assert _tracks(1, [0.05, 0.149, 0.151, 0.35]) == [0, 1, 1, 3]
+    assert _tracks(1, [0.1]) == _tracks(1, [100], unit_mode=True) == [1]
+
+
+def test_negative_coords():
+    assert _tracks(1, [-50, -149, -151, -20], unit_mode=True) == [-1, -2, -2, -1]
+    # ties go to the upper track below zero too
+    assert _tracks(1, [0, -100], unit_mode=True) == [0, -1]
+
+
+def test_half_track():
+    assert _tracks(1, [100, 150, 75, 74, -25], half_track=True, unit_mode=True) == [0.5, 1, 0.5, 0, -0.5]
+
+
+def test_modes():
+    coords = [50, 51, 149, -49, -50]
+    assert _tracks(1, coords, mode=1, unit_mode=True) == [0, 1, 1, 0, -1]
+    assert _tracks(1, coords, mode=-1, unit_mode=True) == [0, 0, 0, -1, -1]
+    assert _tracks(1, [51, 99], mode=1, half_track=True, unit_mode=True) == [0.5, 0.5]
+    assert _tracks(1, [51, 99], mode=-1, half_track=True, unit_mode=True) == [0, 0]
+    with pytest.raises(ValueError):
+        _tracks(1, [50], mode=2, unit_mode=True)
+
+
+def test_layers():
+    assert _tracks([1, 2, 1, 2], [150, 300, -50, 0], unit_mode=True) == [1, 1, -1, 0]
+    assert _tracks(2, [0.2, 0.5]) == [1, 2]
+
+
+def test_empty():
+    assert _tracks(1, [], unit_mode=True) == []
+    assert _tracks([], [], half_track=True) == []
+
+
+def test_return_types():
+    idx_list = _tracks(1, [150, 100, -50], half_track=True, unit_mode=True)
+    assert [type(idx) for idx in idx_list] == [int, float, int]
+    assert [type(idx) for idx in _tracks(1, [0.15, -0.05])] == [int, int]